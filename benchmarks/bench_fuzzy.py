@@ -0,0 +1,56 @@
+"""
+Benchmark of fuzzy title matching: a Python loop calling fuzz.ratio for every
+(chunk, title) pair and rounding it, as the original fuzzy search did with
+fuzzywuzzy, against a single batched
+rapidfuzz cdist call with a score cutoff and worker threads.
+
+Usage:
+    python -m benchmarks.bench_fuzzy [--sizes 10000 100000 1000000] [--query "godfathr prt"]
+"""
+
+import argparse
+import time
+
+from rapidfuzz import fuzz
+
+from src.utils.search_utils import match_titles_fuzzy
+from benchmarks.synthetic import generate_movie_dicts, load_templates
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+
+def match_titles_loop(titles, query, fuzz_ratio):
+    """ Returns the positions of the titles matching every chunk, one fuzz.ratio call per pair """
+    chunks = query.lower().split()
+    matches = set(i for i, title in enumerate(titles) if round(fuzz.ratio(chunks[0], title)) >= fuzz_ratio)
+    for chunk in chunks[1:]:
+        matches &= set(i for i, title in enumerate(titles) if round(fuzz.ratio(chunk, title)) >= fuzz_ratio)
+    return sorted(matches)
+
+
+def timed(function, *args):
+    """ Returns the result of a call and the seconds it took """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="numbers of titles to benchmark")
+    parser.add_argument('--query', default="godfathr prt", help="fuzzy query")
+    parser.add_argument('--fuzz-ratio', type=int, default=30, help="minimum fuzz ratio of a match")
+    args = parser.parse_args()
+
+    templates = load_templates()
+    print(f"{'titles':>10} {'loop (s)':>10} {'cdist (s)':>10} {'speedup':>8} {'matches':>8}")
+    for size in args.sizes:
+        titles = [movie['name'].lower() for movie in generate_movie_dicts(size, templates)]
+        expected, loop_seconds = timed(match_titles_loop, titles, args.query, args.fuzz_ratio)
+        matches, cdist_seconds = timed(match_titles_fuzzy, titles, args.query, args.fuzz_ratio)
+        assert matches.tolist() == expected
+        print(f"{size:>10} {loop_seconds:>10.3f} {cdist_seconds:>10.3f} {loop_seconds / cdist_seconds:>7.1f}x {len(matches):>8}")
+
+
+if __name__ == "__main__":
+    main()
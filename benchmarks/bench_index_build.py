@@ -0,0 +1,42 @@
+"""
+Benchmark of Index.build_index on synthetic catalogs of increasing size.
+
+The build is expected to scale linearly: the time per movie should stay roughly
+constant from the size of movies.json up to a million movies.
+
+Usage:
+    python -m benchmarks.bench_index_build [--sizes 250 10000 100000 1000000] [--workers 4]
+"""
+
+import argparse
+import time
+
+from src.index import Index
+from benchmarks.synthetic import generate_movies, load_templates
+
+DEFAULT_SIZES = [250, 2500, 25000, 250000, 1000000]
+
+
+def bench_build(movies, workers: int = 1) -> float:
+    """ Returns the seconds spent building an Index over the movies """
+    start = time.perf_counter()
+    Index(movies, workers)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="catalog sizes to benchmark")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes building the index")
+    args = parser.parse_args()
+
+    templates = load_templates()
+    print(f"{'movies':>10} {'build (s)':>10} {'us/movie':>10}")
+    for size in args.sizes:
+        movies = list(generate_movies(size, templates))
+        seconds = bench_build(movies, args.workers)
+        print(f"{size:>10} {seconds:>10.3f} {seconds / size * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
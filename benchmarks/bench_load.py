@@ -0,0 +1,50 @@
+"""
+Benchmark of loading a movie catalog with load_movies_from_json_file.
+
+Synthetic catalogs of increasing size are written to a temporary JSON file and
+loaded back. Anything printed while loading is discarded so only the cost of
+producing it is measured.
+
+Usage:
+    python -m benchmarks.bench_load [--sizes 250 10000 100000]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+
+from src.utils.utils import load_movies_from_json_file
+from benchmarks.synthetic import generate_movie_dicts, load_templates
+
+DEFAULT_SIZES = [250, 10000, 100000]
+
+
+def bench_load(filepath: str) -> float:
+    """ Returns the seconds spent loading the movies of a JSON file """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        load_movies_from_json_file(filepath)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="catalog sizes to benchmark")
+    args = parser.parse_args()
+
+    templates = load_templates()
+    print(f"{'movies':>10} {'load (s)':>10} {'us/movie':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            filepath = os.path.join(tmp_dir, f"movies_{size}.json")
+            with open(filepath, 'w', encoding='utf-8') as json_file:
+                json.dump(list(generate_movie_dicts(size, templates)), json_file, indent=2, ensure_ascii=False)
+            seconds = bench_load(filepath)
+            print(f"{size:>10} {seconds:>10.3f} {seconds / size * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Memory used by the Movie objects of synthetic catalogs of increasing size.
+
+The movies are built from the same dicts twice: once with an entity table sharing
+the people, organizations and genres between movies, as the catalog loaders do, and
+once with new objects for every movie. The memory allocated while building them is
+measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.bench_model_memory [--sizes 250 10000 100000]
+"""
+
+import argparse
+import json
+import tracemalloc
+from typing import List, Optional
+
+from src.models.entity_table import EntityTable
+from src.models.movie import Movie
+from benchmarks.synthetic import generate_movie_dicts, load_templates
+
+DEFAULT_SIZES = [250, 10000, 100000]
+
+
+def measure_movies(records: List[dict], entities: Optional[EntityTable]) -> int:
+    """ Returns the bytes allocated by the Movie objects built from the movie dicts """
+    tracemalloc.start()
+    movies = [Movie(data, entities) for data in records]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del movies
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="catalog sizes to benchmark")
+    args = parser.parse_args()
+
+    templates = load_templates()
+    print(f"{'movies':>10} {'entities':>10} {'shared (MB)':>12} {'copied (MB)':>12} {'saved':>8}")
+    for size in args.sizes:
+        # Every movie gets its own parsed dict, as if read from a catalog file
+        records = [json.loads(json.dumps(data)) for data in generate_movie_dicts(size, templates)]
+
+        entities = EntityTable()
+        shared = measure_movies(records, entities)
+        copied = measure_movies(records, None)
+        print(f"{size:>10} {len(entities):>10} {shared / 1e6:>12.2f} {copied / 1e6:>12.2f} "
+              f"{1 - shared / copied:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
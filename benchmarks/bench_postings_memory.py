@@ -0,0 +1,60 @@
+"""
+Memory report of the posting lists of the Index on synthetic catalogs of increasing size.
+
+The posting lists are measured as lists of object references (the former List[Movie]
+values of the index), as arrays of unsigned ints and compressed, where lists shorter
+than MIN_COMPRESSED_LENGTH stay arrays. The time
+of intersecting the posting lists of the most common word pairs is reported for the
+arrays and for the compressed lists.
+
+Usage:
+    python -m benchmarks.bench_postings_memory [--sizes 250 10000 100000]
+"""
+
+import argparse
+import time
+
+from src.compressed_postings import CompressedPostings
+from src.index import Index
+from src.utils.posting_utils import intersect_postings, postings_memory_report
+from benchmarks.synthetic import generate_movies, load_templates
+
+DEFAULT_SIZES = [250, 10000, 100000]
+
+# Number of most common words whose pairs are intersected
+NUM_COMMON_WORDS = 20
+
+
+def bench_intersections(postings_lists) -> float:
+    """ Returns the seconds spent intersecting every pair of posting lists """
+    start = time.perf_counter()
+    for first in range(len(postings_lists)):
+        for second in range(first + 1, len(postings_lists)):
+            intersect_postings([postings_lists[first], postings_lists[second]])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="catalog sizes to benchmark")
+    args = parser.parse_args()
+
+    templates = load_templates()
+    print(f"{'movies':>10} {'words':>10} {'postings':>10} {'list (MB)':>10} {'array (MB)':>10} "
+          f"{'compr. (MB)':>11} {'array (ms)':>10} {'compr. (ms)':>11}")
+    for size in args.sizes:
+        index = Index(generate_movies(size, templates))
+        report = postings_memory_report(index.index)
+
+        common_words = sorted(index.index, key=lambda word: len(index.index[word]), reverse=True)[:NUM_COMMON_WORDS]
+        arrays = [index.index[word] for word in common_words]
+        array_seconds = bench_intersections(arrays)
+        compressed_seconds = bench_intersections([CompressedPostings(postings) for postings in arrays])
+
+        print(f"{size:>10} {report['words']:>10} {report['postings']:>10} {report['list_bytes'] / 1e6:>10.2f} "
+              f"{report['array_bytes'] / 1e6:>10.2f} {report['compressed_bytes'] / 1e6:>11.2f} "
+              f"{array_seconds * 1e3:>10.1f} {compressed_seconds * 1e3:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Load test of the HTTP search server with concurrent keep-alive clients.
+
+A mix of requests to every search endpoint, built from the names, people, genres and
+years of movies.json, is sent by a number of concurrent clients, each holding one
+keep-alive connection. The throughput and the latency percentiles are reported.
+
+Unless --port is given, a server is started over a synthetic catalog: in this process,
+or with --processes, as pre-forked processes sharing the index, whose resident (RSS) and
+proportional (PSS, shared pages split between the processes) memory is then reported.
+With --port, an already running server, e.g. `python main.py --serve`, is load tested.
+
+Usage:
+    python -m benchmarks.bench_server [--size 10000] [--connections 1 8 32] [--requests 2000]
+    python -m benchmarks.bench_server --processes 4 [--size 10000] [--connections 1 8 32]
+    python -m benchmarks.bench_server --port 8000 [--connections 1 8 32]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from main import build_databases
+from src.batch import BatchOptions
+from src.index import Index
+from src.search import Search
+from src.server import DEFAULT_HOST, SearchServer, serve_prefork
+from benchmarks.synthetic import generate_movies, load_templates
+
+
+def request_mix(templates: List[dict], count: int, seed: int = 0) -> List[str]:
+    """ Returns request targets spread over the search endpoints """
+    rng = random.Random(seed)
+    names = [template['name'] for template in templates]
+    actors = [actor['name'] for template in templates for actor in template.get('actor', [])]
+    genres = sorted({genre for template in templates for genre in template.get('genre', [])})
+    words = [word for name in names for word in name.lower().split() if len(word) > 3]
+    makers = [
+        lambda: f"/search/general?q={quote(' '.join(rng.sample(words, 2)))}",
+        lambda: f"/search/general?q={quote(rng.choice(words))}&ranked=1&min_rating=7",
+        lambda: f"/search?q={quote(rng.choice(names))}",
+        lambda: f"/search/actor?q={quote(rng.choice(actors))}",
+        lambda: f"/search/genre?q={quote(rng.choice(genres))}",
+        lambda: f"/search/year?q={rng.randint(1950, 2020)}",
+        lambda: f"/search/year?q={rng.randint(195, 201)}0s",
+        lambda: f"/search/title?q={quote(rng.choice(names))}",
+    ]
+    return [rng.choice(makers)() for _ in range(count)]
+
+
+async def _client(host: str, port: int, targets: List[str], latencies: List[float]):
+    """ Sends requests one after the other on a keep-alive connection """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for target in targets:
+            start = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = next(int(line.split(b':')[1]) for line in head.split(b'\r\n')
+                          if line.lower().startswith(b'content-length:'))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def load_test(host: str, port: int, targets: List[str], connections: int) -> Tuple[float, List[float]]:
+    """ Returns the seconds spent sending the requests over concurrent connections, and their latencies """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, targets[number::connections], latencies)
+                           for number in range(connections)))
+    return time.perf_counter() - start, latencies
+
+
+def start_server(size: int, templates: List[dict], workers: int) -> SearchServer:
+    """ Starts a server over a synthetic catalog, its event loop running in a thread """
+    movies = list(generate_movies(size, templates))
+    search = Search(movies, Index(movies), cache_size=0)
+    server = SearchServer(search, build_databases(movies), BatchOptions(), port=0, workers=workers)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    return server
+
+
+def start_prefork_server(size: int, templates: List[dict], processes: int, workers: int) -> Tuple[multiprocessing.Process, int]:
+    """ Starts a pre-forked server over a synthetic catalog in a child process, returns it and its port """
+    movies = list(generate_movies(size, templates))
+    search = Search(movies, Index(movies), cache_size=0)
+    sock = socket.create_server((DEFAULT_HOST, 0))
+    server = multiprocessing.get_context('fork').Process(
+        target=serve_prefork, args=(search, build_databases(movies), BatchOptions(), sock, processes, workers))
+    server.start()
+    port = sock.getsockname()[1]
+    sock.close()
+    return server, port
+
+
+def process_tree_memory(pid: int) -> Optional[Tuple[float, float]]:
+    """ Returns the RSS and PSS in MB summed over a process and its children, None where /proc is missing """
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as children_file:
+            pids += [int(child) for child in children_file.read().split()]
+        rss = pss = 0
+        for process_id in pids:
+            with open(f'/proc/{process_id}/smaps_rollup') as rollup_file:
+                for line in rollup_file:
+                    name, value = line.split()[:2]
+                    if name == 'Rss:':
+                        rss += int(value)
+                    elif name == 'Pss:':
+                        pss += int(value)
+    except OSError:
+        return None
+    return rss / 1024, pss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10000, help="number of synthetic movies served")
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 8, 32],
+                        help="numbers of concurrent connections to benchmark")
+    parser.add_argument('--requests', type=int, default=2000, help="number of requests per run")
+    parser.add_argument('--workers', type=int, default=4, help="number of search threads of each server process")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="number of pre-forked server processes, the server runs in this process when 1")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address of a running server")
+    parser.add_argument('--port', type=int, default=None, help="port of a running server, none starts one")
+    args = parser.parse_args()
+
+    templates = load_templates()
+    host, port = args.host, args.port
+    prefork_server = None
+    if port is None and args.processes > 1:
+        prefork_server, port = start_prefork_server(args.size, templates, args.processes, args.workers)
+        # Wait for the processes to accept connections
+        socket.create_connection((host, port), timeout=60).close()
+    elif port is None:
+        server = start_server(args.size, templates, args.workers)
+        host, port = server.host, server.port
+
+    targets = request_mix(templates, args.requests)
+    print(f"{'connections':>11} {'req/s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for connections in args.connections:
+        seconds, latencies = asyncio.run(load_test(host, port, targets, connections))
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1e3, [50, 95, 99])
+        print(f"{connections:>11} {len(latencies) / seconds:>10.0f} {p50:>10.2f} {p95:>10.2f} {p99:>10.2f}")
+
+    if prefork_server is not None:
+        memory = process_tree_memory(prefork_server.pid)
+        if memory is not None:
+            print(f"server processes: RSS {memory[0]:.1f} MB, PSS {memory[1]:.1f} MB")
+        prefork_server.terminate()
+        prefork_server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+This module generates synthetic movie catalogs for the benchmarks.
+
+Synthetic movies are derived from the movies in movies.json: every generated movie
+copies the structure of a real one, gets a unique url and image, and a name and
+description drawn from the vocabulary of the real catalog.
+"""
+
+import json
+import random
+from typing import Iterator, List
+
+from src.models.entity_table import EntityTable
+from src.models.movie import Movie
+
+DEFAULT_TEMPLATE_FILEPATH = "movies.json"
+
+
+def load_templates(filepath: str = DEFAULT_TEMPLATE_FILEPATH) -> List[dict]:
+    """ Returns the raw movie dicts used as templates for synthetic movies """
+    with open(filepath, 'r') as json_file:
+        return json.load(json_file)
+
+
+def generate_movie_dicts(count: int, templates: List[dict], seed: int = 0) -> Iterator[dict]:
+    """
+    Generate raw movie dicts in the movies.json format.
+
+    Parameters
+    ----------
+    count : int
+        Number of movies to generate.
+    templates : List[dict]
+        Real movie dicts the synthetic movies are derived from.
+    seed : int
+        Seed of the random generator, the same seed yields the same catalog.
+
+    Returns
+    -------
+    Iterator[dict]
+        The generated movie dicts.
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted({word for template in templates
+                         for word in (template.get('description', '') + ' ' + template.get('name', '')).split()})
+
+    for number in range(count):
+        template = templates[number % len(templates)]
+        movie = dict(template)
+        movie['name'] = ' '.join(rng.choices(vocabulary, k=rng.randint(1, 4)))
+        movie['description'] = ' '.join(rng.choices(vocabulary, k=rng.randint(10, 30)))
+        movie['url'] = f"/title/tt{number:08d}/"
+        movie['image'] = f"https://m.media-amazon.com/images/M/MV5B{rng.getrandbits(64):016x}._V1_.jpg"
+        year = rng.randint(1920, 2023)
+        movie['datePublished'] = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        rating = dict(template.get('aggregateRating', {}))
+        rating['ratingValue'] = round(rng.uniform(1, 10), 1)
+        rating['ratingCount'] = rng.randint(1, 3000000)
+        movie['aggregateRating'] = rating
+        yield movie
+
+
+def generate_movies(count: int, templates: List[dict], seed: int = 0) -> Iterator[Movie]:
+    """ Generate synthetic Movie objects sharing their entities, see generate_movie_dicts """
+    entities = EntityTable()
+    for data in generate_movie_dicts(count, templates, seed):
+        yield Movie(data, entities=entities)
@@ -1,4 +1,4 @@
-from src.utils.utils import load_movies_from_json_file
+from src.utils.utils import load_movies_from_json_file, LoadReport
 
 
 def main():
@@ -6,11 +6,16 @@ def main():
     json_filepath = "movies.json"
     
     # Load JSON data from file into Movie objects
-    movies = load_movies_from_json_file(json_filepath)
+    report = LoadReport()
+    movies = load_movies_from_json_file(json_filepath, report)
     
     # Print total number of movies loaded
     print(f"Total {len(movies)} movies loaded from JSON file.")
 
+    # Print the movies that could not be loaded
+    for position, reason in report.errors:
+        print(f"Unable to load movie at position {position}. Error: {reason}")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
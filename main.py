@@ -2,18 +2,31 @@
 This file serves as the driver script to load movies data, build index, and run the search engine.
 """
 
-from src.utils.utils import load_movies_from_json_file
+import time
+
+# Start of the imports, reported by --startup-profile
+_IMPORT_START = time.perf_counter()
+
+from src.utils.utils import iter_movies_from_file, LoadReport
 from src.index import Index
-from src.search import Search
+from src.search import Search, FUZZY_BACKENDS
+from src.utils.search_utils import parse_year, parse_year_range, search_paths
+from src.filter_index import SearchFilters
+from src.query_cache import DEFAULT_CACHE_SIZE
+from src.snapshot import compute_checksum, load_snapshot, save_snapshot
 from src.models.movie import Movie
-from typing import List, Set
-import os
-import certifi
-import nltk
+from src.models.lazy_movie import release_movies
+from src.startup_profile import StartupProfile
+from typing import TYPE_CHECKING, List, Optional, Set, Tuple
+import argparse
 import logging
+import sys
 
-os.environ['SSL_CERT_FILE'] = certifi.where()
-nltk.download('stopwords')
+# The batch and server modules, and asyncio, are only imported by the modes using them
+if TYPE_CHECKING:
+    from src.batch import BatchOptions
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 # Set up logger
 logger = logging.getLogger('movie_search')
@@ -55,38 +68,271 @@ def build_databases(movies: List[Movie]) -> dict:
 
     return {'years': years, 'actors': actors, 'directors': directors, 'creators': creators, 'genres': genres, 'movie_names': movie_names}
 
-def main():
+def load_search_data(json_filepath: str, snapshot_filepath: str, workers: int = 1, compress_postings: bool = False,
+                     profile: Optional[StartupProfile] = None) -> Tuple[List[Movie], Index, dict]:
     """
-    The main driver function of the search program.
+    Load the movies, index and databases from the snapshot if it matches the JSON file,
+    otherwise build them from the JSON file and write a fresh snapshot.
+
+    Movies are kept as LazyMovie proxies into the JSON file, parsed again only when
+    more than their name, year and rating is needed.
+
+    Attributes
+    ----------
+    json_filepath : str
+        path of the JSON or JSON Lines file with the movie catalog
+    snapshot_filepath : str
+        path of the snapshot built from the JSON file
+    workers : int
+        number of worker processes building the index when the snapshot is rebuilt
+    compress_postings : bool
+        whether the index keeps its posting lists compressed, a snapshot built with the
+        other format is rebuilt
+    profile : Optional[StartupProfile]
+        profile the time spent loading and indexing is added to
     """
-    # Load movies from the JSON file
-    movies: List[Movie] = load_movies_from_json_file("movies.json")
+    start = time.perf_counter()
+    checksum = compute_checksum(json_filepath)
+    snapshot = load_snapshot(snapshot_filepath, checksum)
+    if snapshot is not None and snapshot[1].compress_postings == compress_postings:
+        if profile is not None:
+            profile.add('load', time.perf_counter() - start, 'snapshot')
+            profile.add('index', 0.0, 'from snapshot')
+        return snapshot
+
+    # Create index, streaming the movies from the JSON file
+    report = LoadReport()
+    movies_iter = iter_movies_from_file(json_filepath, report, lazy=True)
+    if profile is not None:
+        # Reading the catalog is interleaved with indexing, the time spent reading is counted as load
+        profile.add('load', time.perf_counter() - start, json_filepath)
+        movies_iter = profile.timed_iter('load', movies_iter)
+        load_seconds = profile.timings['load']
+    build_start = time.perf_counter()
+    index: Index = Index(movies_iter, workers, compress_postings)
+    movies: List[Movie] = index.movies
+    logger.info(f"Catalog {json_filepath}: {report}")
+    for position, reason in report.errors:
+        logger.warning(f"Unable to load movie at position {position}. Error: {reason}")
 
     # Build databases
     databases = build_databases(movies)
 
-    # Default configuration
-    num_results: int = 10
-    fuzz_ratio = 70
+    # The parsed movies are no longer needed once everything is built from them
+    release_movies(movies)
+    if profile is not None:
+        reading_seconds = profile.timings['load'] - load_seconds
+        profile.add('index', time.perf_counter() - build_start - reading_seconds)
+
+    save_start = time.perf_counter()
+    try:
+        save_snapshot(snapshot_filepath, checksum, movies, index, databases)
+    except OSError as e:
+        logger.warning(f"Unable to write snapshot {snapshot_filepath}. Error: {e}")
+    if profile is not None:
+        profile.add('save snapshot', time.perf_counter() - save_start)
+
+    return movies, index, databases
+
+def parse_args():
+    """
+    Parse the command-line options of the search program.
+    """
+    parser = argparse.ArgumentParser(description="Command-line movie search engine.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes building the index (default is 1, a serial build)")
+    parser.add_argument('--compress-postings', action='store_true',
+                        help="keep the posting lists of the index delta and varint encoded to save memory")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"number of general search results kept in the cache (default is {DEFAULT_CACHE_SIZE}, 0 disables it)")
+    parser.add_argument('--cache-ttl', type=float, default=None,
+                        help="seconds a cached search result stays valid (default is no expiry)")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="report the import, load, index and first query times to standard error")
+    parser.add_argument('--num-results', type=int, default=10,
+                        help="number of movies displayed per search (default is 10)")
+    parser.add_argument('--fuzz-ratio', type=int, default=70,
+                        help="minimum similarity ratio of the fuzzy search (default is 70)")
+    parser.add_argument('--ranked', action='store_true',
+                        help="rank general search results by relevance (BM25)")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="run the queries of a file, one per line, '-' for standard input, and exit")
+    parser.add_argument('--batch-output', metavar='FILE', default='-',
+                        help="file the JSON line of every batch query is written to (default is standard output)")
+    parser.add_argument('--batch-workers', type=int, default=1,
+                        help="number of worker processes running the batch queries (default is 1)")
+    parser.add_argument('--serve', action='store_true',
+                        help="serve the searches as an HTTP JSON API instead of prompting for queries")
+    # The server defaults apply when these are None, src.server is only imported by --serve
+    parser.add_argument('--host', default=None,
+                        help="address the search server listens on (default is 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=None,
+                        help="port the search server listens on (default is 8000)")
+    parser.add_argument('--server-workers', type=int, default=None,
+                        help="number of threads running the general searches of the server (default is 4)")
+    parser.add_argument('--server-processes', type=int, default=1,
+                        help="number of forked processes serving requests, sharing a single copy of the index (default is 1)")
+    return parser.parse_args()
+
+def read_filters() -> SearchFilters:
+    """
+    Prompt for the filters of the general search, a blank answer leaves a filter unset.
+    """
+    print("\n***Filters Menu***")
+    min_rating_input = input("\nMinimum rating, e.g. 8 (blank for any): ").strip()
+    year_range = parse_year_range(input("\nYears, e.g. 1994, 1990-1999, 1990s or >=2010 (blank for any): "))
+    genres_input = input("\nGenres, comma separated, e.g. Action, Drama (blank for any): ")
+    content_ratings_input = input("\nContent ratings, comma separated, e.g. PG, PG-13 (blank for any): ")
+    max_duration_input = input("\nMaximum duration in minutes, e.g. 120 (blank for any): ").strip()
+
+    try:
+        min_rating = float(min_rating_input) if min_rating_input else None
+    except ValueError:
+        min_rating = None
+    min_year, max_year = year_range if year_range is not None else (None, None)
+    return SearchFilters(min_rating=min_rating, min_year=min_year, max_year=max_year,
+                         max_duration=int(max_duration_input) if max_duration_input.isdigit() else None,
+                         genres=genres_input.split(','), content_ratings=content_ratings_input.split(','))
+
+def run_batch_queries(queries_filepath: str, output_filepath: str, search: Search, databases: dict,
+                      options: 'BatchOptions', workers: int):
+    """
+    Run the queries of a file, one per line, and write the JSON line report of each of them.
+
+    Attributes
+    ----------
+    queries_filepath : str
+        path of the file with the queries, '-' for standard input
+    output_filepath : str
+        path of the file the reports are written to, '-' for standard output
+    search : Search
+        the search engine
+    databases : dict
+        the category databases used to route queries
+    options : BatchOptions
+        the settings of the searches
+    workers : int
+        number of worker processes running the queries
+    """
+    from src.batch import run_batch
+
+    queries_file = sys.stdin if queries_filepath == '-' else open(queries_filepath, 'r', encoding='utf-8')
+    output_file = sys.stdout if output_filepath == '-' else open(output_filepath, 'w', encoding='utf-8')
+    try:
+        start = time.perf_counter()
+        count = run_batch(queries_file, output_file, search, databases, options, workers)
+        logger.info(f"Batch of {count} queries run in {time.perf_counter() - start:.3f} s.")
+    finally:
+        if queries_file is not sys.stdin:
+            queries_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+def serve_searches(search: Search, databases: dict, options: 'BatchOptions', host: Optional[str] = None,
+                   port: Optional[int] = None, workers: Optional[int] = None, processes: int = 1):
+    """
+    Serve the searches as an HTTP JSON API until interrupted, from several forked processes when processes > 1.
 
-    # Create index
-    index: Index = Index(movies)
+    Attributes
+    ----------
+    search : Search
+        the search engine
+    databases : dict
+        the category databases used to route queries
+    options : BatchOptions
+        the settings of the searches when a request does not set them
+    host : Optional[str]
+        address the server listens on, DEFAULT_HOST of src.server when None
+    port : Optional[int]
+        port the server listens on, DEFAULT_PORT of src.server when None
+    workers : Optional[int]
+        number of threads running the general searches of each process, DEFAULT_WORKERS of src.server when None
+    processes : int
+        number of processes serving requests
+    """
+    import asyncio
+    import socket
+    from src.server import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_WORKERS, SearchServer, serve_prefork
+
+    host = DEFAULT_HOST if host is None else host
+    port = DEFAULT_PORT if port is None else port
+    workers = DEFAULT_WORKERS if workers is None else workers
+    if processes > 1:
+        with socket.create_server((host, port)) as sock:
+            print(f"[INFO] Serving searches on http://{host}:{port} with {processes} processes, press Ctrl+C to stop.")
+            serve_prefork(search, databases, options, sock, processes, workers)
+        return
+
+    server = SearchServer(search, databases, options, host, port, workers)
+    print(f"[INFO] Serving searches on http://{host}:{port}, press Ctrl+C to stop.")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Search server stopped.")
+
+def main():
+    """
+    The main driver function of the search program.
+    """
+    args = parse_args()
+    profile = StartupProfile() if args.startup_profile else None
+    if profile is not None:
+        profile.add('import', _IMPORT_SECONDS)
+
+    # Load movies, databases and index, from the snapshot when it is up to date
+    movies, index, databases = load_search_data("movies.json", "movies.snapshot", args.workers, args.compress_postings,
+                                                profile)
+
+    # Default configuration
+    num_results: int = args.num_results
+    fuzz_ratio = args.fuzz_ratio
+    ranked = args.ranked
+    filters = SearchFilters()
 
     # Create search engine using the index
-    search = Search(movies, index)
+    search = Search(movies, index, cache_size=args.cache_size, cache_ttl=args.cache_ttl)
+
+    if args.batch is not None:
+        from src.batch import BatchOptions
+        run_batch_queries(args.batch, args.batch_output, search, databases,
+                          BatchOptions(num_results, fuzz_ratio, ranked), args.batch_workers)
+        return
+
+    if args.serve:
+        from src.batch import BatchOptions
+        serve_searches(search, databases, BatchOptions(num_results, fuzz_ratio, ranked), args.host, args.port,
+                       args.server_workers, args.server_processes)
+        return
     
     print("\n[INFO] Type 'exit' to quit the program.")
     print("[INFO] Type '--configure' to open the configuration menu.")
+    print("[INFO] Type '--cache-stats' to show the search cache counters.")
+    print("[INFO] Type '--filters' to restrict general searches by rating, year, genre, content rating or duration.")
 
     # Keep the search running until the user wants to exit
     while True:
         query: str = input("\nEnter your search query: ").strip()
+        query_start = time.perf_counter()
 
         # If the query is 'exit', break the loop
         if query.lower() == "exit":
             logger.info("Exiting the program.")
             break
 
+        # If the query is '--cache-stats', show the search cache counters
+        elif query.lower() == '--cache-stats':
+            print("\n***Search Cache***")
+            for name, value in search.cache.stats().items():
+                print(f"{name}: {value}")
+            continue
+
+        # If the query is '--filters', set the filters of the general search
+        elif query.lower() == '--filters':
+            logger.info("Entering filters mode.")
+            filters = read_filters()
+            print(f"\nFilters set to: {filters}")
+            continue
+
         # If the query is '--configure', open the configuration menu
         elif query.lower() == '--configure':
             logger.info("Entering configuration mode.")
@@ -99,6 +345,14 @@ def main():
             fuzz_ratio = int(fuzz_ratio_input) if fuzz_ratio_input.isdigit() else fuzz_ratio
             print(f"\nFuzz ratio set to {fuzz_ratio}")
 
+            ranked_input = input("\nRank general search results by relevance (BM25)? Enter 'y' for yes, 'n' for no: ")
+            ranked = ranked_input.lower() == 'y'
+            print(f"\nRanked search {'enabled' if ranked else 'disabled'}")
+
+            fuzzy_backend_input = input("\nFuzzy search backend, 'vocabulary' (typos in words) or 'titles' (similar titles): ").strip().lower()
+            search.fuzzy_backend = fuzzy_backend_input if fuzzy_backend_input in FUZZY_BACKENDS else search.fuzzy_backend
+            print(f"\nFuzzy search backend set to {search.fuzzy_backend}")
+
             debug_mode_input = input("\nTurn debug mode on? Enter 'y' for yes, 'n' for no: ")
             if debug_mode_input.lower() == 'y':
                 search.logger.setLevel(logging.DEBUG)
@@ -107,37 +361,48 @@ def main():
                 search.logger.setLevel(logging.INFO)
                 print("\nLogger set to info mode.")
 
-        # Check all conditions individually instead of using elif to display all relevant details
-        if query in databases['movie_names']:
+        # Run every search the query is routed to, to display all relevant details
+        paths = search_paths(query, databases)
+        if 'movie_name' in paths:
             logger.info(f"Performing search by movie name for movie: {query}.")
             search.search_by_movie_name(query, num_results)
 
-        if query.isnumeric() and int(query) in databases['years']:
+        if 'year' in paths:
             logger.info(f"Performing search by year for year: {query}.")
-            search.search_by_year(int(query), num_results)
+            search.search_by_year(parse_year(query), num_results)
+
+        # A range of years such as 1990-1999, 1990s or >=2010
+        if 'year_range' in paths:
+            logger.info(f"Performing search by year range for years: {query}.")
+            search.search_by_year_range(*parse_year_range(query), num_results)
 
-        if query in databases['actors']:
+        if 'actor' in paths:
             logger.info(f"Performing search by actor for actor: {query}.")
             search.search_by_actor(query, num_results)
 
-        if query in databases['directors']:
+        if 'director' in paths:
             logger.info(f"Performing search by director for director: {query}.")
             search.search_by_director(query, num_results)
 
-        if query in databases['creators']:
+        if 'creator' in paths:
             logger.info(f"Performing search by creator for creator: {query}.")
             search.search_by_creator(query, num_results)
 
-        if query in databases['genres']:
+        if 'genre' in paths:
             logger.info(f"Performing search by genre for genre: {query}.")
             search.search_by_genre(query, num_results)
         
         # Perform general search if no prior conditions matched
-        if not any([query in databases[key] for key in databases.keys()]):
+        if 'general' in paths:
             logger.info(f"Performing general search for query: {query}.")
-            search.general_search(query, fuzz_ratio, num_results)
+            search.general_search(query, fuzz_ratio, num_results, ranked, filters)
 
         print("____________________________________________________________")
 
+        # The first search is reported along with the start-up, commands are not timed
+        if profile is not None and 'first query' not in profile and not query.startswith('--'):
+            profile.add('first query', time.perf_counter() - query_start)
+            profile.report()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+This module runs search queries without user interaction and reports each of them as a JSON line.
+
+Queries are routed to the same searches as in the interactive program, but the results
+are collected instead of printed, with the time spent in every search. Large batches
+are spread over a pool of worker processes sharing the built index.
+"""
+
+import json
+import multiprocessing
+import time
+from typing import Iterable, List, Optional, TextIO
+
+from src.filter_index import SearchFilters
+from src.search import Search
+from src.utils.search_utils import parse_year, parse_year_range, search_paths
+
+# Fields of the index searched by the paths looking up a single field
+_FIELD_PATHS = {'movie_name': 'name', 'actor': 'actors', 'director': 'directors', 'creator': 'creators',
+                'genre': 'genres'}
+
+# Number of queries sent to a worker process at a time
+DEFAULT_CHUNK_SIZE = 64
+
+
+class BatchOptions:
+    """
+    A class used to represent the settings shared by every query of a batch.
+
+    Attributes
+    ----------
+    num_results : int
+        the number of movies returned per search
+    fuzz_ratio : int
+        the minimum similarity ratio of the fuzzy search
+    ranked : bool
+        whether the general search ranks its results by BM25
+    filters : Optional[SearchFilters]
+        the filters of the general search
+    """
+
+    def __init__(self, num_results: int = 10, fuzz_ratio: int = 70, ranked: bool = False,
+                 filters: Optional[SearchFilters] = None):
+        self.num_results = num_results
+        self.fuzz_ratio = fuzz_ratio
+        self.ranked = ranked
+        self.filters = filters
+
+
+def _movie_summaries(search: Search, doc_ids: Iterable[int]) -> List[dict]:
+    """
+    Returns the doc ID, name, year and rating of the movies, none of which needs a lazy movie to be parsed.
+    """
+    summaries = []
+    for doc_id in doc_ids:
+        movie = search.index.movies[doc_id]
+        summaries.append({'doc_id': int(doc_id), 'name': movie.name, 'year': movie.year,
+                          'rating': movie.rating_value})
+    return summaries
+
+
+def run_search(search: Search, path: str, query: str, options: BatchOptions) -> dict:
+    """
+    Runs one search of SEARCH_PATHS for a query and returns its results.
+
+    Parameters
+    ----------
+    search : Search
+        The search engine.
+    path : str
+        The search to run, one of SEARCH_PATHS.
+    query : str
+        The stripped search query, a year for 'year' and a range of years for 'year_range'.
+    options : BatchOptions
+        The settings of the search.
+
+    Returns
+    -------
+    dict
+        The movies found; the general search also returns its probable movies, the
+        number of movies found, the searches it ran, the facets and the top rated
+        movies when nothing matched.
+    """
+    index = search.index
+    num_results = options.num_results
+    if path in _FIELD_PATHS:
+        # The search by movie name matches lower-cased names, the other fields any case
+        value = query.lower() if path == 'movie_name' else query
+        return {'movies': _movie_summaries(search, index.lookup_field(_FIELD_PATHS[path], value)[:num_results])}
+    if path == 'year':
+        year = parse_year(query)
+        if year is None:
+            raise ValueError(f"{query!r} is not a year.")
+        return {'movies': _movie_summaries(search, index.lookup_years(year, year, num_results))}
+    if path == 'year_range':
+        years = parse_year_range(query)
+        if years is None:
+            raise ValueError(f"{query!r} is not a range of years.")
+        return {'movies': _movie_summaries(search, index.lookup_years(*years, num_results))}
+
+    results = search.find_general_results(query, options.fuzz_ratio, num_results, options.ranked, options.filters)
+    general = {
+        'movies': _movie_summaries(search, results.match_ids),
+        'probable_movies': _movie_summaries(search, results.probable_match_ids),
+        'total_found': results.total_found,
+        'ranked': results.ranked,
+        'searches': results.path_counts,
+        'facets': results.facets,
+    }
+    if results.total_found == 0:
+        # The interactive program suggests the top rated movies instead
+        general['top_rated'] = _movie_summaries(search, results.top_rated_ids)
+    return general
+
+
+def run_query(search: Search, databases: dict, query: str, options: BatchOptions) -> dict:
+    """
+    Runs every search a query is routed to and returns its report.
+
+    Parameters
+    ----------
+    search : Search
+        The search engine.
+    databases : dict
+        The category databases built from the movies.
+    query : str
+        The stripped search query.
+    options : BatchOptions
+        The settings of the searches.
+
+    Returns
+    -------
+    dict
+        The query, the searches that ran, the results of each search and the
+        milliseconds spent in each search and in total.
+    """
+    start = time.perf_counter()
+    paths = search_paths(query, databases)
+    results = {}
+    timings = {}
+    for path in paths:
+        path_start = time.perf_counter()
+        results[path] = run_search(search, path, query, options)
+        timings[path] = round((time.perf_counter() - path_start) * 1e3, 3)
+    timings['total'] = round((time.perf_counter() - start) * 1e3, 3)
+    return {'query': query, 'paths': paths, 'results': results, 'timings_ms': timings}
+
+
+# Search engine of a worker process, inherited from the parent process when it is forked
+_worker_state = None
+
+
+def _init_worker(state: tuple):
+    """
+    Keeps the search engine, databases and options of the batch in the worker process.
+    """
+    global _worker_state
+    _worker_state = state
+
+
+def _run_query_line(query: str) -> str:
+    """
+    Runs a query in a worker process and returns its report as a JSON line.
+    """
+    search, databases, options = _worker_state
+    return json.dumps(run_query(search, databases, query, options), ensure_ascii=False)
+
+
+def run_batch(queries: Iterable[str], output: TextIO, search: Search, databases: dict,
+              options: Optional[BatchOptions] = None, workers: int = 1,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Runs a batch of queries and writes the report of each of them as a JSON line, in input order.
+
+    With more than one worker, the queries are run by a pool of processes. Where the
+    platform supports it the workers are forked, so they share the built index with the
+    parent process instead of receiving a copy.
+
+    Parameters
+    ----------
+    queries : Iterable[str]
+        The queries, one per item; blank queries are skipped.
+    output : TextIO
+        The stream the JSON lines are written to.
+    search : Search
+        The search engine.
+    databases : dict
+        The category databases built from the movies.
+    options : Optional[BatchOptions]
+        The settings of the searches, the defaults when None.
+    workers : int
+        Number of worker processes, the queries run in this process when 1.
+    chunk_size : int
+        Number of queries sent to a worker at a time.
+
+    Returns
+    -------
+    int
+        The number of queries run.
+    """
+    state = (search, databases, options if options is not None else BatchOptions())
+    queries = (query.strip() for query in queries if query.strip())
+
+    count = 0
+    if workers <= 1:
+        _init_worker(state)
+        for query in queries:
+            output.write(_run_query_line(query) + '\n')
+            count += 1
+        return count
+
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in start_methods else None)
+    with context.Pool(workers, initializer=_init_worker, initargs=(state,)) as pool:
+        for line in pool.imap(_run_query_line, queries, chunk_size):
+            output.write(line + '\n')
+            count += 1
+    return count
@@ -0,0 +1,199 @@
+"""
+This module defines the CompressedPostings class, a compact read-only posting list.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, Sequence, Tuple
+
+# Number of doc IDs per block, each block can be decoded on its own
+BLOCK_SIZE = 128
+
+# Shorter posting lists stay arrays: the fixed cost of the compressed objects outweighs the savings
+MIN_COMPRESSED_LENGTH = 16
+
+
+def _encode_varint(value: int, out: bytearray):
+    """
+    Appends an unsigned integer to out, 7 bits per byte with the high bit set on all but the last byte.
+    """
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class CompressedPostings:
+    """
+    A class used to represent a sorted posting list as delta-encoded varints, in blocks with skip data.
+
+    Consecutive doc IDs of a posting list are close to each other, so their differences
+    fit in one or two bytes instead of four. The list is cut into blocks of BLOCK_SIZE doc
+    IDs, each starting with its first doc ID in full. For lists of several blocks, the
+    first doc ID and the byte offset of every block are kept uncompressed as skip data,
+    so that a lookup bisects the first doc IDs and decodes a single block. Intersections
+    only decode the blocks that may contain a candidate.
+
+    Attributes
+    ----------
+    _data : bytes
+        a private attribute holding the varint encoded blocks
+    _block_firsts : Optional[array]
+        a private attribute holding the first doc ID of every block, None for a single block
+    _block_offsets : Optional[array]
+        a private attribute holding the offset in _data of every block, None for a single block
+    _length : int
+        a private attribute holding the number of doc IDs
+
+    Methods
+    -------
+    decode_block(block)
+        Returns the doc IDs of a block.
+    to_array()
+        Returns every doc ID.
+    intersect(doc_ids)
+        Returns the sorted doc IDs that are also in the posting list.
+    nbytes
+        Returns the memory used by the posting list.
+    """
+
+    __slots__ = ('_data', '_block_firsts', '_block_offsets', '_length')
+
+    def __init__(self, doc_ids: Iterable[int]):
+        """
+        Encodes a posting list.
+
+        Parameters
+        ----------
+            doc_ids : Iterable[int]
+                the sorted and unique doc IDs
+        """
+        block_firsts = array('I')
+        block_offsets = array('I')
+        data = bytearray()
+        length = 0
+        previous = 0
+        for doc_id in doc_ids:
+            if length % BLOCK_SIZE == 0:
+                block_firsts.append(doc_id)
+                block_offsets.append(len(data))
+                previous = 0
+            _encode_varint(doc_id - previous, data)
+            previous = doc_id
+            length += 1
+        self._data = bytes(data)
+        self._length = length
+        if len(block_firsts) > 1:
+            self._block_firsts = block_firsts
+            self._block_offsets = block_offsets
+        else:
+            self._block_firsts = None
+            self._block_offsets = None
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self) -> Iterator[int]:
+        for block in range(self.num_blocks):
+            yield from self.decode_block(block)
+
+    def __eq__(self, other):
+        if isinstance(other, CompressedPostings):
+            return self._length == other._length and self._data == other._data
+        return NotImplemented
+
+    @property
+    def num_blocks(self) -> int:
+        """ Returns the number of blocks """
+        if self._block_firsts is None:
+            return 1 if self._length else 0
+        return len(self._block_firsts)
+
+    def _block_bounds(self, block: int) -> Tuple[int, int]:
+        """
+        Returns the start and end offsets of a block in _data.
+        """
+        if self._block_offsets is None:
+            return 0, len(self._data)
+        end = self._block_offsets[block + 1] if block + 1 < len(self._block_offsets) else len(self._data)
+        return self._block_offsets[block], end
+
+    def decode_block(self, block: int) -> array:
+        """
+        Returns the doc IDs of a block.
+        """
+        data = self._data
+        position, end = self._block_bounds(block)
+        doc_ids = array('I')
+        doc_id = 0
+        delta = 0
+        shift = 0
+        while position < end:
+            byte = data[position]
+            position += 1
+            delta |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+            else:
+                doc_id += delta
+                doc_ids.append(doc_id)
+                delta = 0
+                shift = 0
+        return doc_ids
+
+    def to_array(self) -> array:
+        """
+        Returns every doc ID, decoding the whole list.
+        """
+        doc_ids = array('I')
+        for block in range(self.num_blocks):
+            doc_ids.extend(self.decode_block(block))
+        return doc_ids
+
+    def intersect(self, doc_ids: Sequence[int]) -> array:
+        """
+        Returns the doc IDs of a sorted sequence that are also in the posting list.
+
+        The block of every doc ID is found in the skip data, and each block is decoded at
+        most once, only when a doc ID may be in it.
+        """
+        matches = array('I')
+        if not self._length:
+            return matches
+        current_block = -1
+        block_doc_ids = None
+        block_position = 0
+        for doc_id in doc_ids:
+            if self._block_firsts is None:
+                block = 0
+            else:
+                block = bisect_right(self._block_firsts, doc_id, max(current_block, 0)) - 1
+                if block < 0:
+                    continue
+            if block != current_block:
+                current_block = block
+                block_doc_ids = self.decode_block(block)
+                block_position = 0
+            # Doc IDs are sorted, the search in the block resumes where the previous one stopped
+            block_position = bisect_left(block_doc_ids, doc_id, block_position)
+            if block_position < len(block_doc_ids) and block_doc_ids[block_position] == doc_id:
+                matches.append(doc_id)
+        return matches
+
+    @property
+    def nbytes(self) -> int:
+        """ Returns the number of bytes used by the posting list and its skip data """
+        size = sys.getsizeof(self) + sys.getsizeof(self._data)
+        if self._block_firsts is not None:
+            size += sys.getsizeof(self._block_firsts) + sys.getsizeof(self._block_offsets)
+        return size
+
+
+def compress_postings(postings: Sequence[int]):
+    """
+    Returns a posting list as CompressedPostings, or unchanged when it is shorter than MIN_COMPRESSED_LENGTH.
+    """
+    if isinstance(postings, CompressedPostings) or len(postings) < MIN_COMPRESSED_LENGTH:
+        return postings
+    return CompressedPostings(postings)
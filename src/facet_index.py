@@ -0,0 +1,125 @@
+"""
+This module defines the FacetIndex class, which counts the genres, decades and content ratings of a set of movies.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.movie_columns import MISSING
+
+# Names of the facets, in the order they are returned
+FACETS = ('genre', 'decade', 'content_rating')
+
+# Default number of values returned per facet
+DEFAULT_FACET_LIMIT = 10
+
+
+class _Facet:
+    """
+    The values of a facet for every movie, as value IDs into a list of labels.
+
+    A movie has any number of values, stored in compressed sparse row form: the value IDs
+    of the movie with doc ID d are value_ids[offsets[d]:offsets[d + 1]].
+    """
+
+    def __init__(self, labels: List[str], value_ids: np.ndarray, offsets: np.ndarray):
+        self.labels = labels
+        self.value_ids = value_ids
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values_by_doc: Iterable[Sequence[str]]) -> '_Facet':
+        """
+        Builds a facet from the values of each movie, by doc ID. Values are compared
+        case-insensitively and labelled by their first spelling.
+        """
+        labels = []
+        label_ids = {}
+        value_ids = []
+        offsets = [0]
+        for values in values_by_doc:
+            doc_value_ids = []
+            for value in values:
+                label_id = label_ids.get(value.lower())
+                if label_id is None:
+                    label_id = label_ids[value.lower()] = len(labels)
+                    labels.append(value)
+                if label_id not in doc_value_ids:
+                    doc_value_ids.append(label_id)
+            value_ids.extend(doc_value_ids)
+            offsets.append(len(value_ids))
+        return cls(labels, np.asarray(value_ids, dtype=np.int32), np.asarray(offsets, dtype=np.int64))
+
+    def counts(self, doc_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns the number of movies having each value among doc_ids.
+        """
+        starts = self.offsets[doc_ids]
+        lengths = self.offsets[doc_ids + 1] - starts
+        total = int(lengths.sum())
+        # Positions of the value IDs of every movie, laid end to end
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        return np.bincount(self.value_ids[positions], minlength=len(self.labels))
+
+
+class FacetIndex:
+    """
+    A class used to represent the facet values of the movies, used to count them over result sets.
+
+    Each facet stores the value IDs of every movie in flat NumPy arrays indexed by doc ID, so
+    counting the values of a set of movies is a gather of their value IDs and a single
+    bincount, without touching the Movie objects.
+
+    Methods
+    -------
+    counts(doc_ids, limit)
+        Returns the most frequent values of every facet among a set of movies.
+    """
+
+    def __init__(self, genres: Iterable[Sequence[str]] = (), years: Iterable[int] = (),
+                 content_ratings: Iterable[str] = ()):
+        """
+        Builds the facets.
+
+        Parameters
+        ----------
+            genres : Iterable[Sequence[str]]
+                the genres of each movie, by doc ID
+            years : Iterable[int]
+                the published year of each movie, by doc ID, MISSING when unknown
+            content_ratings : Iterable[str]
+                the content rating of each movie, by doc ID
+        """
+        self._facets = {
+            'genre': _Facet.from_values(genres),
+            'decade': _Facet.from_values([f"{year // 10 * 10}s"] if year != MISSING else [] for year in years),
+            'content_rating': _Facet.from_values([rating] if rating else [] for rating in content_ratings),
+        }
+
+    def counts(self, doc_ids, limit: Optional[int] = DEFAULT_FACET_LIMIT) -> Dict[str, List[Tuple[str, int]]]:
+        """
+        Returns the values of every facet among a set of movies with their number of movies.
+
+        Parameters
+        ----------
+        doc_ids : array-like
+            the doc IDs of the movies, each movie counted once per value it has
+        limit : Optional[int]
+            the number of values returned per facet, all of them when None
+
+        Returns
+        -------
+        Dict[str, List[Tuple[str, int]]]
+            a dictionary containing each facet of FACETS mapped to its values and counts,
+            from the most frequent value, ties in label order
+        """
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        facets = {}
+        for name in FACETS:
+            facet = self._facets[name]
+            counts = facet.counts(doc_ids)
+            value_ids = np.flatnonzero(counts)
+            order = sorted(value_ids.tolist(), key=lambda value_id: (-counts[value_id], facet.labels[value_id]))
+            facets[name] = [(facet.labels[value_id], int(counts[value_id])) for value_id in order[:limit]]
+        return facets
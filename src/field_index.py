@@ -0,0 +1,145 @@
+"""
+This module defines the FieldIndex class, the per-field postings kept by the Index.
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import List
+
+from src.shared_arena import PackedPostings, SharedArena
+from src.trigram_index import TrigramIndex
+
+# Separates the values in the vocabulary buffer, queries never contain it
+_SEPARATOR = '\x00'
+
+
+class FieldIndex:
+    """
+    A class used to represent the postings of a single movie field, such as actors or genres.
+
+    Every distinct lower-cased value of the field (a person name, a genre, a title...) is
+    mapped to the sorted doc IDs of the movies having it. The distinct values also form a
+    term dictionary, so that substring queries are answered from the dictionary instead of
+    walking every movie: a trigram index over the values narrows down the candidates, and
+    queries too short for trigrams use str.find over the values stored as a single buffer.
+
+    Attributes
+    ----------
+    values : Dict[str, array]
+        a dictionary containing lower-cased field values mapped to the sorted doc IDs of the movies having them
+    _vocabulary : str
+        a private attribute holding every distinct value, each one followed by a separator
+    _offsets : array
+        a private attribute holding the offset of every value in _vocabulary
+    _terms : Sequence[str]
+        a private attribute holding the values in the same order as _offsets
+    _trigrams : TrigramIndex
+        a private attribute holding the trigrams of the values, by position in _terms
+
+    Methods
+    -------
+    add(value, doc_id)
+        Adds a value of a movie to the field postings.
+    extend(other)
+        Appends the postings of a field index built over the following doc IDs.
+    finalize()
+        Builds the term dictionary once all movies are added.
+    matching_terms(query)
+        Returns the values containing the query.
+    lookup(query)
+        Returns the doc IDs of the movies having a value containing the query.
+    share(arena)
+        Moves the postings and the term dictionary into a shared arena.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self._vocabulary = ''
+        self._offsets = array('I')
+        self._terms = []
+        self._trigrams = TrigramIndex()
+
+    def add(self, value: str, doc_id: int):
+        """
+        Adds a value of a movie to the field postings. Movies must be added in doc ID order.
+        """
+        value = value.lower()
+        postings = self.values.get(value)
+        if postings is None:
+            postings = self.values[value] = array('I')
+        if not postings or postings[-1] != doc_id:
+            postings.append(doc_id)
+
+    def extend(self, other: 'FieldIndex'):
+        """
+        Appends the postings of a field index built over the doc IDs following the ones added so far.
+        """
+        for value, doc_ids in other.values.items():
+            postings = self.values.get(value)
+            if postings is None:
+                self.values[value] = doc_ids
+            else:
+                postings.extend(doc_ids)
+
+    def finalize(self):
+        """
+        Builds the term dictionary from the values added so far.
+        """
+        self._terms = list(self.values)
+        self._offsets = array('I')
+        offset = 0
+        for term in self._terms:
+            self._offsets.append(offset)
+            offset += len(term) + len(_SEPARATOR)
+        self._vocabulary = ''.join(term + _SEPARATOR for term in self._terms)
+        self._trigrams = TrigramIndex()
+        for term_number, term in enumerate(self._terms):
+            self._trigrams.add(term_number, term)
+
+    def share(self, arena: SharedArena):
+        """
+        Moves the postings and the term dictionary into a shared arena once finalized,
+        no value can be added afterwards.
+        """
+        self.values = PackedPostings.from_dict(self.values, arena)
+        # The terms are the values in insertion order, which the vocabulary of the postings keeps
+        self._terms = self.values.vocabulary
+        self._offsets = arena.view(self._offsets, 'I')
+        self._trigrams.share(arena)
+
+    def matching_terms(self, query: str) -> List[str]:
+        """
+        Returns the values containing the query as a case-insensitive substring.
+        """
+        query = query.lower()
+        if not self._terms or _SEPARATOR in query:
+            return []
+
+        candidates = self._trigrams.candidates(query)
+        if candidates is not None:
+            return [self._terms[term_number] for term_number in candidates if query in self._terms[term_number]]
+
+        # Short query: scan the buffer, each value is searched at most once as the
+        # search resumes at the next value after a match
+        terms = []
+        position = self._vocabulary.find(query)
+        while position != -1:
+            term_number = bisect_right(self._offsets, position) - 1
+            terms.append(self._terms[term_number])
+            if term_number + 1 == len(self._terms):
+                break
+            position = self._vocabulary.find(query, self._offsets[term_number + 1])
+        return terms
+
+    def lookup(self, query: str) -> array:
+        """
+        Returns the sorted doc IDs of the movies having a value that contains the query
+        as a case-insensitive substring.
+        """
+        terms = self.matching_terms(query)
+        if len(terms) == 1:
+            return self.values[terms[0]]
+        doc_ids = set()
+        for term in terms:
+            doc_ids.update(self.values[term])
+        return array('I', sorted(doc_ids))
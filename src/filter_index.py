@@ -0,0 +1,239 @@
+"""
+This module defines the SearchFilters class, the structured constraints of a search, and the
+FilterIndex class, which answers them with bitmaps over the doc IDs.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.movie_columns import MovieColumns, MISSING
+
+# Width of the buckets of the numeric filters
+RATING_BUCKET_WIDTH = 1
+YEAR_BUCKET_WIDTH = 10
+DURATION_BUCKET_WIDTH = 30
+
+
+class SearchFilters:
+    """
+    A class used to represent the structured filters of a search, combined with AND.
+
+    Bounds are inclusive and None when unbounded. A movie matches the genres or content
+    ratings when it has any of them, they are compared case-insensitively.
+
+    Attributes
+    ----------
+    min_rating, max_rating : Optional[float]
+        the bounds on the rating value
+    min_year, max_year : Optional[int]
+        the bounds on the published year
+    min_duration, max_duration : Optional[int]
+        the bounds on the duration in minutes
+    genres : Tuple[str, ...]
+        the lower-cased genres a movie may have, any genre when empty
+    content_ratings : Tuple[str, ...]
+        the lower-cased content ratings a movie may have, any content rating when empty
+
+    Methods
+    -------
+    is_empty()
+        Returns whether no filter is set.
+    key()
+        Returns a hashable representation of the filters.
+    """
+
+    def __init__(self, min_rating: Optional[float] = None, max_rating: Optional[float] = None,
+                 min_year: Optional[int] = None, max_year: Optional[int] = None,
+                 min_duration: Optional[int] = None, max_duration: Optional[int] = None,
+                 genres: Iterable[str] = (), content_ratings: Iterable[str] = ()):
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        self.min_year = min_year
+        self.max_year = max_year
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.genres = tuple(sorted({genre.strip().lower() for genre in genres if genre.strip()}))
+        self.content_ratings = tuple(sorted({rating.strip().lower() for rating in content_ratings if rating.strip()}))
+
+    def key(self) -> tuple:
+        """
+        Returns a hashable representation of the filters, used in cache keys.
+        """
+        return (self.min_rating, self.max_rating, self.min_year, self.max_year,
+                self.min_duration, self.max_duration, self.genres, self.content_ratings)
+
+    def is_empty(self) -> bool:
+        """
+        Returns whether no filter is set.
+        """
+        bounds = (self.min_rating, self.max_rating, self.min_year, self.max_year, self.min_duration, self.max_duration)
+        return all(bound is None for bound in bounds) and not self.genres and not self.content_ratings
+
+    def __str__(self):
+        parts = []
+        for name, low, high in (('rating', self.min_rating, self.max_rating),
+                                ('year', self.min_year, self.max_year),
+                                ('duration', self.min_duration, self.max_duration)):
+            if low is not None:
+                parts.append(f"{name} >= {low}")
+            if high is not None:
+                parts.append(f"{name} <= {high}")
+        if self.genres:
+            parts.append(f"genre in {{{', '.join(self.genres)}}}")
+        if self.content_ratings:
+            parts.append(f"content rating in {{{', '.join(self.content_ratings)}}}")
+        return ', '.join(parts) if parts else 'none'
+
+
+class _BucketedDocIds:
+    """
+    The doc IDs of the movies with a value of a numeric column, ordered by the bucket of a fixed width the value falls in.
+
+    The doc IDs of every bucket are a slice of the sorted doc IDs, so the buckets a range
+    covers are a single slice, whatever their number, and only the doc IDs of the buckets
+    at the edges of the range are compared with their values. The doc IDs take one integer
+    per movie, instead of a bitmap per bucket.
+    """
+
+    def __init__(self, values: np.ndarray, valid: np.ndarray, width: int):
+        self.values = values
+        self.width = width
+        # Integer buckets end one unit before the next bucket starts
+        self.step = 1 if np.issubdtype(values.dtype, np.integer) else 0
+        doc_ids = np.flatnonzero(valid)
+        buckets = np.floor_divide(values[doc_ids], width).astype(np.float64)
+        order = np.argsort(buckets, kind='stable')
+        # Kept as NumPy index integers, smaller ones are converted on every scatter into a bitmap
+        self.doc_ids = doc_ids[order]
+        # The doc IDs of the bucket number i span doc_ids[starts[i]:starts[i + 1]]
+        self.buckets, starts = np.unique(buckets[order], return_index=True)
+        self.starts = np.append(starts, len(doc_ids))
+
+    def _between(self, first: int, last: int) -> np.ndarray:
+        """ Returns the doc IDs in the buckets first to last, excluded """
+        if first >= last:
+            return self.doc_ids[:0]
+        return self.doc_ids[self.starts[first]:self.starts[last]]
+
+    def range(self, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        """
+        Returns the bitmap of the doc IDs with a value between low and high, both included.
+        """
+        # The buckets overlapping the range, and those it covers
+        first = last = 0
+        end = covered_end = len(self.buckets)
+        if low is not None:
+            first = int(np.searchsorted(self.buckets, np.floor(low / self.width)))
+            last = int(np.searchsorted(self.buckets, np.ceil(low / self.width)))
+        if high is not None:
+            end = int(np.searchsorted(self.buckets, np.floor(high / self.width), side='right'))
+            covered_end = int(np.searchsorted(self.buckets, np.floor((high + self.step) / self.width) - 1,
+                                              side='right'))
+
+        mask = np.zeros(len(self.values), dtype=bool)
+        # The edge buckets are the overlapping ones that are not covered
+        if last < covered_end:
+            mask[self._between(last, covered_end)] = True
+            edges = np.concatenate((self._between(first, last), self._between(covered_end, end)))
+        else:
+            edges = self._between(first, end)
+        if len(edges):
+            values = self.values[edges]
+            keep = np.ones(len(edges), dtype=bool)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            mask[edges[keep]] = True
+        return mask
+
+
+class FilterIndex:
+    """
+    A class used to represent bitmaps of the movies by genre and content rating, and the
+    movies by bucket of rating, year and duration.
+
+    Every bitmap is a NumPy bool array indexed by doc ID, so the filters of a search are
+    combined with a few vectorized ANDs and ORs, and candidate doc IDs are filtered by
+    indexing the resulting bitmap. The numeric ranges are turned into bitmaps from the
+    doc IDs sorted by bucket.
+
+    Attributes
+    ----------
+    num_docs : int
+        the number of movies
+    genres : Dict[str, np.ndarray]
+        a dictionary containing lower-cased genres mapped to the bitmap of their movies
+    content_ratings : Dict[str, np.ndarray]
+        a dictionary containing lower-cased content ratings mapped to the bitmap of their movies
+
+    Methods
+    -------
+    bitmap(filters)
+        Returns the bitmap of the movies matching the filters.
+    """
+
+    def __init__(self, columns: Optional[MovieColumns] = None, genre_postings: Optional[Dict[str, Iterable[int]]] = None,
+                 content_ratings: Optional[List[str]] = None):
+        """
+        Builds the bitmaps.
+
+        Parameters
+        ----------
+            columns : MovieColumns
+                the finalized numeric columns of the movies
+            genre_postings : Dict[str, Iterable[int]]
+                a dictionary containing lower-cased genres mapped to the doc IDs of their movies
+            content_ratings : List[str]
+                the content rating of each movie, by doc ID
+        """
+        if columns is None:
+            columns = MovieColumns()
+            columns.finalize()
+        self.num_docs = len(columns)
+        self.genres = {}
+        for genre, doc_ids in (genre_postings or {}).items():
+            bitmap = np.zeros(self.num_docs, dtype=bool)
+            bitmap[np.asarray(doc_ids, dtype=np.int64)] = True
+            self.genres[genre] = bitmap
+
+        self.content_ratings = {}
+        content_ratings = np.array([(rating or '').lower() for rating in content_ratings or ()], dtype=object)
+        for rating in set(content_ratings):
+            if rating:
+                self.content_ratings[rating] = content_ratings == rating
+
+        self._ratings = _BucketedDocIds(columns.ratings, ~np.isnan(columns.ratings), RATING_BUCKET_WIDTH)
+        self._years = _BucketedDocIds(columns.years, columns.years != MISSING, YEAR_BUCKET_WIDTH)
+        self._durations = _BucketedDocIds(columns.durations, columns.durations != MISSING, DURATION_BUCKET_WIDTH)
+
+    def _union(self, bitmaps: Dict[str, np.ndarray], names: Tuple[str, ...]) -> np.ndarray:
+        """
+        Returns the union of the bitmaps of some names, unknown names match no movie.
+        """
+        mask = np.zeros(self.num_docs, dtype=bool)
+        for name in names:
+            bitmap = bitmaps.get(name)
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def bitmap(self, filters: Optional[SearchFilters]) -> Optional[np.ndarray]:
+        """
+        Returns the bitmap of the movies matching every filter, or None when no filter is set.
+        """
+        if filters is None or filters.is_empty():
+            return None
+
+        mask = np.ones(self.num_docs, dtype=bool)
+        if filters.genres:
+            mask &= self._union(self.genres, filters.genres)
+        if filters.content_ratings:
+            mask &= self._union(self.content_ratings, filters.content_ratings)
+        for column, low, high in ((self._ratings, filters.min_rating, filters.max_rating),
+                                  (self._years, filters.min_year, filters.max_year),
+                                  (self._durations, filters.min_duration, filters.max_duration)):
+            if low is not None or high is not None:
+                mask &= column.range(low, high)
+        return mask
@@ -0,0 +1,128 @@
+"""
+This module defines the FuzzyIndex class, which finds the index words close to a misspelled word.
+"""
+
+from array import array
+from typing import Iterable, List, Set
+
+from src.shared_arena import PackedPostings, SharedArena, SharedVocabulary
+
+# Highest edit distance supported by the deletion dictionary
+DEFAULT_MAX_DISTANCE = 2
+
+# Only the first characters of a word are used to generate deletions
+DEFAULT_PREFIX_LENGTH = 7
+
+
+class FuzzyIndex:
+    """
+    A class used to represent a symmetric deletion (SymSpell) dictionary over the index vocabulary.
+
+    Every word is stored under each string obtained by deleting up to max_distance characters
+    from its prefix. Two words within max_distance edits of each other share at least one
+    such deletion, so the candidates of a misspelled word are found with a few dictionary
+    lookups instead of comparing it with the whole vocabulary. The candidates are then
+    verified with the real edit distance.
+
+    Attributes
+    ----------
+    max_distance : int
+        the highest edit distance a lookup can use
+    prefix_length : int
+        the number of leading characters of a word deletions are generated from
+    words : List[str]
+        the words of the dictionary, by word number
+    deletes : Dict[str, array]
+        a dictionary containing deletions mapped to the numbers of the words producing them
+
+    Methods
+    -------
+    add(word)
+        Adds a word to the dictionary.
+    lookup(word, max_distance)
+        Returns the words within max_distance edits of a word.
+    share(arena)
+        Moves the words and deletions into a shared arena.
+    """
+
+    def __init__(self, words: Iterable[str] = (), max_distance: int = DEFAULT_MAX_DISTANCE,
+                 prefix_length: int = DEFAULT_PREFIX_LENGTH):
+        """
+        Constructs the dictionary.
+
+        Parameters
+        ----------
+            words : Iterable[str]
+                the words to add to the dictionary
+            max_distance : int
+                the highest edit distance a lookup can use
+            prefix_length : int
+                the number of leading characters of a word deletions are generated from
+        """
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = []
+        self.deletes = {}
+        for word in words:
+            self.add(word)
+
+    def _generate_deletes(self, word: str, max_distance: int) -> Set[str]:
+        """
+        Returns the strings obtained by deleting up to max_distance characters from the prefix of a word,
+        including the prefix itself.
+        """
+        prefix = word[:self.prefix_length]
+        deletes = {prefix}
+        frontier = {prefix}
+        for _ in range(max_distance):
+            frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier for i in range(len(candidate))}
+            deletes |= frontier
+        return deletes
+
+    def add(self, word: str):
+        """
+        Adds a word to the dictionary, words must be distinct.
+        """
+        number = len(self.words)
+        self.words.append(word)
+        for delete in self._generate_deletes(word, self.max_distance):
+            numbers = self.deletes.get(delete)
+            if numbers is None:
+                numbers = self.deletes[delete] = array('I')
+            numbers.append(number)
+
+    def share(self, arena: SharedArena):
+        """
+        Moves the words and deletions into a shared arena, the dictionary can no longer be added to.
+        """
+        self.deletes = PackedPostings.from_dict(self.deletes, arena)
+        self.words = SharedVocabulary(self.words, arena)
+
+    def lookup(self, word: str, max_distance: int) -> List[str]:
+        """
+        Returns the words of the dictionary within max_distance edits of a word, closest first.
+
+        Parameters
+        ----------
+        word : str
+            the possibly misspelled word
+        max_distance : int
+            the highest edit distance allowed, capped to the max_distance of the dictionary
+        """
+        # Imported on first use, only typo tolerant searches need it
+        from rapidfuzz.distance import Levenshtein
+
+        max_distance = min(max_distance, self.max_distance)
+        numbers = set()
+        for delete in self._generate_deletes(word, max_distance):
+            numbers.update(self.deletes.get(delete, ()))
+        candidates = [self.words[number] for number in numbers]
+
+        distances = {}
+        for candidate in candidates:
+            if abs(len(candidate) - len(word)) > max_distance:
+                continue
+            distance = Levenshtein.distance(word, candidate, score_cutoff=max_distance)
+            if distance <= max_distance:
+                distances[candidate] = distance
+        return sorted(distances, key=lambda candidate: (distances[candidate], candidate))
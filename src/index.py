@@ -2,11 +2,74 @@
 This module is responsible for building an index from movie data.
 """
 
-from collections import defaultdict
-from src.models.movie import Movie
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import uuid
+from src.field_index import FieldIndex
+from src.fuzzy_index import FuzzyIndex
+from src.compressed_postings import CompressedPostings, compress_postings
+from src.facet_index import FacetIndex
+from src.json_corpus import JsonCorpus
+from src.filter_index import FilterIndex
+from src.movie_columns import MovieColumns
+from src.shared_arena import PackedPostings, PackedValues, SharedArena, SharedVocabulary
+from src.stopwords import ENGLISH_STOP_WORDS
+from src.models.movie import Movie, compact_json
 import string
-from typing import List, Dict
-from nltk.corpus import stopwords
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Union
+import numpy as np
+
+# Number of movies indexed by a worker process at a time in a parallel build
+DEFAULT_SHARD_SIZE = 5000
+
+# Term frequencies are stored as unsigned shorts and saturate at this value
+MAX_TERM_FREQ = 0xFFFF
+
+# Fields of a movie added to the inverted index, in indexing order
+INDEXED_FIELDS = ('name', 'description', 'actors', 'directors', 'creators', 'genres',
+                  'duration', 'image', 'url', 'date_published', 'type')
+
+# Fields of a movie with their own postings, used by the search by field
+FIELDS = ('name', 'actors', 'directors', 'creators', 'genres', 'description')
+
+
+def movie_field_values(movie: Movie) -> Dict[str, List[str]]:
+    """
+    Returns the values of every field in FIELDS for a movie.
+    """
+    return {
+        'name': [movie.name],
+        'actors': [actor.name for actor in movie.actors],
+        'directors': [director.name for director in movie.directors],
+        'creators': [creator.name for creator in movie.creators if creator.name],
+        'genres': [genre.name for genre in movie.genres],
+        'description': [movie.description],
+    }
+
+
+def movie_field_texts(movie: Movie) -> Tuple[str, ...]:
+    """
+    Returns the space-separated words representation of every field in INDEXED_FIELDS for a movie.
+
+    rating, content_rating and trailer are not indexed.
+    """
+    return (
+        movie.name,
+        movie.description,
+        ' '.join([actor.name for actor in movie.actors]),
+        ' '.join([director.name for director in movie.directors]),
+        ' '.join([creator.name for creator in movie.creators]),
+        ' '.join([genre.name for genre in movie.genres]),
+        movie.duration,
+        movie.image,
+        movie.url,
+        str(movie.date_published),
+        movie.type,
+    )
+
 
 class Index:
     """
@@ -15,35 +78,123 @@ class Index:
     Attributes
     ----------
     movies : List[Movie]
-        a list of Movie objects to be indexed
-    index : Dict[str, List[Movie]]
-        a dictionary containing words mapped to movies where they appear
+        a list of Movie objects to be indexed, the position of a movie in the list is its doc ID
+    index : Dict[str, array]
+        a dictionary containing words mapped to the sorted doc IDs of the movies where they appear,
+        the longer lists are CompressedPostings once finalized when compress_postings is set
+    compress_postings : bool
+        whether the posting lists are delta and varint encoded once the index is built
+    term_freqs : Dict[str, array]
+        a dictionary containing words mapped to their number of occurrences in each movie of their posting list
+    doc_lengths : array
+        the number of indexed words of each movie, by doc ID
+    avg_doc_length : float
+        the average number of indexed words of a movie
+    min_doc_length : int
+        the smallest number of indexed words of a movie
+    max_term_freqs : Dict[str, int]
+        a dictionary containing words mapped to their highest number of occurrences in a movie
+    field_index : Dict[str, FieldIndex]
+        a dictionary containing each field of FIELDS mapped to the postings of its values
+    fuzzy_index : FuzzyIndex
+        a deletion dictionary over the alphabetic words of the index, used for typo tolerance
+    json_corpus : JsonCorpus
+        the lower-cased raw JSON of every movie in a single buffer, searched by the JSON substring search
+    normalized_titles : List[str]
+        the lower-cased name of each movie, by doc ID
+    columns : MovieColumns
+        the rating, rating count, year and duration of each movie as NumPy arrays, by doc ID
+    genre_rating_orders : Dict[str, np.ndarray]
+        a dictionary containing lower-cased genres mapped to the doc IDs of their movies in rating order
+    filter_index : FilterIndex
+        bitmaps of the movies by genre, content rating and numeric range, used by search filters
+    facet_index : FacetIndex
+        the genres, decade and content rating of each movie, used to count them over search results
+    version : str
+        a token that changes every time the index is finalized, used to invalidate cached results
     year_index : Dict[int, List[Movie]]
         a dictionary containing years mapped to movie names from that year
-    stop_words : set
+    year_keys : array
+        the sorted years of year_index, searched with bisect by year range queries
+    stop_words : frozenset
         a set of commonly used words in English to be filtered out
 
     Methods
     -------
-    build_index()
-        Builds the inverted index from the movie data.
+    build_index(movies, workers)
+        Builds the inverted index from the movie data, in parallel when workers > 1.
+    finalize()
+        Computes the statistics, term dictionaries and fuzzy dictionary once all movies are indexed.
+    index_movie(movie, doc_id)
+        Adds the words of every indexed field of a movie to the inverted index.
+    tokenize(text)
+        Splits a text into index terms.
+    get_postings(word)
+        Returns the sorted doc IDs of the movies containing a word.
+    get_decoded_postings(word)
+        Returns the sorted doc IDs of the movies containing a word as an array.
+    get_term_freqs(word)
+        Returns the frequencies of a word aligned with its posting list.
+    get_movies(doc_ids)
+        Returns the movies for a sequence of doc IDs.
+    lookup_field(field, query)
+        Returns the sorted doc IDs of the movies with a field value containing the query.
+    lookup_years(start, end, num_results)
+        Returns the doc IDs of the movies released in a range of years, from the highest rating.
+    share(arena)
+        Moves the postings, vocabularies and numeric columns into a shared arena.
     """
-    def __init__(self, movies: List[Movie]):
+    def __init__(self, movies: Iterable[Movie], workers: int = 1, compress_postings: bool = False):
         """
         Constructs all the necessary attributes for the Index object.
 
         Parameters
         ----------
-            movies : List[Movie]
-                a list of Movie objects to be indexed
+            movies : Iterable[Movie]
+                the Movie objects to be indexed, either a list or a generator streaming them from a file
+            workers : int
+                number of worker processes building the index, the build is serial by default
+            compress_postings : bool
+                whether to compress the posting lists once the index is built, which saves
+                memory at the cost of decoding them during searches
         """
-        self.movies = movies
-        self.index = defaultdict(list)
+        self.movies = []
+        self.index = {}
+        self.compress_postings = compress_postings
+        self.term_freqs = {}
+        self.doc_lengths = array('I')
+        self.avg_doc_length = 0.0
+        self.min_doc_length = 0
+        self.max_term_freqs = {}
+        self.field_index = {field: FieldIndex() for field in FIELDS}
+        self.fuzzy_index = FuzzyIndex()
+        self.json_corpus = JsonCorpus()
+        self.normalized_titles = []
+        self.columns = MovieColumns()
+        self.genre_rating_orders = {}
+        self.filter_index = FilterIndex()
+        self.facet_index = FacetIndex()
+        self.version = None
         self.year_index = defaultdict(list)
-        self.stop_words = set(stopwords.words('english')) # set of nltk stop words
-        self.build_index()
+        self.year_keys = array('i')
+        self.stop_words = ENGLISH_STOP_WORDS
+        self.build_index(movies, workers)
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Split a text into the lower-cased words used as index terms, without stop words.
+
+        Parameters
+        ----------
+        text : str
+            space-separated words representation of a field or a query
+        """
+        # Remove punctuation at the end of words
+        text = " ".join(word.rstrip(string.punctuation) for word in text.split())
+
+        return [word for word in text.lower().split() if word not in self.stop_words]
 
-    def index_field(self, field, movie: Movie):
+    def index_field(self, field, doc_id: int) -> int:
         """
         Index a field for a specific movie.
 
@@ -51,97 +202,298 @@ class Index:
         ----------
         field : str
             space-separated words representation of a field
-        movie : Movie
-            movie associated with the field
+        doc_id : int
+            doc ID of the movie associated with the field
+
+        Returns
+        -------
+        int
+            number of words of the field added to the index
         """
-        # Remove punctuation at the end of words
-        field = " ".join(word.rstrip(string.punctuation) for word in field.split())
+        words = self.tokenize(field)
 
-        for word in field.lower().split():
-            if word not in self.stop_words and movie not in self.index[word]:
-                self.index[word].append(movie)
+        for word in words:
+            postings = self.index.get(word)
+            if postings is None:
+                postings = self.index[word] = array('I')
+                self.term_freqs[word] = array('H')
+            # Movies are indexed in doc ID order, so the postings stay sorted and a
+            # repeated word of the same movie can only be the last doc ID appended
+            if not postings or postings[-1] != doc_id:
+                postings.append(doc_id)
+                self.term_freqs[word].append(1)
+            else:
+                term_freqs = self.term_freqs[word]
+                term_freqs[-1] = min(term_freqs[-1] + 1, MAX_TERM_FREQ)
 
-    # Indexing logic for the movie name
-    def index_movie_name(self, movie):
-        self.index_field(movie.name, movie)
+        return len(words)
 
-    # Indexing logic for the movie description
-    def index_movie_description(self, movie):
-        self.index_field(movie.description, movie)
+    def get_postings(self, word: str) -> Union[array, CompressedPostings]:
+        """
+        Returns the sorted doc IDs of the movies containing a word, empty if the word is not indexed.
+        Compressed posting lists are returned as is, to be decoded lazily by intersect_postings.
+        """
+        return self.index.get(word, array('I'))
 
-    # Indexing logic for the movie actors
-    def index_movie_actors(self, movie):
-        self.index_field(' '.join([actor.name for actor in movie.actors]), movie)
+    def get_decoded_postings(self, word: str) -> array:
+        """
+        Returns the sorted doc IDs of the movies containing a word as an array, decoding
+        compressed posting lists, empty if the word is not indexed.
+        """
+        postings = self.get_postings(word)
+        return postings.to_array() if isinstance(postings, CompressedPostings) else postings
 
-    # Indexing logic for movie directors
-    def index_movie_directors(self, movie):
-        self.index_field(' '.join([director.name for director in movie.directors]), movie)
-    
-    # Indexing logic for movie creators
-    def index_movie_creators(self, movie):
-        self.index_field(' '.join([creator.name for creator in movie.creators]), movie)
+    def get_movies(self, doc_ids: Iterable[int]) -> List[Movie]:
+        """
+        Returns the movies for a sequence of doc IDs, in the same order.
+        """
+        return [self.movies[doc_id] for doc_id in doc_ids]
 
-    # Indexing logic for movie genres
-    def index_movie_genres(self, movie):
-        self.index_field(' '.join([genre.name for genre in movie.genres]), movie)
+    def index_movie_by_year(self, movie: Movie):
+        """
+        Adds a movie to the year index based on its published year.
+        """
+        if movie.year:
+            self.year_index[movie.year].append(movie)
 
-    # Indexing logic for movie rating
-    # def index_movie_rating(self, movie):
-    #     self.index_field(movie.rating, movie.name)
+    def index_movie_fields(self, movie: Movie, doc_id: int):
+        """
+        Adds the values of every field of FIELDS of a movie to the field postings.
+        """
+        self.index_field_values(movie_field_values(movie), doc_id)
 
-    # Indexing logic for movie content_rating
-    # def index_movie_content_rating(self, movie):
-    #     self.index_field(movie.content_rating, movie.name)
+    def index_field_values(self, field_values: Dict[str, List[str]], doc_id: int):
+        """
+        Adds the values returned by movie_field_values to the field postings.
+        """
+        for field, values in field_values.items():
+            for value in values:
+                self.field_index[field].add(value, doc_id)
 
-    # Indexing logic for movie duration
-    def index_movie_duration(self, movie):
-        self.index_field(movie.duration, movie)
+    def index_movie_raw_json(self, movie: Movie, doc_id: int):
+        """
+        Adds the lower-cased raw JSON of a movie to the JSON corpus.
 
-    # Indexing logic for movie image
-    def index_movie_image(self, movie):
-        self.index_field(movie.image, movie)
+        The JSON is not trigram indexed: its trigrams would cost several hundred postings
+        per movie, most of the build time and memory, for queries a single scan of the
+        corpus answers. The short fields have their trigrams in their FieldIndex.
+        """
+        # raw_json serializes the movie on every call
+        self.json_corpus.add(movie.raw_json.lower())
 
-    # Indexing logic for movie url
-    def index_movie_url(self, movie):
-        self.index_field(movie.url, movie)
+    def lookup_field(self, field: str, query: str) -> array:
+        """
+        Returns the sorted doc IDs of the movies with a value of the field containing the
+        query as a case-insensitive substring.
+        """
+        return self.field_index[field].lookup(query)
 
-    # Indexing logic for movie date_published
-    def index_movie_date_published(self, movie):
-        self.index_field(str(movie.date_published), movie)
+    def lookup_years(self, start: Optional[int] = None, end: Optional[int] = None,
+                     num_results: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the doc IDs of the movies released between two years, from the highest rating.
 
+        The years of the range are found by bisecting year_keys, and each year already has
+        its movies in rating order, so a single year costs a slice and a range a merge of
+        the rating orders of its years.
 
-    # Indexing logic for movie trailer
-    # def index_movie_trailer(self, movie):
-    #     self.index_field(movie.trailer, movie.name)
+        Parameters
+        ----------
+        start : Optional[int]
+            the first year of the range, included, unbounded if None
+        end : Optional[int]
+            the last year of the range, included, unbounded if None
+        num_results : Optional[int]
+            the number of doc IDs to return, all of them if None
+        """
+        low = bisect_left(self.year_keys, start) if start is not None else 0
+        high = bisect_right(self.year_keys, end) if end is not None else len(self.year_keys)
+        year_orders = [self.columns.top_rated_for_year(year) for year in self.year_keys[low:high]]
+        if not year_orders:
+            return np.empty(0, dtype=np.int64)
+        if len(year_orders) == 1:
+            return year_orders[0][:num_results]
+        return self.columns.sort_by_rating(np.concatenate(year_orders), num_results)
 
-    def index_movie_by_year(self, movie: Movie):
+    def index_movie(self, movie: Movie, doc_id: int):
         """
-        Adds a movie to the year index based on its published year.
+        Adds the words of every indexed field of a movie to the inverted index.
         """
-        if movie.year:
-            self.year_index[movie.year].append(movie)
+        self.index_field_texts(movie_field_texts(movie), doc_id)
+
+    def index_field_texts(self, field_texts: Tuple[str, ...], doc_id: int):
+        """
+        Adds the words of the texts returned by movie_field_texts to the inverted index
+        and records the length of the movie. Must be called once per movie, in doc ID order.
+        """
+        self.doc_lengths.append(sum(self.index_field(field, doc_id) for field in field_texts))
 
-    # Indexing logic for movie type
-    def index_movie_type(self, movie):
-        self.index_field(movie.type, movie)
+    def compute_statistics(self):
+        """
+        Computes the collection statistics used by BM25 ranking once all movies are indexed:
+        the average and minimum movie length and the highest term frequency of every word.
+        """
+        self.avg_doc_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        self.min_doc_length = min(self.doc_lengths) if self.doc_lengths else 0
+        self.max_term_freqs = {word: max(term_freqs) for word, term_freqs in self.term_freqs.items()}
 
-    def build_index(self):
+    def get_term_freqs(self, word: str) -> array:
+        """
+        Returns the frequencies of a word in the movies of its posting list, empty if the word is not indexed.
+        """
+        return self.term_freqs.get(word, array('H'))
+
+    def build_index(self, movies: Iterable[Movie], workers: int = 1, shard_size: int = DEFAULT_SHARD_SIZE):
         """
         Builds the inverted index from the movie data.
+
+        Movies are consumed one at a time, so a generator can be passed to index a
+        catalog without materializing it first. Each movie is appended to the movie
+        store and gets the next doc ID.
+
+        With more than one worker, the movies are split into shards of consecutive doc IDs
+        that are indexed in worker processes. The partial indexes are merged in shard order,
+        which yields the same index as the serial build.
         """
-        for movie in self.movies:
-            self.index_movie_name(movie)
-            self.index_movie_description(movie)
-            self.index_movie_actors(movie)
-            self.index_movie_directors(movie)
-            self.index_movie_creators(movie)
-            self.index_movie_genres(movie)
-            # self.index_movie_rating(movie)
-            # self.index_movie_content_rating(movie)
-            self.index_movie_duration(movie)
-            self.index_movie_image(movie)
-            self.index_movie_url(movie)
-            self.index_movie_date_published(movie)
-            # self.index_movie_trailer(movie)
-            self.index_movie_by_year(movie)
-            self.index_movie_type(movie)
+        # Compressed posting lists are read-only, new movies are appended to decoded ones
+        if self.compress_postings:
+            self.index = {word: self.get_decoded_postings(word) for word in self.index}
+
+        if workers > 1:
+            self.build_index_parallel(movies, workers, shard_size)
+        else:
+            for movie in movies:
+                doc_id = len(self.movies)
+                self.movies.append(movie)
+                self.index_movie(movie, doc_id)
+                self.index_movie_fields(movie, doc_id)
+                self.index_movie_raw_json(movie, doc_id)
+                self.index_movie_by_year(movie)
+                self.columns.add(movie)
+
+        self.finalize()
+
+    def finalize(self):
+        """
+        Computes the structures derived from the postings once all movies are indexed.
+        """
+        self.compute_statistics()
+        if self.compress_postings:
+            self.index = {word: compress_postings(postings) for word, postings in self.index.items()}
+        for field_index in self.field_index.values():
+            field_index.finalize()
+        # Urls, image links, durations and dates are left out, typos only matter in words
+        self.fuzzy_index = FuzzyIndex(word for word in self.index if word.isalpha())
+        self.normalized_titles = [movie.name.lower() for movie in self.movies]
+        self.json_corpus.finalize()
+        self.columns.finalize()
+        self.year_keys = array('i', sorted(self.year_index))
+        self.genre_rating_orders = {genre: self.columns.sort_by_rating(doc_ids)
+                                    for genre, doc_ids in self.field_index['genres'].values.items()}
+        content_ratings = [movie.content_rating for movie in self.movies]
+        self.filter_index = FilterIndex(self.columns, self.field_index['genres'].values, content_ratings)
+        self.facet_index = FacetIndex([[genre.name for genre in movie.genres] for movie in self.movies],
+                                      self.columns.years, content_ratings)
+        self.version = uuid.uuid4().hex
+
+    def share(self, arena: SharedArena):
+        """
+        Moves the postings, term frequencies, vocabularies and numeric columns of the built
+        index into a shared arena, so that the processes forked afterwards read them without
+        copying them. The index is read-only afterwards: no movie can be added.
+
+        Compressed posting lists are decoded, as the arena is shared by every process.
+        """
+        terms = list(self.index)
+        vocabulary = SharedVocabulary(terms, arena)
+        self.index = PackedPostings(vocabulary, self.index.values(), arena)
+        self.term_freqs = PackedPostings(vocabulary, (self.term_freqs[term] for term in terms), arena, 'H')
+        self.max_term_freqs = PackedValues(vocabulary, (self.max_term_freqs[term] for term in terms), arena, 'H')
+        self.doc_lengths = arena.view(self.doc_lengths, 'I')
+        for field_index in self.field_index.values():
+            field_index.share(arena)
+        self.fuzzy_index.share(arena)
+        self.json_corpus.share(arena)
+        self.columns.share(arena)
+        self.year_keys = arena.view(self.year_keys, 'i')
+        self.genre_rating_orders = {genre: arena.ndarray(order) for genre, order in self.genre_rating_orders.items()}
+
+    def build_index_parallel(self, movies: Iterable[Movie], workers: int, shard_size: int = DEFAULT_SHARD_SIZE):
+        """
+        Builds the inverted index from the movie data with a pool of worker processes.
+
+        At most two shards per worker are in flight at a time, so a generator of movies
+        is still consumed incrementally.
+
+        The workers build the token postings, the field postings and the JSON corpus of their
+        shard, which are most of the build. The parent process only stores the movies and
+        fills the year index and the numeric columns.
+        """
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for shard in _split_into_shards(movies, shard_size):
+                first_doc_id = len(self.movies)
+                for movie in shard:
+                    self.movies.append(movie)
+                    self.index_movie_by_year(movie)
+                    self.columns.add(movie)
+                # The worker is sent the texts of the movies instead of the movies, which are much
+                # more expensive to pickle, and the span of their record to read their raw JSON from
+                shard_texts = [(movie_field_texts(movie), movie_field_values(movie), movie.record or movie.raw_json)
+                               for movie in shard]
+                pending.append(executor.submit(_build_shard_index, shard_texts, first_doc_id))
+
+                if len(pending) >= 2 * workers:
+                    self.merge_shard_index(pending.popleft().result())
+
+            while pending:
+                self.merge_shard_index(pending.popleft().result())
+
+    def merge_shard_index(self, shard: 'Index'):
+        """
+        Appends the postings, term frequencies, movie lengths, field postings and JSON texts
+        of a shard to the index.
+
+        Shards must be merged in doc ID order so that the posting lists stay sorted.
+        """
+        for word, postings in shard.index.items():
+            merged = self.index.get(word)
+            if merged is None:
+                self.index[word] = postings
+                self.term_freqs[word] = shard.term_freqs[word]
+            else:
+                merged.extend(postings)
+                self.term_freqs[word].extend(shard.term_freqs[word])
+        self.doc_lengths.extend(shard.doc_lengths)
+        for field, field_index in shard.field_index.items():
+            self.field_index[field].extend(field_index)
+        self.json_corpus.extend(shard.json_corpus)
+
+
+def _split_into_shards(movies: Iterable[Movie], shard_size: int) -> Iterator[List[Movie]]:
+    """
+    Groups the movies into lists of at most shard_size movies.
+    """
+    iterator = iter(movies)
+    while True:
+        shard = list(islice(iterator, shard_size))
+        if not shard:
+            return
+        yield shard
+
+
+def _build_shard_index(shard_texts: List[Tuple[Tuple[str, ...], Dict[str, List[str]], Union[tuple, str]]],
+                       first_doc_id: int) -> Index:
+    """
+    Builds the inverted index, field postings and JSON corpus of a shard of consecutive doc IDs
+    in a worker process, from the field texts, field values and record span or raw JSON of its movies.
+    """
+    shard = Index(())
+    for offset, (field_texts, field_values, record) in enumerate(shard_texts):
+        shard.index_field_texts(field_texts, first_doc_id + offset)
+        shard.index_field_values(field_values, first_doc_id + offset)
+        if isinstance(record, tuple):
+            catalog, record_offset, length = record
+            record = compact_json(catalog.record(record_offset, length))
+        shard.json_corpus.add(record.lower())
+    return shard
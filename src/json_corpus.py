@@ -0,0 +1,139 @@
+"""
+This module defines the JsonCorpus class, the lower-cased raw JSON of every movie in a single buffer.
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Iterable, List, Optional
+
+from src.shared_arena import SharedArena
+
+# Ends the text of every movie, a raw NUL cannot appear in JSON text so no match spans two movies
+SEPARATOR = b'\0'
+
+
+class JsonCorpus:
+    """
+    A class used to represent the lower-cased raw JSON of the movies as one UTF-8 buffer.
+
+    The text of the movie with doc ID d spans buffer[offsets[d]:offsets[d + 1] - 1], each
+    text being followed by SEPARATOR. A substring search is a single find over the whole
+    buffer, every match mapped back to its doc ID by bisecting the offsets, instead of
+    lower-casing the JSON of every movie for every query. The buffer is encoded in UTF-8
+    so that a single non-ASCII character does not widen the whole corpus.
+
+    Attributes
+    ----------
+    _buffer : bytes
+        a private attribute holding the texts of every movie, each followed by SEPARATOR,
+        a shared mapping holding them between the first and last offsets once shared
+    _offsets : array
+        a private attribute holding the offset of the text of every movie in _buffer, and the end of the texts
+    _pending : List[bytes]
+        a private attribute holding the texts added since the buffer was last built
+
+    Methods
+    -------
+    add(text)
+        Adds the lower-cased raw JSON of the next movie.
+    extend(other)
+        Adds the texts of a corpus built over the following doc IDs.
+    finalize()
+        Builds the buffer once the movies are added.
+    text(doc_id)
+        Returns the lower-cased raw JSON of a movie.
+    search(query, doc_ids)
+        Returns the doc IDs of the movies whose raw JSON contains the query.
+    share(arena)
+        Moves the buffer into a shared arena.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._offsets = array('Q', [0])
+        self._pending = []
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def add(self, text: str):
+        """
+        Adds the lower-cased raw JSON of a movie. Movies must be added in doc ID order.
+        """
+        encoded = text.encode('utf-8')
+        self._pending.append(encoded)
+        self._offsets.append(self._offsets[-1] + len(encoded) + len(SEPARATOR))
+
+    def extend(self, other: 'JsonCorpus'):
+        """
+        Adds the texts of a corpus built over the doc IDs following the ones added so far.
+        """
+        other.finalize()
+        if not len(other):
+            return
+        # The buffer of the other corpus is added as a single text, its last separator is added back by finalize
+        self._pending.append(other._buffer[:-len(SEPARATOR)])
+        base = self._offsets[-1]
+        self._offsets.extend(base + offset for offset in other._offsets[1:])
+
+    def finalize(self):
+        """
+        Appends the texts added since the last call to the buffer.
+        """
+        if self._pending:
+            self._pending.append(b'')
+            self._buffer += SEPARATOR.join(self._pending)
+            self._pending = []
+
+    def share(self, arena: SharedArena):
+        """
+        Moves the buffer and offsets into a shared arena once finalized, no text can be added afterwards.
+        """
+        # The buffer is searched in place in the mapping of the arena, from its offset there
+        mapping, start = arena.store(self._buffer)
+        self._buffer = mapping
+        self._offsets = arena.view(array('Q', (offset + start for offset in self._offsets)), 'Q')
+
+    def text(self, doc_id: int) -> str:
+        """
+        Returns the lower-cased raw JSON of a movie.
+        """
+        return self._buffer[self._offsets[doc_id]:self._offsets[doc_id + 1] - len(SEPARATOR)].decode('utf-8')
+
+    def search(self, query: str, doc_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Returns the sorted doc IDs of the movies whose raw JSON contains a lower-cased query.
+
+        Parameters
+        ----------
+        query : str
+            the lower-cased substring to find
+        doc_ids : Optional[Iterable[int]]
+            the sorted candidate doc IDs, only their texts are searched; the whole buffer
+            is scanned in a single pass when None
+        """
+        needle = query.encode('utf-8')
+        if SEPARATOR in needle:
+            return []
+        buffer = self._buffer
+        offsets = self._offsets
+
+        if doc_ids is not None:
+            # The separator is left out of the bounds, a match cannot reach the next movie
+            return [int(doc_id) for doc_id in doc_ids
+                    if buffer.find(needle, offsets[doc_id], offsets[doc_id + 1] - len(SEPARATOR)) >= 0]
+
+        matches = []
+        end = offsets[-1]
+        position = buffer.find(needle, offsets[0], end)
+        while position >= 0:
+            doc_id = bisect_right(offsets, position) - 1
+            matches.append(doc_id)
+            # Every movie is reported once, the search resumes at the next movie
+            position = buffer.find(needle, offsets[doc_id + 1], end)
+        return matches
+
+    @property
+    def nbytes(self) -> int:
+        """ Returns the number of bytes of the texts and the offsets """
+        return self._offsets[-1] - self._offsets[0] + self._offsets.itemsize * len(self._offsets)
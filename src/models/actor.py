@@ -8,4 +8,4 @@ class Actor(Person):
     """ 
     A class used to represent an Actor, which inherits from the Person class. 
     """
-    pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
@@ -22,6 +22,8 @@ class Creator:
         Allows us to get the name/url of the _creator
     """
 
+    __slots__ = ('_creator',)
+
     def __init__(self, data: dict):
         """
         Initialize Creator which could be either a Person or an Organization.
@@ -28,6 +28,8 @@ class DatePublished:
         serializes the date object to an ISO 8601 string representation
     """
 
+    __slots__ = ('_date', '_year')
+
     def __init__(self, date_string: str):
         """
         Initialize DatePublished with date
@@ -7,4 +7,4 @@ class Director(Person):
     """ 
     A class used to represent a Director, which inherits from the Person class. 
     """
-    pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
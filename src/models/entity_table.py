@@ -0,0 +1,87 @@
+"""
+This module defines the EntityTable class, which interns the people, organizations and genres shared by movies.
+"""
+
+from typing import Dict, Type
+
+from src.models.actor import Actor
+from src.models.director import Director
+from src.models.genre import Genre
+from src.models.organization import Organization
+from src.models.person import Person
+
+
+class EntityTable:
+    """
+    A class used to represent the people, organizations and genres of a catalog, each built once.
+
+    The same actor, director or genre appears in many movies: movies built with a table
+    reference a single shared object per entity instead of a copy each. People are keyed
+    by their '/name/nm...' URL, or by their name when they have no URL, organizations by
+    their URL and genres by their name. Entities are shared, so updating one updates it
+    in every movie referencing it.
+
+    Attributes
+    ----------
+    _people : Dict[tuple, Person]
+        a private attribute holding the people by class and key
+    _organizations : Dict[str, Organization]
+        a private attribute holding the organizations by URL
+    _genres : Dict[str, Genre]
+        a private attribute holding the genres by name
+
+    Methods
+    -------
+    actor(data), director(data), person(data)
+        Returns the shared Actor, Director or Person of the data.
+    organization(data)
+        Returns the shared Organization of the data.
+    genre(name)
+        Returns the shared Genre of a name.
+    """
+
+    def __init__(self):
+        self._people: Dict[tuple, Person] = {}
+        self._organizations: Dict[str, Organization] = {}
+        self._genres: Dict[str, Genre] = {}
+
+    def __len__(self):
+        return len(self._people) + len(self._organizations) + len(self._genres)
+
+    def _intern_person(self, cls: Type[Person], data: dict) -> Person:
+        """
+        Returns the person of a class keyed by the URL of the data, built on first use.
+        """
+        url = data.get('url')
+        key = (cls, url) if url else (cls, None, data.get('name', ''))
+        person = self._people.get(key)
+        if person is None:
+            person = self._people[key] = cls(data)
+        return person
+
+    def actor(self, data: dict) -> Actor:
+        """ Returns the shared Actor of the data """
+        return self._intern_person(Actor, data)
+
+    def director(self, data: dict) -> Director:
+        """ Returns the shared Director of the data """
+        return self._intern_person(Director, data)
+
+    def person(self, data: dict) -> Person:
+        """ Returns the shared Person of the data """
+        return self._intern_person(Person, data)
+
+    def organization(self, data: dict) -> Organization:
+        """ Returns the shared Organization of the data """
+        url = data.get('url')
+        organization = self._organizations.get(url)
+        if organization is None:
+            organization = self._organizations[url] = Organization(data)
+        return organization
+
+    def genre(self, name: str) -> Genre:
+        """ Returns the shared Genre of a name """
+        genre = self._genres.get(name)
+        if genre is None:
+            genre = self._genres[name] = Genre(name)
+        return genre
@@ -15,6 +15,8 @@ class Genre:
     name : property
         allows us to get and set the value of _name
     """
+    __slots__ = ('_name',)
+
     def __init__(self, data):
         """
         Initialize Genre with name
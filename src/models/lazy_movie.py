@@ -0,0 +1,192 @@
+"""
+This module defines the MovieCatalog class, a memory-mapped catalog file, and the LazyMovie class,
+a movie materialized from its record in the catalog when needed.
+"""
+
+import json
+import mmap
+import os
+
+from src.models.movie import Movie, compact_json
+
+
+class MovieCatalog:
+    """
+    A class used to represent a movie catalog file mapped in memory, read by byte span.
+
+    The mapping is opened on first read, so a catalog unpickled from a snapshot costs
+    nothing until a movie is materialized.
+
+    Attributes
+    ----------
+    filepath : str
+        the absolute path of the catalog file
+
+    Methods
+    -------
+    record(offset, length)
+        Returns the text of a record.
+    close()
+        Unmaps the file.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = os.path.abspath(filepath)
+        self._mapped = None
+
+    def record(self, offset: int, length: int) -> str:
+        """
+        Returns the text of the record of length bytes starting at offset.
+        """
+        if self._mapped is None:
+            with open(self.filepath, 'rb') as catalog_file:
+                self._mapped = mmap.mmap(catalog_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mapped[offset:offset + length].decode('utf-8')
+
+    def close(self):
+        """
+        Unmaps the file, it is mapped again by the next read.
+        """
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+
+    def __getstate__(self):
+        return {'filepath': self.filepath}
+
+    def __setstate__(self, state):
+        self.filepath = state['filepath']
+        self._mapped = None
+
+
+class LazyMovie:
+    """
+    A class used to represent a movie by the byte span of its record in the catalog.
+
+    Searches and result lists only need the name, year and rating of a movie, which are
+    kept. Any other attribute materializes a Movie by parsing the record again, for
+    instance when a movie is serialized with movie_to_json. Materialized movies are not
+    kept, so the movie store stays as small as the proxies.
+
+    While the catalog is loaded and indexed, the proxy holds the Movie it was parsed
+    into, until release() is called.
+
+    Attributes
+    ----------
+    _catalog : MovieCatalog
+        a private attribute holding the catalog of the record
+    _offset : int
+        a private attribute holding the byte offset of the record in the catalog
+    _length : int
+        a private attribute holding the number of bytes of the record
+    _name : str
+        a private attribute holding the name of the movie
+    _year : Optional[int]
+        a private attribute holding the published year of the movie
+    _rating_value : Optional[float]
+        a private attribute holding the rating value of the movie
+    _movie : Optional[Movie]
+        a private attribute holding the parsed Movie until it is released
+
+    Methods
+    -------
+    name, year, rating_value, raw_json, record : properties
+        allow us to get the kept attributes, the JSON text of the movie and the span of its record
+    materialize()
+        Returns the Movie of the record.
+    release()
+        Drops the parsed Movie.
+    """
+
+    __slots__ = ('_catalog', '_offset', '_length', '_name', '_year', '_rating_value', '_movie')
+
+    def __init__(self, catalog: MovieCatalog, offset: int, length: int, movie: Movie):
+        """
+        Initialize LazyMovie from a parsed movie and the span of its record.
+
+        Parameters
+        ----------
+            catalog : MovieCatalog
+                the catalog the movie was read from
+            offset : int
+                the byte offset of the record in the catalog
+            length : int
+                the number of bytes of the record
+            movie : Movie
+                the movie parsed from the record, held until release()
+        """
+        self._catalog = catalog
+        self._offset = offset
+        self._length = length
+        self._name = movie.name
+        self._year = movie.year
+        self._rating_value = movie.rating_value
+        self._movie = movie
+
+    @property
+    def name(self):
+        """ Returns the name of the movie """
+        return self._name
+
+    @property
+    def year(self):
+        """ Returns the published year of the movie """
+        return self._year
+
+    @property
+    def rating_value(self):
+        """ Returns the rating value of the movie """
+        return self._rating_value
+
+    @property
+    def raw_json(self):
+        """ Returns the JSON text of the record on a single line, like Movie.raw_json, without materializing the movie """
+        return compact_json(self._catalog.record(self._offset, self._length))
+
+    @property
+    def record(self):
+        """ Returns the catalog with the byte offset and length of the record of the movie """
+        return self._catalog, self._offset, self._length
+
+    def materialize(self) -> Movie:
+        """
+        Returns the Movie of the record, parsed again once released.
+        """
+        if self._movie is not None:
+            return self._movie
+        return Movie(json.loads(self._catalog.record(self._offset, self._length)), record=self.record)
+
+    def release(self):
+        """
+        Drops the parsed Movie, the following attribute reads parse the record again.
+        """
+        self._movie = None
+
+    def __getattr__(self, name: str):
+        # Only called for the attributes not kept by the proxy
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    def __getstate__(self):
+        # The parsed Movie is never pickled
+        return (self._catalog, self._offset, self._length, self._name, self._year, self._rating_value)
+
+    def __setstate__(self, state):
+        self._catalog, self._offset, self._length, self._name, self._year, self._rating_value = state
+        self._movie = None
+
+    def __repr__(self):
+        return f"LazyMovie({self._name!r}, offset={self._offset}, length={self._length})"
+
+
+def release_movies(movies) -> int:
+    """
+    Releases the parsed Movie of every LazyMovie, returns the number of movies released.
+    """
+    released = 0
+    for movie in movies:
+        if isinstance(movie, LazyMovie):
+            movie.release()
+            released += 1
+    return released
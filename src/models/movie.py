@@ -10,6 +10,14 @@ from src.models.rating import Rating
 from src.models.datepublished import DatePublished
 from src.models.trailer import Trailer
 from src.models.person import Person
+from src.models.entity_table import EntityTable
+
+
+def compact_json(text: str) -> str:
+    """
+    Returns a JSON text parsed and serialized again on a single line, keeping its keys and non-ASCII characters.
+    """
+    return json.dumps(json.loads(text), ensure_ascii=False)
 
 
 class Movie:
@@ -48,17 +56,23 @@ class Movie:
         a private attribute to hold the trailer details of the movie
     _type : str
         a private attribute to store the type of the movie
+    _record : Optional[tuple]
+        a private attribute to hold the catalog the movie was read from with the byte offset and length
+        of its record, None when the movie was not read from a catalog
 
     Methods
     -------
     name, actors, directors, creators, genres, keywords, rating, 
     content_rating, description, duration, image, url, date_published, 
-    trailer, type : properties
+    trailer, type, raw_json, record : properties
         allow us to get and set the values of corresponding private attributes
     """
 
+    __slots__ = ('_name', '_actors', '_directors', '_creators', '_genres', '_keywords', '_rating',
+                 '_rating_value', '_content_rating', '_description', '_duration', '_image', '_url',
+                 '_date_published', '_year', '_trailer', '_type', '_record')
 
-    def __init__(self, data):
+    def __init__(self, data, entities: EntityTable = None, record: tuple = None):
         """
         Initialize Movie with name, actors, directors, creators, genres, 
         keywords, rating, content rating, description, duration, image, url,
@@ -68,39 +82,47 @@ class Movie:
         ----------
             data : dict
                 a dictionary containing the movie data
+            entities : EntityTable, optional
+                the table the people, organizations and genres are shared from, new objects when not given
+            record : tuple, optional
+                the MovieCatalog the data was read from, with the byte offset and length of its record
+
+        Raises
+        ------
+            Exception
+                if the data is not a valid movie
         """
-        try:
-            self._name = data.get('name', '')
-            self._actors = [Actor(actor) for actor in data.get('actor', []) if actor] or []
-            self._directors = [Director(director) for director in data.get('director', []) if director] or []
-            self._creators = []
-            creators_data = data.get('creator', [])
-            for creator in creators_data:
-                if creator and creator['@type'] == 'Person':
-                    self._creators.append(Person(creator))
-                elif creator and creator['@type'] == 'Organization':
-                    self._creators.append(Organization(creator))
-            self._creators = self._creators or []
-            self._genres = [Genre(genre) for genre in data.get('genre', []) if genre] or []
-            self._keywords = data.get('keywords', '')
-            self._rating = Rating(data.get('aggregateRating', {}))
-            self._rating_value = self._rating.to_dict().get('ratingValue')
-            self._content_rating = data.get('contentRating', '')
-            self._description = data.get('description', '')
-            self._duration = data.get('duration', '')
-            self._image = data.get('image', '')
-            self._url = data.get('url', '')
-            date_published_data = data.get('datePublished')
-            self._date_published = DatePublished(date_published_data) if date_published_data else None
-            self._year = self._date_published.year if self._date_published else None
-            self._trailer = Trailer(data.get('trailer', {}))
-            self._type = data.get('@type', '')
-            self._raw_json = json.dumps(data)
-            print(f"Movie object initialized. Name: {self._name}")
-        except Exception as e:
-            print(f"Failed to initialize Movie object.")
-            print(f"Input data: {data}")
-            print(f"Error: {e}")
+        self._name = data.get('name', '')
+        if entities is not None:
+            actor, director, person = entities.actor, entities.director, entities.person
+            organization, genre = entities.organization, entities.genre
+        else:
+            actor, director, person, organization, genre = Actor, Director, Person, Organization, Genre
+        self._actors = [actor(entry) for entry in data.get('actor', []) if entry] or []
+        self._directors = [director(entry) for entry in data.get('director', []) if entry] or []
+        self._creators = []
+        creators_data = data.get('creator', [])
+        for creator in creators_data:
+            if creator and creator['@type'] == 'Person':
+                self._creators.append(person(creator))
+            elif creator and creator['@type'] == 'Organization':
+                self._creators.append(organization(creator))
+        self._creators = self._creators or []
+        self._genres = [genre(name) for name in data.get('genre', []) if name] or []
+        self._keywords = data.get('keywords', '')
+        self._rating = Rating(data.get('aggregateRating', {}))
+        self._rating_value = self._rating.to_dict().get('ratingValue')
+        self._content_rating = data.get('contentRating', '')
+        self._description = data.get('description', '')
+        self._duration = data.get('duration', '')
+        self._image = data.get('image', '')
+        self._url = data.get('url', '')
+        date_published_data = data.get('datePublished')
+        self._date_published = DatePublished(date_published_data) if date_published_data else None
+        self._year = self._date_published.year if self._date_published else None
+        self._trailer = Trailer(data.get('trailer', {}))
+        self._type = data.get('@type', '')
+        self._record = record
 
     @property
     def name(self):
@@ -109,8 +131,21 @@ class Movie:
     
     @property
     def raw_json(self):
-        """ Returns the name of the movie """
-        return self._raw_json
+        """
+        Returns the JSON text of the source record of the movie on a single line, read again from
+        the catalog on every call, or the movie serialized again when it was not read from a catalog.
+        """
+        # Non-ASCII characters are kept as is, so that the JSON search finds them
+        if self._record is not None:
+            catalog, offset, length = self._record
+            return compact_json(catalog.record(offset, length))
+        # to_dict leaves out the keys of the record the movie does not model, such as @context
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @property
+    def record(self):
+        """ Returns the catalog the movie was read from with the byte offset and length of its record, or None """
+        return self._record
 
     @property
     def actors(self):
@@ -218,6 +253,6 @@ class Movie:
             'duration': self._duration,
             'image': self._image,
             'url': self._url,
-            'datePublished': self._date_published.to_dict(),
+            'datePublished': self._date_published.to_dict() if self._date_published else None,
             'trailer': self._trailer.to_dict(),
         }
@@ -21,6 +21,8 @@ class Organization:
         allows us to get and set the value of _name
     """
 
+    __slots__ = ('_url', '_name')
+
     def __init__(self, data):
         """
         Initialize Organization with url.
@@ -21,6 +21,8 @@ class Person:
         allows us to get and set the value of _url
     """
 
+    __slots__ = ('_name', '_url')
+
     def __init__(self, data: dict):
         """
         Initialize Person with a name and a URL.
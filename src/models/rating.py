@@ -21,6 +21,8 @@ class Rating:
     best_rating, rating_count, rating_value, worst_rating : properties
         allow us to get and set the values of corresponding private attributes
     """
+    __slots__ = ('_best_rating', '_rating_count', '_rating_value', '_worst_rating')
+
     def __init__(self, data):
         """
         Initialize Rating with best rating, rating count, rating value, worst rating
@@ -45,6 +47,16 @@ class Rating:
         """ Updates the best rating of the movie """
         self._best_rating = value
 
+    @property
+    def rating_count(self):
+        """ Returns the number of ratings of the movie """
+        return self._rating_count
+
+    @property
+    def rating_value(self):
+        """ Returns the rating value of the movie """
+        return self._rating_value
+
     # Similar getter and setter methods for `rating_count`, `rating_value`, and `worst_rating`...
 
     def to_dict(self):
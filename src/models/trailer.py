@@ -25,6 +25,8 @@ class Trailer:
     description, embed_url, name, thumbnail_url, type, upload_date : properties
         allow us to get and set the values of corresponding private attributes
     """
+    __slots__ = ('_description', '_embed_url', '_name', '_thumbnail_url', '_type', '_upload_date')
+
     def __init__(self, data):
         """
         Initialize Trailer with description, embed url, name, thumbnail url, type, upload date
@@ -0,0 +1,224 @@
+"""
+This module defines the MovieColumns class, a columnar store of the numeric attributes of the movies.
+"""
+
+import re
+from array import array
+from typing import Optional
+
+import numpy as np
+
+from src.models.movie import Movie
+from src.shared_arena import SharedArena
+
+# Value of a missing year, rating count or duration in the integer columns
+MISSING = -1
+
+_ISO8601_DURATION = re.compile(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?')
+
+
+def parse_iso8601_duration(duration: str) -> Optional[int]:
+    """
+    Returns the number of minutes of an ISO 8601 duration such as 'PT2H22M', or None if it cannot be parsed.
+    """
+    match = _ISO8601_DURATION.fullmatch(duration.strip()) if duration else None
+    if match is None or not any(match.groups()):
+        return None
+    days, hours, minutes, seconds = (float(group) if group else 0 for group in match.groups())
+    return int(days * 24 * 60 + hours * 60 + minutes + seconds // 60)
+
+
+class MovieColumns:
+    """
+    A class used to represent the numeric attributes of the movies as NumPy arrays indexed by doc ID.
+
+    Sorting and filtering a set of movies by rating, year or duration becomes a vectorized
+    operation over an array of doc IDs instead of an attribute lookup per Movie object.
+
+    Attributes
+    ----------
+    ratings : np.ndarray
+        the rating value of each movie, NaN when missing
+    rating_counts : np.ndarray
+        the number of ratings of each movie, MISSING when missing
+    years : np.ndarray
+        the published year of each movie, MISSING when missing
+    durations : np.ndarray
+        the duration of each movie in minutes, MISSING when missing
+    rating_order : np.ndarray
+        every doc ID from the highest rating, movies without a rating last and ties by doc ID
+    rating_ranks : np.ndarray
+        the position of each doc ID in rating_order
+    year_rating_orders : Dict[int, np.ndarray]
+        a dictionary containing years mapped to the doc IDs of their movies in rating order
+
+    Methods
+    -------
+    add(movie)
+        Adds the attributes of the next movie.
+    finalize()
+        Converts the columns to NumPy arrays once all movies are added.
+    sort_by_rating(doc_ids, num_results)
+        Returns doc IDs ordered from the highest rating.
+    top_rated_for_year(year, num_results)
+        Returns the doc IDs of the movies published in a year, from the highest rating.
+    doc_ids_for_year(year)
+        Returns the doc IDs of the movies published in a year.
+    filter(doc_ids, ...)
+        Returns the doc IDs whose attributes are within the given bounds.
+    share(arena)
+        Moves the columns into a shared arena.
+    """
+
+    def __init__(self):
+        self.ratings = array('d')
+        self.rating_counts = array('q')
+        self.years = array('i')
+        self.durations = array('i')
+        self.rating_order = np.empty(0, dtype=np.int64)
+        self.rating_ranks = np.empty(0, dtype=np.int64)
+        self.year_rating_orders = {}
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def add(self, movie: Movie):
+        """
+        Adds the attributes of a movie. Movies must be added in doc ID order.
+        """
+        if isinstance(self.ratings, np.ndarray):
+            # Movies added after finalize(): go back to growable arrays
+            self.ratings = array('d', self.ratings.tobytes())
+            self.rating_counts = array('q', self.rating_counts.tobytes())
+            self.years = array('i', self.years.tobytes())
+            self.durations = array('i', self.durations.tobytes())
+        rating_value = movie.rating_value
+        rating_count = movie.rating.rating_count
+        duration = parse_iso8601_duration(movie.duration)
+        self.ratings.append(float(rating_value) if rating_value is not None else np.nan)
+        self.rating_counts.append(int(rating_count) if rating_count is not None else MISSING)
+        self.years.append(movie.year if movie.year is not None else MISSING)
+        self.durations.append(duration if duration is not None else MISSING)
+
+    def finalize(self):
+        """
+        Converts the columns to NumPy arrays and computes the rating orders.
+        """
+        self.ratings = np.asarray(self.ratings, dtype=np.float64)
+        self.rating_counts = np.asarray(self.rating_counts, dtype=np.int64)
+        self.years = np.asarray(self.years, dtype=np.int32)
+        self.durations = np.asarray(self.durations, dtype=np.int32)
+
+        self.rating_order = np.argsort(-np.nan_to_num(self.ratings, nan=-np.inf), kind='stable')
+        self.rating_ranks = np.empty(len(self.rating_order), dtype=np.int64)
+        self.rating_ranks[self.rating_order] = np.arange(len(self.rating_order))
+
+        # A stable sort by year of the rating order keeps every year in rating order
+        by_year = self.rating_order[np.argsort(self.years[self.rating_order], kind='stable')]
+        years, starts = np.unique(self.years[by_year], return_index=True)
+        self.year_rating_orders = {int(year): order for year, order in zip(years, np.split(by_year, starts[1:]))
+                                   if year != MISSING}
+
+    def share(self, arena: SharedArena):
+        """
+        Moves the finalized columns and rating orders into a shared arena.
+        """
+        self.ratings = arena.ndarray(self.ratings)
+        self.rating_counts = arena.ndarray(self.rating_counts)
+        self.years = arena.ndarray(self.years)
+        self.durations = arena.ndarray(self.durations)
+        self.rating_order = arena.ndarray(self.rating_order)
+        self.rating_ranks = arena.ndarray(self.rating_ranks)
+        self.year_rating_orders = {year: arena.ndarray(order) for year, order in self.year_rating_orders.items()}
+
+    def _doc_ids(self, doc_ids) -> np.ndarray:
+        """
+        Returns the doc IDs as a NumPy array, every doc ID when doc_ids is None.
+        """
+        if doc_ids is None:
+            return np.arange(len(self.ratings), dtype=np.int64)
+        return np.asarray(doc_ids, dtype=np.int64)
+
+    def sort_by_rating(self, doc_ids=None, num_results: Optional[int] = None) -> np.ndarray:
+        """
+        Returns doc IDs ordered from the highest rating, movies without a rating last
+        and movies with the same rating by doc ID.
+
+        The order of every movie is precomputed, so the top rated movies of the catalog
+        are a slice and a set of candidates only needs a partial selection of the
+        num_results best ranks before sorting them.
+
+        Parameters
+        ----------
+        doc_ids : array-like, optional
+            the candidate doc IDs, every movie when None
+        num_results : Optional[int]
+            the number of doc IDs to return, all of them when None
+        """
+        if doc_ids is None:
+            return self.rating_order[:num_results]
+
+        doc_ids = self._doc_ids(doc_ids)
+        ranks = self.rating_ranks[doc_ids]
+        if num_results is not None and num_results < len(doc_ids):
+            if num_results <= 0:
+                return doc_ids[:0]
+            selected = np.argpartition(ranks, num_results - 1)[:num_results]
+            doc_ids, ranks = doc_ids[selected], ranks[selected]
+        return doc_ids[np.argsort(ranks)]
+
+    def top_rated_for_year(self, year: int, num_results: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the doc IDs of the movies published in a year, from the highest rating.
+        """
+        return self.year_rating_orders.get(year, self.rating_order[:0])[:num_results]
+
+    def doc_ids_for_year(self, year: int) -> np.ndarray:
+        """
+        Returns the doc IDs of the movies published in a year, in doc ID order.
+        """
+        return np.flatnonzero(self.years == year)
+
+    def filter(self, doc_ids=None, min_rating: Optional[float] = None, max_rating: Optional[float] = None,
+               min_rating_count: Optional[int] = None, min_year: Optional[int] = None,
+               max_year: Optional[int] = None, min_duration: Optional[int] = None,
+               max_duration: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the doc IDs whose attributes are within the given inclusive bounds, in the order of doc_ids.
+        A movie missing an attribute never matches a bound on that attribute.
+
+        Parameters
+        ----------
+        doc_ids : array-like, optional
+            the candidate doc IDs, every movie when None
+        min_rating, max_rating : Optional[float]
+            the bounds on the rating value
+        min_rating_count : Optional[int]
+            the lowest number of ratings
+        min_year, max_year : Optional[int]
+            the bounds on the published year
+        min_duration, max_duration : Optional[int]
+            the bounds on the duration in minutes
+        """
+        doc_ids = self._doc_ids(doc_ids)
+        mask = np.ones(len(doc_ids), dtype=bool)
+
+        if min_rating is not None or max_rating is not None:
+            ratings = self.ratings[doc_ids]
+            # Comparisons with NaN are false, so movies without a rating are dropped
+            if min_rating is not None:
+                mask &= ratings >= min_rating
+            if max_rating is not None:
+                mask &= ratings <= max_rating
+        for column, low, high in ((self.rating_counts, min_rating_count, None),
+                                  (self.years, min_year, max_year),
+                                  (self.durations, min_duration, max_duration)):
+            if low is None and high is None:
+                continue
+            values = column[doc_ids]
+            mask &= values != MISSING
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return doc_ids[mask]
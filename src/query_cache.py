@@ -0,0 +1,138 @@
+"""
+This module defines the QueryCache class, a bounded cache of search results.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Default number of results kept in the cache
+DEFAULT_CACHE_SIZE = 1024
+
+
+class QueryCache:
+    """
+    A class used to represent a least recently used cache of search results.
+
+    Entries can expire after a time to live, and the whole cache is cleared when the
+    version of the index it was filled from changes. The cache can be shared by threads.
+
+    Attributes
+    ----------
+    max_size : int
+        the maximum number of entries, 0 disables the cache
+    ttl : Optional[float]
+        the number of seconds an entry stays valid, None for no expiry
+    version : Any
+        the version of the index the entries were computed from
+    hits, misses, evictions, expirations, invalidations : int
+        counters of cache lookups and removals
+
+    Methods
+    -------
+    get(key, version)
+        Returns the cached value of a key, or None.
+    put(key, value, version)
+        Adds a value to the cache.
+    clear()
+        Removes every entry.
+    stats()
+        Returns the counters and the current size of the cache.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, ttl: Optional[float] = None):
+        """
+        Constructs the cache.
+
+        Parameters
+        ----------
+            max_size : int
+                the maximum number of entries, 0 disables the cache
+            ttl : Optional[float]
+                the number of seconds an entry stays valid, None for no expiry
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self, version: Any):
+        """
+        Clears the cache when the index version changed.
+        """
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self.version = version
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        """
+        Returns the cached value of a key computed from the given index version,
+        or None if it is missing or expired.
+        """
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: Any):
+        """
+        Adds the value of a key computed from the given index version, evicting the least
+        recently used entry when the cache is full.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Removes every entry, the counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Returns the counters and the current size of the cache.
+        """
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
@@ -7,79 +7,197 @@ in the search_utils.py module.
 """
 
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import numpy as np
 from src.models.movie import Movie
+from src.index import Index
+from src.facet_index import DEFAULT_FACET_LIMIT
+from src.filter_index import SearchFilters
+from src.query_cache import QueryCache, DEFAULT_CACHE_SIZE
 from src.utils.search_utils import *
 from src.utils.print_utils import *
 
+# Fuzzy search backends: typo tolerant lookup of the index words, or similarity of the whole titles
+FUZZY_BACKENDS = ('vocabulary', 'titles')
+
+class GeneralSearchResults:
+    """
+    A class used to represent the outcome of a general search.
+
+    Attributes
+    ----------
+    matches : List[Movie]
+        the top movies found by the index and json searches
+    probable_matches : List[Movie]
+        the top movies found by the fuzzy search, not already in matches
+    total_found : int
+        the number of distinct movies found by all searches
+    ranked : bool
+        whether matches are ordered by BM25 score
+    facets : Dict[str, List[Tuple[str, int]]]
+        the most frequent genres, decades and content ratings of all the movies found, with their counts
+    match_ids, probable_match_ids : List[int]
+        the doc IDs of matches and probable_matches
+    top_rated_ids : List[int]
+        the doc IDs of the top rated movies matching the filters, suggested when no movie is found
+    path_counts : Dict[str, int]
+        a dictionary containing the searches that ran, in order, mapped to the number of movies each found
+    """
+
+    def __init__(self, matches: List[Movie], probable_matches: List[Movie], total_found: int, ranked: bool,
+                 facets: Optional[Dict[str, List[Tuple[str, int]]]] = None, match_ids: Optional[List[int]] = None,
+                 probable_match_ids: Optional[List[int]] = None, path_counts: Optional[Dict[str, int]] = None,
+                 top_rated_ids: Optional[List[int]] = None):
+        self.matches = matches
+        self.probable_matches = probable_matches
+        self.total_found = total_found
+        self.ranked = ranked
+        self.facets = facets if facets is not None else {}
+        self.match_ids = match_ids if match_ids is not None else []
+        self.probable_match_ids = probable_match_ids if probable_match_ids is not None else []
+        self.path_counts = path_counts if path_counts is not None else {}
+        self.top_rated_ids = top_rated_ids if top_rated_ids is not None else []
+
 class Search:
-    def __init__(self, movies: List[Movie], index: Dict[str, List[Movie]]):
+    def __init__(self, movies: List[Movie], index: Index, fuzzy_backend: str = 'vocabulary',
+                 cache_size: int = DEFAULT_CACHE_SIZE, cache_ttl: Optional[float] = None,
+                 facet_limit: Optional[int] = DEFAULT_FACET_LIMIT):
         """
-        Initialize the Search object with a list of movies and a word-to-movie index.
+        Initialize the Search object with a list of movies and the index built over them.
+        fuzzy_backend selects the fuzzy search used by the general search, one of FUZZY_BACKENDS.
+        General search results are cached, cache_size and cache_ttl bound the number of
+        results kept and how many seconds they stay valid.
+        facet_limit is the number of values returned per facet, None returns all of them.
         """
         self.logger = logging.getLogger('movie_search')
         self.movies = movies
         self.index = index
+        self.fuzzy_backend = fuzzy_backend
+        self.cache = QueryCache(cache_size, cache_ttl)
+        self.facet_limit = facet_limit
         self.logger.info("Search object initialized.")
 
-    def general_search(self, query: str, fuzz_ratio: int, num_results: int):
+    def find_general_results(self, query: str, fuzz_ratio: int, num_results: int, ranked: bool = False,
+                             filters: Optional[SearchFilters] = None) -> GeneralSearchResults:
         """
-        General search first performs combined chunked and index-based search,
-        then an json search if query contains multiple words,
-        and finally a fuzzy search if the total results are less than num_results.
+        Computes the results of a general search without printing them, see general_search.
+        Results are served from the cache when the same search was run on the current index.
         """
-        self.logger.info(f"General search initiated with query: {query}")
+        key = (query.strip().lower(), 'ranked' if ranked else 'exact', self.fuzzy_backend, fuzz_ratio, num_results,
+               filters.key() if filters is not None else None, self.facet_limit)
+        results = self.cache.get(key, self.index.version)
+        if results is not None:
+            self.logger.info(f"General search results served from cache for query: {query}")
+            return results
+
+        # Bitmap of the movies matching the filters, candidates are checked against it before ranking
+        allowed = self.index.filter_index.bitmap(filters)
 
-        # Perform combined chunked and index search
-        index_search_movies = perform_combined_search(self.index, query)
+        path_counts = {}
+        if ranked:
+            # Perform BM25 ranked index search
+            index_search_ids = ranked_search_doc_ids(self.index, query, num_results, allowed)
+            path_counts['ranked'] = len(index_search_ids)
+        else:
+            # Perform combined chunked and index search
+            index_search_ids = combined_search_doc_ids(self.index, query, allowed)
+            path_counts['index'] = len(index_search_ids)
 
         # Perform json search if query contains multiple words or special chars
-        json_search_movies = perform_json_search(self.movies, query)
+        json_search_ids = json_search_doc_ids(self.index, query, allowed)
+        path_counts['json'] = len(json_search_ids)
 
         # Combine and get unique movies from index search and json search
-        combined_movies = list(dict.fromkeys(index_search_movies + json_search_movies))
+        combined_ids = list(dict.fromkeys(index_search_ids + json_search_ids))
 
-        movies_found = set(combined_movies)
-        
-        # Print results of combined search
-        if combined_movies:
-            print_exact_match_results(combined_movies[:num_results])
+        ids_found = dict.fromkeys(combined_ids)
+        fuzzy_search_ids = []
 
         # If the count of combined results is less than num_results, perform fuzzy search
-        if len(combined_movies) < num_results:
-            fuzzy_search_movies = perform_fuzzy_search(self.movies, query, fuzz_ratio)
-            
+        if len(combined_ids) < num_results:
+            if self.fuzzy_backend == 'titles':
+                fuzzy_search_ids = title_fuzzy_search_doc_ids(self.index, query, fuzz_ratio, allowed=allowed)
+            else:
+                fuzzy_search_ids = fuzzy_search_doc_ids(self.index, query, fuzz_ratio, allowed)
+
+            path_counts[f"fuzzy_{self.fuzzy_backend}"] = len(fuzzy_search_ids)
+
             # Filter out movies already displayed by the combined search
-            fuzzy_search_movies = [movie for movie in fuzzy_search_movies if movie not in combined_movies]
-            
-            movies_found.update(fuzzy_search_movies)
+            fuzzy_search_ids = [doc_id for doc_id in fuzzy_search_ids if doc_id not in ids_found]
+
+            ids_found.update(dict.fromkeys(fuzzy_search_ids))
+
+        match_ids = combined_ids[:num_results]
+        probable_match_ids = fuzzy_search_ids[:max(num_results - len(combined_ids), 0)]
+        top_rated_ids = []
+        if not ids_found:
+            # The top rated movies matching the filters are suggested instead, from the bitmap already built
+            doc_ids = np.flatnonzero(allowed) if allowed is not None else None
+            top_rated_ids = self.index.columns.sort_by_rating(doc_ids, num_results).tolist()
+        results = GeneralSearchResults(self.index.get_movies(match_ids), self.index.get_movies(probable_match_ids),
+                                       len(ids_found), ranked,
+                                       self.index.facet_index.counts(list(ids_found), self.facet_limit),
+                                       match_ids, probable_match_ids, path_counts, top_rated_ids)
+        self.cache.put(key, results, self.index.version)
+        return results
+
+    def general_search(self, query: str, fuzz_ratio: int, num_results: int, ranked: bool = False,
+                       filters: Optional[SearchFilters] = None) -> GeneralSearchResults:
+        """
+        General search first performs combined chunked and index-based search,
+        then an json search if query contains multiple words,
+        and finally a fuzzy search if the total results are less than num_results.
+
+        In ranked mode the index-based search returns the num_results movies with the
+        highest BM25 score instead of every movie containing all the words.
+
+        With filters, only the movies matching every filter are returned.
+        """
+        self.logger.info(f"General search initiated with query: {query}")
+
+        results = self.find_general_results(query, fuzz_ratio, num_results, ranked, filters)
 
-            # Print fuzzy results
-            if fuzzy_search_movies:
-                print_probable_match_results(fuzzy_search_movies[:(num_results - len(combined_movies))])
-            
-            
-        if len(movies_found) == 0:
-            print_no_results(self.movies, num_results)
+        # Print results of combined search
+        if results.matches and results.ranked:
+            print_ranked_results(results.matches)
+        elif results.matches:
+            print_exact_match_results(results.matches)
+
+        # Print fuzzy results
+        if results.probable_matches:
+            print_probable_match_results(results.probable_matches)
+
+        if results.total_found == 0:
+            print_no_results(self.index.get_movies(results.top_rated_ids))
 
-        self.logger.info(f"General search completed with total {len(movies_found)} results found.")
+        self.logger.info(f"General search completed with total {results.total_found} results found.")
+        return results
 
     def search_by_year(self, year: int, num_results: int):
         """
-        Search for movies released in a specific year.
+        Search for the top rated movies released in a specific year.
         """
         self.logger.info(f"Search by year initiated for year: {year}")
-        year_movies = search_by_year(self.movies, year)[:num_results]
+        year_movies = search_by_year(self.index, year, num_results)
         if year_movies:
             print_search_results_for_year(year_movies, year)
         self.logger.info(f"Search by year completed with {len(year_movies)} results found.")
 
+    def search_by_year_range(self, start: Optional[int], end: Optional[int], num_results: int):
+        """
+        Search for the top rated movies released in a range of years, start and end included.
+        """
+        self.logger.info(f"Search by year range initiated for years: {start} to {end}")
+        year_movies = search_by_year_range(self.index, start, end, num_results)
+        print_search_results_for_year_range(year_movies, start, end)
+        self.logger.info(f"Search by year range completed with {len(year_movies)} results found.")
+
     def search_by_genre(self, genre: str, num_results: int):
         """
         Search for movies within a specific genre.
         """
         self.logger.info(f"Search by genre initiated for genre: {genre}")
-        genre_movies = search_by_genre(self.movies, genre)[:num_results]
+        genre_movies = search_by_genre(self.index, genre)[:num_results]
         if genre_movies:
             print_search_results_for_genre(genre_movies, genre)
         self.logger.info(f"Search by genre completed with {len(genre_movies)} results found.")
@@ -89,7 +207,7 @@ class Search:
         Search for movies by a specific actor.
         """
         self.logger.info(f"Search by actor initiated for actor: {actor}")
-        actor_movies = search_by_actor(self.movies, actor)[:num_results]
+        actor_movies = search_by_actor(self.index, actor)[:num_results]
         if actor_movies:
             print_search_results_for_actor(actor_movies, actor)
         self.logger.info(f"Search by actor completed with {len(actor_movies)} results found.")
@@ -99,7 +217,7 @@ class Search:
         Search for movies by a specific creator.
         """
         self.logger.info(f"Search by creator initiated for creator: {creator}")
-        creator_movies = search_by_creator(self.movies, creator)[:num_results]
+        creator_movies = search_by_creator(self.index, creator)[:num_results]
         if creator_movies:
             print_search_results_for_creator(creator_movies, creator)
         self.logger.info(f"Search by creator completed with {len(creator_movies)} results found.")
@@ -109,7 +227,7 @@ class Search:
         Search for movies by a specific director.
         """
         self.logger.info(f"Search by director initiated for director: {director}")
-        director_movies = search_by_director(self.movies, director)[:num_results]
+        director_movies = search_by_director(self.index, director)[:num_results]
         if director_movies:
             print_search_results_for_directors(director_movies, director)
         self.logger.info(f"Search by director completed with {len(director_movies)} results found.")
@@ -121,7 +239,7 @@ class Search:
         self.logger.info(f"Search by movie name initiated for movie name: {movie_name}")
         
         movie_name = movie_name.lower()
-        movie_name_movies = [movie for movie in self.movies if movie_name in movie.name.lower()][:num_results]
+        movie_name_movies = search_by_movie_name(self.index, movie_name)[:num_results]
         if movie_name_movies:
             print_search_results_for_movie_name(movie_name_movies, movie_name)
         self.logger.info(f"Search by movie name completed with {len(movie_name_movies)} results found.")
@@ -0,0 +1,430 @@
+"""
+This module defines the SearchServer class, an HTTP JSON API over the Search class built on asyncio.
+
+Endpoints, all answering GET requests with a JSON object:
+
+    /search?q=...             every search the query is routed to, as in the interactive program
+    /search/general?q=...     the general search
+    /search/title?q=...       movies whose name contains the query
+    /search/actor?q=...       movies by actor, and likewise director, creator and genre
+    /search/year?q=...        top rated movies of a year or of a range of years such as 1990-1999
+    /health                   the number of movies and the cache counters
+
+Every search accepts n (number of results), fuzz_ratio and ranked (0 or 1). The general
+search also accepts the filters min_rating, max_rating, min_year, max_year, min_duration,
+max_duration, genre and content_rating, the last two repeated or comma separated.
+
+With serve_prefork, several processes forked from the one that built the index accept
+the connections of a single listening socket, and read the index from a shared arena.
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import multiprocessing
+import signal
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.batch import BatchOptions, run_query, run_search
+from src.filter_index import SearchFilters
+from src.search import Search
+from src.shared_arena import SharedArena, release_free_memory
+from src.utils.search_utils import parse_year, parse_year_range
+
+logger = logging.getLogger('movie_search')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+
+# Number of threads running the searches that may be CPU heavy
+DEFAULT_WORKERS = 4
+
+# Seconds an idle keep-alive connection stays open
+KEEP_ALIVE_TIMEOUT = 15.0
+
+# Largest request head accepted, in bytes
+MAX_HEADER_SIZE = 16 * 1024
+
+# Searches of the /search/<name> endpoints, mapped to the search of SEARCH_PATHS they run
+ENDPOINT_SEARCHES = {'general': 'general', 'title': 'movie_name', 'actor': 'actor', 'director': 'director',
+                     'creator': 'creator', 'genre': 'genre', 'year': 'year'}
+
+# Searches that may run the fuzzy search, and are therefore run in the executor
+_EXECUTOR_SEARCHES = {'general', 'routed'}
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    """
+    Raised to answer a request with an error status and message.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: Optional[int] = None) -> Optional[int]:
+    """ Returns an integer query parameter, default when missing """
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[-1])
+    except ValueError:
+        raise HttpError(400, f"Parameter {name} must be an integer.")
+
+
+def _float_param(params: Dict[str, List[str]], name: str) -> Optional[float]:
+    """ Returns a number query parameter, None when missing """
+    values = params.get(name)
+    if not values:
+        return None
+    try:
+        return float(values[-1])
+    except ValueError:
+        raise HttpError(400, f"Parameter {name} must be a number.")
+
+
+def _list_param(params: Dict[str, List[str]], name: str) -> List[str]:
+    """ Returns the values of a query parameter repeated or separated by commas """
+    return [value for values in params.get(name, ()) for value in values.split(',')]
+
+
+def parse_options(params: Dict[str, List[str]], defaults: BatchOptions) -> BatchOptions:
+    """
+    Returns the settings of a search from the query parameters of a request.
+
+    Parameters
+    ----------
+    params : Dict[str, List[str]]
+        The query parameters, as returned by parse_qs.
+    defaults : BatchOptions
+        The settings used for the missing parameters.
+
+    Raises
+    ------
+    HttpError
+        If a parameter is malformed.
+    """
+    num_results = _int_param(params, 'n', defaults.num_results)
+    if num_results < 0:
+        raise HttpError(400, "Parameter n must not be negative.")
+    filters = SearchFilters(min_rating=_float_param(params, 'min_rating'),
+                            max_rating=_float_param(params, 'max_rating'),
+                            min_year=_int_param(params, 'min_year'), max_year=_int_param(params, 'max_year'),
+                            min_duration=_int_param(params, 'min_duration'),
+                            max_duration=_int_param(params, 'max_duration'),
+                            genres=_list_param(params, 'genre'),
+                            content_ratings=_list_param(params, 'content_rating'))
+    ranked = params['ranked'][-1].lower() in ('1', 'true', 'yes') if params.get('ranked') else defaults.ranked
+    return BatchOptions(num_results, _int_param(params, 'fuzz_ratio', defaults.fuzz_ratio), ranked,
+                        filters if not filters.is_empty() else defaults.filters)
+
+
+class SearchServer:
+    """
+    A class used to represent an HTTP JSON API serving searches over a built index.
+
+    Connections are handled by an asyncio event loop and kept alive between requests.
+    Searches answered from the index postings run on the event loop, while the general
+    search, which may run the fuzzy search, runs in a pool of threads so that a slow
+    query does not hold up the other connections.
+
+    Attributes
+    ----------
+    search : Search
+        the search engine
+    databases : dict
+        the category databases used to route queries
+    defaults : BatchOptions
+        the settings of the searches when a request does not set them
+    host : str
+        the address the server listens on
+    port : int
+        the port the server listens on, the port picked by the system once started when 0
+    workers : int
+        the number of threads running the general searches
+    sock : Optional[socket.socket]
+        a listening socket to accept connections from instead of host and port
+
+    Methods
+    -------
+    handle(method, target)
+        Returns the status and JSON payload of a request.
+    start()
+        Starts listening.
+    serve_forever()
+        Starts listening and serves until cancelled.
+    stop()
+        Stops listening, closes the open connections and shuts the threads down.
+    close()
+        Stops listening and shuts the threads down.
+    """
+
+    def __init__(self, search: Search, databases: dict, defaults: Optional[BatchOptions] = None,
+                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS,
+                 sock: Optional[socket.socket] = None):
+        self.search = search
+        self.databases = databases
+        self.defaults = defaults if defaults is not None else BatchOptions()
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.sock = sock
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search')
+        self._server = None
+        self._connections = set()
+
+    def _route(self, method: str, target: str) -> Tuple[str, Optional[str], BatchOptions]:
+        """
+        Returns the search of a request, its query and its settings.
+        """
+        if method != 'GET':
+            raise HttpError(405, f"Method {method} is not allowed, use GET.")
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        path = url.path.rstrip('/') or '/'
+        if path == '/health':
+            return 'health', None, self.defaults
+
+        if path == '/search':
+            name = 'routed'
+        elif path.startswith('/search/') and path[len('/search/'):] in ENDPOINT_SEARCHES:
+            name = ENDPOINT_SEARCHES[path[len('/search/'):]]
+        else:
+            raise HttpError(404, f"Unknown endpoint {url.path}.")
+
+        query = params.get('q', [''])[-1].strip()
+        if not query:
+            raise HttpError(400, "Parameter q is required.")
+        if name == 'year' and parse_year(query) is None:
+            if parse_year_range(query) is None:
+                raise HttpError(400, f"Parameter q must be a year or a range of years, not {query!r}.")
+            name = 'year_range'
+        return name, query, parse_options(params, self.defaults)
+
+    def _run(self, name: str, query: Optional[str], options: BatchOptions) -> dict:
+        """
+        Runs a search and returns its JSON payload.
+        """
+        if name == 'health':
+            return {'status': 'ok', 'movies': len(self.search.index.movies), 'cache': self.search.cache.stats()}
+        if name == 'routed':
+            return run_query(self.search, self.databases, query, options)
+        return {'query': query, 'search': name, 'results': run_search(self.search, name, query, options)}
+
+    async def handle(self, method: str, target: str) -> Tuple[int, dict]:
+        """
+        Returns the status and JSON payload of a request.
+
+        Parameters
+        ----------
+        method : str
+            The HTTP method of the request.
+        target : str
+            The path and query string of the request.
+        """
+        try:
+            name, query, options = self._route(method, target)
+            if name in _EXECUTOR_SEARCHES:
+                loop = asyncio.get_running_loop()
+                payload = await loop.run_in_executor(self._executor, self._run, name, query, options)
+            else:
+                payload = self._run(name, query, options)
+            return 200, payload
+        except HttpError as e:
+            return e.status, {'error': e.message}
+        except Exception as e:
+            logger.exception(f"Search failed for {target}.")
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Answers the requests of a connection until the client closes it, asks to, or stays idle.
+        """
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {'error': "Request head is too large."}, False)
+                    return
+
+                lines = head.decode('latin-1').split('\r\n')
+                request_line = lines[0].split()
+                if len(request_line) != 3 or not request_line[2].startswith('HTTP/'):
+                    await self._respond(writer, 400, {'error': "Malformed request line."}, False)
+                    return
+                method, target, version = request_line
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                # A request body is not used, but must be read to reach the next request
+                length = headers.get('content-length', '0')
+                if not length.isdigit():
+                    await self._respond(writer, 400, {'error': "Malformed Content-Length."}, False)
+                    return
+                if int(length):
+                    await reader.readexactly(int(length))
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                status, payload = await self.handle(method, target)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+        """
+        Writes a JSON response.
+        """
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def start(self) -> asyncio.AbstractServer:
+        """
+        Starts listening, the port picked by the system is set when port is 0.
+        """
+        if self.sock is not None:
+            self._server = await asyncio.start_server(self._handle_connection, sock=self.sock, limit=MAX_HEADER_SIZE)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                      limit=MAX_HEADER_SIZE)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        logger.info(f"Search server listening on http://{self.host}:{self.port}.")
+        return self._server
+
+    async def serve_forever(self):
+        """
+        Starts listening and serves requests until cancelled.
+        """
+        server = await self.start()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """
+        Stops listening, then closes the connections kept alive and shuts the search threads down.
+        """
+        if self._server is not None:
+            self._server.close()
+        connections = list(self._connections)
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        self.close()
+
+    def close(self):
+        """
+        Stops listening and shuts the search threads down.
+        """
+        if self._server is not None:
+            self._server.close()
+        self._executor.shutdown(wait=False)
+
+
+def _serve_process(search: Search, databases: dict, defaults: BatchOptions, sock: socket.socket, workers: int):
+    """
+    Serves requests in a forked process until it is terminated or interrupted.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = SearchServer(search, databases, defaults, workers=workers, sock=sock)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def _stop(signum, frame):
+    """ Stops the parent process of serve_prefork like an interrupt, so that it terminates its children """
+    raise KeyboardInterrupt
+
+
+def serve_prefork(search: Search, databases: dict, defaults: Optional[BatchOptions], sock: socket.socket,
+                  processes: int, workers: int = DEFAULT_WORKERS):
+    """
+    Serves requests with processes forked from this one, until interrupted or terminated.
+
+    The index is moved into a shared arena and the objects of this process are frozen
+    out of the garbage collector before forking, so the processes read the postings,
+    vocabularies and numeric columns of a single copy of the index instead of copying
+    the pages they touch. Every process accepts the connections of the same listening
+    socket and runs its general searches on its own threads. A process that exits is
+    replaced. Each process keeps its own query cache.
+
+    Parameters
+    ----------
+    search : Search
+        The search engine, its index can no longer be added to afterwards.
+    databases : dict
+        The category databases used to route queries.
+    defaults : Optional[BatchOptions]
+        The settings of the searches when a request does not set them.
+    sock : socket.socket
+        The listening socket.
+    processes : int
+        The number of processes serving requests.
+    workers : int
+        The number of threads running the general searches in each process.
+    """
+    context = multiprocessing.get_context('fork')
+    arena = SharedArena()
+    search.index.share(arena)
+    logger.info(f"Index moved into {arena.nbytes} bytes of shared memory.")
+    gc.collect()
+    release_free_memory()
+    # Objects collected in a forked process would have their pages copied by the collector
+    gc.freeze()
+
+    def start_process():
+        process = context.Process(target=_serve_process, args=(search, databases, defaults, sock, workers),
+                                  daemon=True)
+        process.start()
+        return process
+
+    signal.signal(signal.SIGTERM, _stop)
+    children = [start_process() for _ in range(processes)]
+    try:
+        while True:
+            wait([process.sentinel for process in children])
+            for position, process in enumerate(children):
+                if not process.is_alive():
+                    logger.warning(f"Search process {process.pid} exited with code {process.exitcode}, restarting it.")
+                    children[position] = start_process()
+    except KeyboardInterrupt:
+        logger.info("Search server stopped.")
+    finally:
+        for process in children:
+            process.terminate()
+        for process in children:
+            process.join()
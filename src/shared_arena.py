@@ -0,0 +1,325 @@
+"""
+This module defines the SharedArena class, a memory region shared with forked worker processes, and the
+read-only term dictionaries stored in it: SharedVocabulary, PackedPostings and PackedValues.
+
+A forked worker sees the memory of the parent copy-on-write, but every Python object it
+reads has its reference count written, so the pages holding the many small arrays of an
+index are copied one by one as queries touch them. Once moved into an arena, the
+postings and vocabularies are a few flat buffers that the workers only ever read, so
+the pages stay shared however long the workers run.
+"""
+
+import ctypes
+import ctypes.util
+import mmap
+import zlib
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.compressed_postings import CompressedPostings
+
+# Size of the mappings the arena allocates buffers from, larger buffers get their own mapping
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# Buffers are aligned for any NumPy dtype
+_ALIGNMENT = 16
+
+# Empty slot of the hash table of a vocabulary
+_EMPTY_SLOT = 0xFFFFFFFF
+
+
+class SharedArena:
+    """
+    A class used to represent memory shared with the processes forked after it is filled.
+
+    Buffers are copied into anonymous shared mappings, which forked processes inherit
+    without copying, and are read through views of the mappings. The views are read-only,
+    the arena must be filled before the workers are forked.
+
+    Attributes
+    ----------
+    nbytes : int
+        the number of bytes of the buffers copied into the arena
+    _segments : List[mmap.mmap]
+        a private attribute holding the mappings of the arena
+    _sizes : List[int]
+        a private attribute holding the number of bytes used in every mapping
+    _position : int
+        a private attribute holding the first free byte of the last mapping
+
+    Methods
+    -------
+    store(data)
+        Copies bytes into the arena and returns their mapping and offset.
+    view(data, typecode)
+        Copies an array into the arena and returns a read-only memoryview of it.
+    ndarray(data)
+        Copies a NumPy array into the arena and returns a read-only NumPy view of it.
+    segments()
+        Returns the mappings of the arena with the number of bytes used in each of them.
+    """
+
+    def __init__(self, segment_size: int = DEFAULT_SEGMENT_SIZE):
+        self.segment_size = segment_size
+        self.nbytes = 0
+        self._segments = []
+        self._sizes = []
+        self._position = 0
+
+    def store(self, data) -> tuple:
+        """
+        Copies a bytes-like object into the arena.
+
+        Returns
+        -------
+        tuple
+            the mapping holding the bytes and their offset in it
+        """
+        data = memoryview(data).cast('B')
+        size = len(data)
+        start = -(-self._position // _ALIGNMENT) * _ALIGNMENT
+        if not self._segments or start + size > len(self._segments[-1]):
+            self._segments.append(mmap.mmap(-1, max(self.segment_size, size, 1)))
+            self._sizes.append(0)
+            start = 0
+        segment = self._segments[-1]
+        segment[start:start + size] = data
+        self._position = self._sizes[-1] = start + size
+        self.nbytes += size
+        return segment, start
+
+    def view(self, data: Union[array, Sequence[int]], typecode: str) -> memoryview:
+        """
+        Copies an array into the arena and returns a read-only memoryview with its typecode.
+        Indexing and iterating the view give Python ints, like the array.
+        """
+        if not isinstance(data, array) or data.typecode != typecode:
+            data = array(typecode, data)
+        segment, start = self.store(data)
+        return memoryview(segment)[start:start + len(data) * data.itemsize].toreadonly().cast(typecode)
+
+    def ndarray(self, data: np.ndarray) -> np.ndarray:
+        """
+        Copies a NumPy array into the arena and returns a read-only NumPy view of it.
+        """
+        data = np.ascontiguousarray(data)
+        segment, start = self.store(data.reshape(-1).view(np.uint8))
+        shared = np.frombuffer(segment, dtype=data.dtype, count=data.size, offset=start).reshape(data.shape)
+        shared.flags.writeable = False
+        return shared
+
+    def segments(self) -> List[Tuple[mmap.mmap, int]]:
+        """
+        Returns the mappings of the arena with the number of bytes used in each of them.
+        """
+        return list(zip(self._segments, self._sizes))
+
+
+def release_free_memory():
+    """
+    Returns the memory freed by the C allocator to the system, where the C library supports it.
+
+    Once the structures of an index are moved into an arena, the memory they used is free
+    but still resident, and would be inherited by every forked process.
+    """
+    try:
+        ctypes.CDLL(ctypes.util.find_library('c')).malloc_trim(0)
+    except (AttributeError, OSError, TypeError):
+        # Only the GNU C library has malloc_trim
+        pass
+
+
+class SharedVocabulary:
+    """
+    A class used to represent a read-only list of distinct terms stored in a SharedArena.
+
+    The terms are encoded one after the other in a single buffer, and an open addressing
+    hash table keyed by the CRC-32 of the encoded term maps them back to their number, so
+    neither the terms nor the table are Python objects the workers could copy.
+
+    Attributes
+    ----------
+    _text : memoryview
+        a private attribute holding the UTF-8 encoded terms, one after the other
+    _offsets : memoryview
+        a private attribute holding the offset of every term in _text, and the end of _text
+    _slots : memoryview
+        a private attribute holding the hash table of the term numbers, _EMPTY_SLOT when free
+
+    Methods
+    -------
+    find(term)
+        Returns the number of a term, -1 if missing.
+    """
+
+    def __init__(self, terms: Sequence[str], arena: SharedArena):
+        encoded = [term.encode('utf-8') for term in terms]
+        offsets = array('Q', [0])
+        for term in encoded:
+            offsets.append(offsets[-1] + len(term))
+        self._text = arena.view(b''.join(encoded), 'B')
+        self._offsets = arena.view(offsets, 'Q')
+
+        # A table at most half full keeps the probe sequences short
+        size = 1 << max(1, 2 * len(encoded) - 1).bit_length()
+        slots = array('I', [_EMPTY_SLOT]) * size
+        mask = size - 1
+        for number, term in enumerate(encoded):
+            slot = zlib.crc32(term) & mask
+            while slots[slot] != _EMPTY_SLOT:
+                slot = (slot + 1) & mask
+            slots[slot] = number
+        self._slots = arena.view(slots, 'I')
+        self._mask = mask
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, number: int) -> str:
+        """ Returns the term of a number """
+        return bytes(self._text[self._offsets[number]:self._offsets[number + 1]]).decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for number in range(len(self)):
+            yield self[number]
+
+    def find(self, term: str) -> int:
+        """
+        Returns the number of a term, -1 if the term is not in the vocabulary.
+        """
+        encoded = term.encode('utf-8')
+        slot = zlib.crc32(encoded) & self._mask
+        while True:
+            number = self._slots[slot]
+            if number == _EMPTY_SLOT:
+                return -1
+            if self._text[self._offsets[number]:self._offsets[number + 1]] == encoded:
+                return number
+            slot = (slot + 1) & self._mask
+
+
+class PackedPostings(Mapping):
+    """
+    A class used to represent a read-only dictionary of terms mapped to sorted doc IDs, stored in a SharedArena.
+
+    It replaces a dictionary of terms mapped to arrays: the lists of every term are laid
+    end to end in one buffer, and a term is looked up in a SharedVocabulary. The lists are
+    returned as memoryviews of the buffer, which are indexed, sliced, iterated and
+    bisected like the arrays.
+
+    Attributes
+    ----------
+    vocabulary : SharedVocabulary
+        the terms, the list of the term number n spans _values[_offsets[n]:_offsets[n + 1]]
+    _values : memoryview
+        a private attribute holding the lists of every term, one after the other
+    _offsets : memoryview
+        a private attribute holding the position of the list of every term in _values, and the end of _values
+    """
+
+    def __init__(self, vocabulary: SharedVocabulary, lists: Iterable[Sequence[int]], arena: SharedArena,
+                 typecode: str = 'I'):
+        """
+        Copies the lists into the arena.
+
+        Parameters
+        ----------
+            vocabulary : SharedVocabulary
+                the terms of the lists, a vocabulary can be shared by dictionaries with the same terms
+            lists : Iterable[Sequence[int]]
+                the list of every term of the vocabulary, in order, arrays or CompressedPostings
+            arena : SharedArena
+                the arena the lists are copied into
+            typecode : str
+                the array typecode of the values
+        """
+        self.vocabulary = vocabulary
+        values = array(typecode)
+        offsets = array('Q', [0])
+        for postings in lists:
+            values.extend(postings.to_array() if isinstance(postings, CompressedPostings) else postings)
+            offsets.append(len(values))
+        if len(offsets) != len(vocabulary) + 1:
+            raise ValueError(f"Expected {len(vocabulary)} lists, got {len(offsets) - 1}.")
+        self._values = arena.view(values, typecode)
+        self._offsets = arena.view(offsets, 'Q')
+
+    @classmethod
+    def from_dict(cls, lists: Dict[str, Sequence[int]], arena: SharedArena, typecode: str = 'I') -> 'PackedPostings':
+        """
+        Copies a dictionary of terms mapped to lists into the arena.
+        """
+        return cls(SharedVocabulary(list(lists), arena), lists.values(), arena, typecode)
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.vocabulary)
+
+    def __contains__(self, term) -> bool:
+        return isinstance(term, str) and self.vocabulary.find(term) >= 0
+
+    def __getitem__(self, term: str) -> memoryview:
+        number = self.vocabulary.find(term) if isinstance(term, str) else -1
+        if number < 0:
+            raise KeyError(term)
+        return self._values[self._offsets[number]:self._offsets[number + 1]]
+
+    def get(self, term: str, default=None):
+        number = self.vocabulary.find(term) if isinstance(term, str) else -1
+        if number < 0:
+            return default
+        return self._values[self._offsets[number]:self._offsets[number + 1]]
+
+
+class PackedValues(Mapping):
+    """
+    A class used to represent a read-only dictionary of terms mapped to integers, stored in a SharedArena.
+
+    Attributes
+    ----------
+    vocabulary : SharedVocabulary
+        the terms, the value of the term number n is _values[n]
+    _values : memoryview
+        a private attribute holding the value of every term
+    """
+
+    def __init__(self, vocabulary: SharedVocabulary, values: Iterable[int], arena: SharedArena, typecode: str = 'q'):
+        """
+        Copies the values into the arena.
+
+        Parameters
+        ----------
+            vocabulary : SharedVocabulary
+                the terms of the values
+            values : Iterable[int]
+                the value of every term of the vocabulary, in order
+            arena : SharedArena
+                the arena the values are copied into
+            typecode : str
+                the array typecode of the values
+        """
+        self.vocabulary = vocabulary
+        self._values = arena.view(array(typecode, values), typecode)
+        if len(self._values) != len(vocabulary):
+            raise ValueError(f"Expected {len(vocabulary)} values, got {len(self._values)}.")
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.vocabulary)
+
+    def __contains__(self, term) -> bool:
+        return isinstance(term, str) and self.vocabulary.find(term) >= 0
+
+    def __getitem__(self, term: str) -> int:
+        number = self.vocabulary.find(term) if isinstance(term, str) else -1
+        if number < 0:
+            raise KeyError(term)
+        return self._values[number]
+
@@ -0,0 +1,248 @@
+"""
+This module is responsible for persisting the built search data to a versioned on-disk snapshot.
+
+A snapshot holds the movie store, the Index and the category databases so that
+start-up can skip parsing the JSON catalog and rebuilding the index. Each snapshot
+records the checksum of the JSON file it was built from and is ignored as soon as
+that file changes.
+
+The postings, vocabularies, JSON corpus and numeric columns of the index are written
+as the flat buffers Index.share lays them out in, and are read through a memory
+mapping of the file instead of being copied onto the heap. Only the rest of the data,
+such as the movie store and the databases, is pickled.
+"""
+
+import hashlib
+import logging
+import math
+import mmap
+import os
+import pickle
+import struct
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.index import Index
+from src.models.movie import Movie
+from src.shared_arena import SharedArena
+
+logger = logging.getLogger('movie_search')
+
+SNAPSHOT_MAGIC = b'MVSNAP'
+SNAPSHOT_VERSION = 24
+
+# magic, format version, sha256 digest of the source file, payload offset, payload length
+_HEADER = struct.Struct('<6sH32sQQ')
+
+
+def _align(offset: int) -> int:
+    """ Returns the first offset from which a file can be mapped at or after an offset """
+    return -(-offset // mmap.ALLOCATIONGRANULARITY) * mmap.ALLOCATIONGRANULARITY
+
+
+def _address(buffer) -> int:
+    """ Returns the address of the first byte of a buffer """
+    return np.frombuffer(buffer, dtype=np.uint8).ctypes.data
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """
+    A pickler writing the views of the mappings of a SharedArena as their position in the snapshot file.
+    """
+
+    def __init__(self, file, segments: Dict[int, Tuple[int, int]]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        # The file offset and size of every mapping of the arena, by id of the mapping
+        self._segments = segments
+
+    def persistent_id(self, obj):
+        if isinstance(obj, mmap.mmap):
+            location = self._segments.get(id(obj))
+            return ('mapping',) + location if location is not None else None
+        if isinstance(obj, memoryview):
+            base = obj.obj
+        elif isinstance(obj, np.ndarray):
+            base = obj
+            while isinstance(base, np.ndarray):
+                base = base.base
+            if isinstance(base, memoryview):
+                base = base.obj
+        else:
+            return None
+        location = self._segments.get(id(base))
+        # A strided view is not a single range of the mapping, NumPy pickles it by value
+        contiguous = obj.c_contiguous if isinstance(obj, memoryview) else obj.flags.c_contiguous
+        if location is None or not contiguous:
+            return None
+        start = _address(obj) - _address(base)
+        if isinstance(obj, memoryview):
+            return ('view',) + location + (start, obj.nbytes, obj.format)
+        return ('ndarray',) + location + (start, obj.dtype.str, obj.shape)
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """
+    An unpickler reading the views written by _SnapshotPickler from mappings of the snapshot file.
+    """
+
+    def __init__(self, file, fileno: int):
+        super().__init__(file)
+        self._fileno = fileno
+        self._mappings = {}
+
+    def _mapping(self, offset: int, size: int) -> mmap.mmap:
+        """ Returns the read-only mapping of size bytes of the file from offset, mapped once """
+        mapping = self._mappings.get(offset)
+        if mapping is None:
+            mapping = self._mappings[offset] = mmap.mmap(self._fileno, size, offset=offset, access=mmap.ACCESS_READ)
+        return mapping
+
+    def persistent_load(self, pid):
+        kind, offset, size = pid[:3]
+        mapping = self._mapping(offset, size)
+        if kind == 'mapping':
+            return mapping
+        if kind == 'view':
+            start, nbytes, typecode = pid[3:]
+            return memoryview(mapping)[start:start + nbytes].cast(typecode)
+        if kind == 'ndarray':
+            start, dtype, shape = pid[3:]
+            count = math.prod(shape)
+            return np.frombuffer(mapping, dtype=np.dtype(dtype), count=count, offset=start).reshape(shape)
+        raise pickle.UnpicklingError(f"Unknown snapshot buffer {kind!r}.")
+
+
+def compute_checksum(filepath: str) -> bytes:
+    """
+    Compute the sha256 digest of a file.
+
+    Parameters
+    ----------
+    filepath : str
+        Path of the file to checksum.
+
+    Returns
+    -------
+    bytes
+        The raw sha256 digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def save_snapshot(snapshot_path: str, checksum: bytes, movies: List[Movie], index: Index, databases: dict):
+    """
+    Write the movie store, index and databases to a snapshot file.
+
+    The data is copied and the index of the copy is moved into a SharedArena, whose
+    mappings are written one after the other, each at an offset the file can be mapped
+    from, followed by the pickled data with references to the buffers in them. The
+    index passed in is left as is.
+
+    The file is written next to its destination and moved into place once complete,
+    so a reader never observes a partially written snapshot.
+
+    Parameters
+    ----------
+    snapshot_path : str
+        Destination path of the snapshot.
+    checksum : bytes
+        sha256 digest of the JSON catalog the data was built from.
+    movies : List[Movie]
+        The movie store.
+    index : Index
+        The built index.
+    databases : dict
+        The category databases used to route queries.
+    """
+    # Sharing the index makes it read-only, a copy is shared instead of the index in use
+    data = pickle.loads(pickle.dumps({'movies': movies, 'index': index, 'databases': databases},
+                                     protocol=pickle.HIGHEST_PROTOCOL))
+    arena = SharedArena()
+    data['index'].share(arena)
+
+    segments = {}
+    offset = _HEADER.size
+    for segment, size in arena.segments():
+        offset = _align(offset)
+        # An empty mapping cannot be mapped back, at least one byte is written
+        segments[id(segment)] = (offset, max(size, 1))
+        offset += max(size, 1)
+
+    buffer = BytesIO()
+    _SnapshotPickler(buffer, segments).dump(data)
+    payload = buffer.getbuffer()
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, checksum, offset, len(payload))
+
+    tmp_path = f"{snapshot_path}.tmp"
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(header)
+        for segment, _ in arena.segments():
+            segment_offset, size = segments[id(segment)]
+            snapshot_file.seek(segment_offset)
+            snapshot_file.write(segment[:size])
+        snapshot_file.write(payload)
+    os.replace(tmp_path, snapshot_path)
+    logger.info(f"Snapshot written to {snapshot_path} ({len(payload)} bytes).")
+
+
+def load_snapshot(snapshot_path: str, checksum: bytes) -> Optional[Tuple[List[Movie], Index, dict]]:
+    """
+    Open a snapshot file if it is current.
+
+    The file is memory-mapped, so the header of a stale snapshot is checked without
+    reading the rest of the file. The buffers of the index are views of read-only
+    mappings of the file: they are neither read nor copied until searches use them, and
+    their pages are shared with every process mapping the same snapshot. The loaded
+    index is read-only, like an index moved into a SharedArena. Only the pickled data
+    is deserialized onto the heap.
+
+    Parameters
+    ----------
+    snapshot_path : str
+        Path of the snapshot.
+    checksum : bytes
+        sha256 digest of the JSON catalog the snapshot is expected to be built from.
+
+    Returns
+    -------
+    Optional[Tuple[List[Movie], Index, dict]]
+        The movies, index and databases, or None if the snapshot is missing,
+        was written by a different format version, is stale or cannot be unpickled.
+    """
+    if not os.path.exists(snapshot_path):
+        return None
+
+    with open(snapshot_path, 'rb') as snapshot_file:
+        if os.fstat(snapshot_file.fileno()).st_size < _HEADER.size:
+            logger.info(f"Ignoring truncated snapshot {snapshot_path}.")
+            return None
+
+        with mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, version, snapshot_checksum, payload_offset, payload_length = _HEADER.unpack_from(mapped)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                logger.info(f"Ignoring snapshot {snapshot_path} with unsupported format version.")
+                return None
+            if snapshot_checksum != checksum:
+                logger.info(f"Ignoring stale snapshot {snapshot_path}.")
+                return None
+            if len(mapped) < payload_offset + payload_length:
+                logger.info(f"Ignoring truncated snapshot {snapshot_path}.")
+                return None
+            payload = BytesIO(mapped[payload_offset:payload_offset + payload_length])
+
+        try:
+            data = _SnapshotUnpickler(payload, snapshot_file.fileno()).load()
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError, TypeError,
+                OSError) as error:
+            # A corrupt payload, or one referring to classes that moved, is rebuilt
+            logger.info(f"Ignoring unreadable snapshot {snapshot_path}: {error!r}.")
+            return None
+
+    logger.info(f"Snapshot loaded from {snapshot_path}.")
+    return data['movies'], data['index'], data['databases']
@@ -0,0 +1,85 @@
+"""
+This module defines the StartupProfile class, which times the phases of the start-up of the search program.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, TextIO
+
+
+class StartupProfile:
+    """
+    A class used to represent the durations of the start-up phases, up to the first query.
+
+    Attributes
+    ----------
+    timings : Dict[str, float]
+        a dictionary containing the phases mapped to their seconds, in the order they ran
+    notes : Dict[str, str]
+        a dictionary containing phases mapped to a remark shown next to their duration
+
+    Methods
+    -------
+    add(phase, seconds, note)
+        Adds seconds to a phase.
+    phase(name)
+        Context manager timing a phase.
+    timed_iter(phase, iterable)
+        Yields the items of an iterable, timing the production of every item as a phase.
+    report(file)
+        Prints the duration of every phase and their total.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.notes: Dict[str, str] = {}
+
+    def __contains__(self, phase: str) -> bool:
+        return phase in self.timings
+
+    def add(self, phase: str, seconds: float, note: Optional[str] = None):
+        """
+        Adds seconds to a phase, a phase timed several times is the sum of its durations.
+        """
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        if note is not None:
+            self.notes[phase] = note
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times the body of a with statement as a phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed_iter(self, phase: str, iterable: Iterable) -> Iterator:
+        """
+        Yields the items of an iterable, the time spent producing them is added to a phase.
+        The time the consumer spends on each item is not counted.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(phase, time.perf_counter() - start)
+                return
+            self.add(phase, time.perf_counter() - start)
+            yield item
+
+    def report(self, file: Optional[TextIO] = None):
+        """
+        Prints the duration of every phase and the time to the first query, their total,
+        to standard error unless a file is given.
+        """
+        file = file if file is not None else sys.stderr
+        for phase, seconds in self.timings.items():
+            note = f" ({self.notes[phase]})" if phase in self.notes else ""
+            print(f"[PROFILE] {phase}: {seconds:.3f} s{note}", file=file)
+        print(f"[PROFILE] time to first query: {sum(self.timings.values()):.3f} s", file=file)
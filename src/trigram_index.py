@@ -0,0 +1,72 @@
+"""
+This module defines the TrigramIndex class, which narrows down substring searches.
+"""
+
+from array import array
+from typing import Optional
+
+from src.shared_arena import PackedPostings, SharedArena
+from src.utils.posting_utils import intersect_postings
+
+TRIGRAM_LENGTH = 3
+
+
+class TrigramIndex:
+    """
+    A class used to represent an index of the character trigrams of a collection of texts.
+
+    A text can only contain a query if it contains every trigram of the query, so
+    intersecting the postings of the query trigrams gives a small set of candidates
+    that is then verified with a plain substring test. Any substring can be searched,
+    whatever characters it is made of.
+
+    Attributes
+    ----------
+    trigrams : Dict[str, array]
+        a dictionary containing trigrams mapped to the sorted ids of the texts containing them
+
+    Methods
+    -------
+    add(text_id, text)
+        Adds the trigrams of a text.
+    candidates(query)
+        Returns the ids of the texts that may contain the query.
+    share(arena)
+        Moves the postings into a shared arena.
+    """
+
+    def __init__(self):
+        self.trigrams = {}
+
+    def add(self, text_id: int, text: str):
+        """
+        Adds the trigrams of a lower-cased text. Texts must be added in increasing id order.
+        """
+        for trigram in {text[i:i + TRIGRAM_LENGTH] for i in range(len(text) - TRIGRAM_LENGTH + 1)}:
+            postings = self.trigrams.get(trigram)
+            if postings is None:
+                postings = self.trigrams[trigram] = array('I')
+            postings.append(text_id)
+
+    def share(self, arena: SharedArena):
+        """
+        Moves the postings into a shared arena, no text can be added afterwards.
+        """
+        self.trigrams = PackedPostings.from_dict(self.trigrams, arena)
+
+    def candidates(self, query: str) -> Optional[array]:
+        """
+        Returns the sorted ids of the texts containing every trigram of a lower-cased query.
+
+        Returns None when the query is shorter than a trigram and cannot narrow down the texts.
+        """
+        if len(query) < TRIGRAM_LENGTH:
+            return None
+
+        postings_lists = []
+        for trigram in {query[i:i + TRIGRAM_LENGTH] for i in range(len(query) - TRIGRAM_LENGTH + 1)}:
+            postings = self.trigrams.get(trigram)
+            if postings is None:
+                return array('I')
+            postings_lists.append(postings)
+        return intersect_postings(postings_lists)
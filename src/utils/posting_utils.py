@@ -0,0 +1,113 @@
+"""
+This module contains utility functions for working with posting lists,
+the sorted arrays of doc IDs stored in the Index for every word.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Sequence
+
+from src.compressed_postings import CompressedPostings, compress_postings
+
+
+def gallop(postings: Sequence[int], target: int, lo: int = 0) -> int:
+    """
+    Find the position of the first doc ID greater than or equal to target, starting at lo.
+
+    The search probes positions lo+1, lo+2, lo+4, ... until it overshoots the target and
+    then binary searches the last step, so skipping ahead costs O(log distance).
+
+    Parameters
+    ----------
+    postings : Sequence[int]
+        Sorted doc IDs.
+    target : int
+        The doc ID to look for.
+    lo : int
+        Position to start the search from.
+
+    Returns
+    -------
+    int
+        Position of the first doc ID >= target, len(postings) if there is none.
+    """
+    size = len(postings)
+    if lo >= size or postings[lo] >= target:
+        return lo
+
+    step = 1
+    while lo + step < size and postings[lo + step] < target:
+        step <<= 1
+    return bisect_left(postings, target, lo + (step >> 1) + 1, min(lo + step + 1, size))
+
+
+def intersect_postings(postings_lists: Sequence[Sequence[int]]) -> array:
+    """
+    Intersect sorted posting lists.
+
+    The lists are processed from the rarest to the most common one. Each doc ID of the
+    running result is looked up in the next list with a galloping search, so the cost is
+    driven by the size of the smallest list rather than the largest one. Compressed lists
+    only decode the blocks that may hold a doc ID of the running result.
+
+    Parameters
+    ----------
+    postings_lists : Sequence[Sequence[int]]
+        Sorted doc ID lists to intersect, arrays or CompressedPostings.
+
+    Returns
+    -------
+    array
+        Sorted doc IDs present in every list.
+    """
+    if not postings_lists:
+        return array('I')
+
+    ordered = sorted(postings_lists, key=len)
+    result = array('I', ordered[0])
+
+    for postings in ordered[1:]:
+        if not result:
+            break
+        if isinstance(postings, CompressedPostings):
+            result = postings.intersect(result)
+            continue
+        matches = array('I')
+        position = 0
+        for doc_id in result:
+            position = gallop(postings, doc_id, position)
+            if position == len(postings):
+                break
+            if postings[position] == doc_id:
+                matches.append(doc_id)
+        result = matches
+
+    return result
+
+
+def postings_memory_report(postings_lists: Dict[str, Sequence[int]]) -> Dict[str, int]:
+    """
+    Measure the memory used by posting lists in each representation.
+
+    Parameters
+    ----------
+    postings_lists : Dict[str, Sequence[int]]
+        Words mapped to their sorted doc IDs, arrays or CompressedPostings.
+
+    Returns
+    -------
+    Dict[str, int]
+        The number of words and postings, and the bytes used by the posting lists as
+        lists of object references (the former List[Movie] values), as arrays of
+        unsigned ints and compressed (lists shorter than MIN_COMPRESSED_LENGTH stay arrays).
+    """
+    report = {'words': len(postings_lists), 'postings': 0, 'list_bytes': 0, 'array_bytes': 0, 'compressed_bytes': 0}
+    for postings in postings_lists.values():
+        doc_ids = postings.to_array() if isinstance(postings, CompressedPostings) else array('I', postings)
+        compressed = compress_postings(doc_ids)
+        report['postings'] += len(doc_ids)
+        report['list_bytes'] += sys.getsizeof(list(doc_ids))
+        report['array_bytes'] += sys.getsizeof(doc_ids)
+        report['compressed_bytes'] += compressed.nbytes if isinstance(compressed, CompressedPostings) else sys.getsizeof(compressed)
+    return report
@@ -2,17 +2,18 @@
 This module contains utility functions for printing search results.
 """
 
-from typing import List
+from typing import List, Optional
 from src.models.movie import Movie
-from src.utils.utils import sort_by_rating
 
-def print_no_results(movies, num_results):
+def print_no_results(top_movies: List[Movie]):
     """
     Print suggestion of top rated movies when no matching results are found.
-    """
-    # Sort the list of Movies based on ratings
-    top_movies = sort_by_rating(movies, num_results)
 
+    Parameters
+    ----------
+    top_movies: List[Movie]
+        The top rated movies, from the highest rating.
+    """
     print("\n--- No Results Found ---")
     print("Here are some of the top rated movies of all time:")
     for i, movie in enumerate(top_movies, start=1):
@@ -32,6 +33,20 @@ def print_exact_match_results(movies: List[Movie]):
     for i, movie in enumerate(movies, start=1):
         print(f"{i}. {movie.name} ({movie.year})")
 
+def print_ranked_results(movies: List[Movie]):
+    """
+    Print movies from ranked search, from the most relevant.
+
+    Parameters
+    ----------
+    movies: List[Movie]
+        The list of movies found from the search.
+    """
+    print("\n--- Top Ranked Matches found ---")
+    print("\nMovies found:")
+    for i, movie in enumerate(movies, start=1):
+        print(f"{i}. {movie.name} ({movie.year})")
+
 def print_probable_match_results(movies: List[Movie]):
     """
     Print movies from probable/fuzzy match search.
@@ -85,6 +100,32 @@ def print_search_results_for_year(movies: List[Movie], year: int):
     else:
         print(f"\nNo Movies Found from the year, {year}.")
 
+def print_search_results_for_year_range(movies: List[Movie], start: Optional[int], end: Optional[int]):
+    """
+    Print movies for a range of years.
+
+    Parameters
+    ----------
+    movies: List[Movie]
+        The list of movies found from the search.
+    start: Optional[int]
+        The first year of the range, None when unbounded.
+    end: Optional[int]
+        The last year of the range, None when unbounded.
+    """
+    if start is None:
+        years = f"up to {end}"
+    elif end is None:
+        years = f"since {start}"
+    else:
+        years = f"from {start} to {end}"
+    if movies:
+        print(f"\n\nTop rated movies released {years}:")
+        for i, movie in enumerate(movies, start=1):
+            print(f"{i}. {movie.name} ({movie.year})")
+    else:
+        print(f"\nNo Movies Found released {years}.")
+
 def print_search_results_for_directors(movies: List[Movie], director: str):
     """
     Print movies from a specific director.
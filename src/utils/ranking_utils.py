@@ -0,0 +1,155 @@
+"""
+This module contains utility functions for ranking movies with BM25.
+
+Top-k retrieval uses the WAND algorithm: every query term has an upper bound on
+the score it can contribute, and movies whose summed upper bounds cannot beat the
+current k-th best score are skipped without being scored.
+"""
+
+import heapq
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.index import Index
+from src.utils.posting_utils import gallop
+
+# BM25 term frequency saturation and length normalization parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def bm25_idf(doc_freq: int, num_docs: int) -> float:
+    """
+    Returns the BM25 inverse document frequency of a word found in doc_freq of num_docs movies.
+    """
+    return math.log(1 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def bm25_term_score(term_freq: int, doc_length: int, avg_doc_length: float, idf: float) -> float:
+    """
+    Returns the BM25 score contributed by a word occurring term_freq times in a movie of doc_length words.
+    """
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / avg_doc_length) if avg_doc_length else BM25_K1
+    return idf * term_freq * (BM25_K1 + 1) / (term_freq + norm)
+
+
+class _TermCursor:
+    """
+    A cursor over the posting list of a query term.
+
+    Attributes
+    ----------
+    postings : array
+        sorted doc IDs of the movies containing the term
+    term_freqs : array
+        frequencies of the term aligned with the postings
+    idf : float
+        inverse document frequency of the term
+    upper_bound : float
+        highest score the term can contribute to a movie
+    position : int
+        current position in the postings
+    """
+
+    def __init__(self, postings, term_freqs, idf: float, upper_bound: float):
+        self.postings = postings
+        self.term_freqs = term_freqs
+        self.idf = idf
+        self.upper_bound = upper_bound
+        self.position = 0
+
+    @property
+    def doc_id(self) -> int:
+        """ Returns the current doc ID, or None once the postings are exhausted """
+        return self.postings[self.position] if self.position < len(self.postings) else None
+
+    def advance_to(self, doc_id: int):
+        """ Moves the cursor to the first doc ID greater than or equal to doc_id """
+        self.position = gallop(self.postings, doc_id, self.position)
+
+
+def top_k_bm25(index: Index, terms: List[str], k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+    """
+    Find the k movies with the highest BM25 score for the query terms.
+
+    A movie matches when it contains at least one of the terms. Movies left out of the
+    allowed bitmap are skipped without being scored.
+
+    Parameters
+    ----------
+    index : Index
+        The index holding the postings and the collection statistics.
+    terms : List[str]
+        The query terms, as produced by Index.tokenize.
+    k : int
+        Number of movies to return.
+    allowed : Optional[np.ndarray]
+        Bitmap of the doc IDs that can be returned, every movie when None.
+
+    Returns
+    -------
+    List[Tuple[int, float]]
+        Doc IDs and scores, from the highest score to the lowest; ties are ordered by doc ID.
+    """
+    num_docs = len(index.doc_lengths)
+    if k <= 0 or num_docs == 0:
+        return []
+
+    avg_doc_length = index.avg_doc_length
+    cursors = []
+    for term in dict.fromkeys(terms):
+        postings = index.get_decoded_postings(term)
+        if not postings:
+            continue
+        idf = bm25_idf(len(postings), num_docs)
+        # The score grows with the term frequency and shrinks with the movie length
+        upper_bound = bm25_term_score(index.max_term_freqs[term], index.min_doc_length, avg_doc_length, idf)
+        cursors.append(_TermCursor(postings, index.get_term_freqs(term), idf, upper_bound))
+
+    top = []  # min-heap of (score, -doc_id)
+    threshold = 0.0
+
+    while cursors:
+        cursors = [cursor for cursor in cursors if cursor.doc_id is not None]
+        cursors.sort(key=lambda cursor: cursor.doc_id)
+
+        # Find the pivot: the first cursor at which the summed upper bounds can beat the threshold
+        pivot = None
+        bound = 0.0
+        for position, cursor in enumerate(cursors):
+            bound += cursor.upper_bound
+            if len(top) < k or bound > threshold:
+                pivot = position
+                break
+        if pivot is None:
+            break
+
+        pivot_doc_id = cursors[pivot].doc_id
+        if cursors[0].doc_id == pivot_doc_id:
+            # Every cursor up to the pivot is on the pivot movie: score it fully
+            is_allowed = allowed is None or allowed[pivot_doc_id]
+            score = 0.0
+            for cursor in cursors:
+                if cursor.doc_id != pivot_doc_id:
+                    break
+                if is_allowed:
+                    score += bm25_term_score(cursor.term_freqs[cursor.position], index.doc_lengths[pivot_doc_id],
+                                             avg_doc_length, cursor.idf)
+                cursor.position += 1
+            if not is_allowed:
+                continue
+
+            if len(top) < k:
+                heapq.heappush(top, (score, -pivot_doc_id))
+            elif score > threshold:
+                heapq.heapreplace(top, (score, -pivot_doc_id))
+            if len(top) == k:
+                threshold = top[0][0]
+        else:
+            # Movies before the pivot movie cannot make the top k: skip them
+            for cursor in cursors[:pivot]:
+                cursor.advance_to(pivot_doc_id)
+
+    return [(-negative_doc_id, score) for score, negative_doc_id in sorted(top, key=lambda entry: (-entry[0], -entry[1]))]
@@ -5,16 +5,25 @@ It includes functions used to parse a string into a date in strict 'YYYY-MM-DD'
 well as search functions to find movies by year, actor's name, creator name, and genre.
 """
 
-from typing import Dict, List
-from fuzzywuzzy import fuzz
-from operator import attrgetter
+from array import array
+from typing import List, Optional, Tuple
+import re
+import numpy as np
 from src.models.movie import Movie
 from src.index import Index
+from src.utils.posting_utils import intersect_postings
+from src.utils.ranking_utils import top_k_bm25
 
 import logging
 
 logger = logging.getLogger('movie_search')
 
+# A year, a range of years, a decade or a bounded range of years
+_YEAR_RANGE = re.compile(r'(\d{4})|(\d{4})\s*-\s*(\d{4})|(\d{3}0)s|(>=|>|<=|<)\s*(\d{4})', re.ASCII)
+
+# Searches a query can be routed to, in the order they run
+SEARCH_PATHS = ('movie_name', 'year', 'year_range', 'actor', 'director', 'creator', 'genre', 'general')
+
 def perform_exact_search(movies: List[Movie], query: str) -> List[Movie]:
     """
     Performs an exact match search by looking for the query as a substring in the movie's name.
@@ -36,9 +45,39 @@ def perform_exact_search(movies: List[Movie], query: str) -> List[Movie]:
     logger.debug("Exact search movies: %s", [movie.name for movie in movies_match])
     return movies_match
 
-def perform_combined_search(index: Index, query: str) -> List[Movie]:
+def _log_movies(index: Index, message: str, doc_ids):
+    """
+    Logs the names of the movies found by a search in debug mode.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %s", message, [index.movies[doc_id].name for doc_id in doc_ids])
+
+def filter_doc_ids(doc_ids, allowed: Optional[np.ndarray]):
+    """
+    Keeps the doc IDs set in a bitmap, in the same order.
+
+    Parameters
+    ----------
+    doc_ids : array-like
+        The candidate doc IDs.
+    allowed : Optional[np.ndarray]
+        Bitmap of the doc IDs to keep, every doc ID is kept when None.
+
+    Returns
+    -------
+    array-like
+        The doc IDs set in the bitmap.
+    """
+    if allowed is None:
+        return doc_ids
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    return doc_ids[allowed[doc_ids]]
+
+def combined_search_doc_ids(index: Index, query: str, allowed: Optional[np.ndarray] = None) -> List[int]:
     """
     Attempts to iteratively find matches for chunks of the query within movie names.
+    The posting lists of the chunks are intersected starting from the rarest chunk,
+    then filtered with the allowed bitmap before any movie is fetched.
 
     Parameters
     ----------
@@ -46,103 +85,485 @@ def perform_combined_search(index: Index, query: str) -> List[Movie]:
         An index object containing words mapped to movies where it appears.
     query : str
         The search query (which will be split into chunks).
+    allowed : Optional[np.ndarray]
+        Bitmap of the doc IDs that can be returned, every movie when None.
 
     Returns
     -------
-    list[Movie]
-        List of unique movies that match all chunks of the query.
+    list[int]
+        Doc IDs of the movies that match all chunks of the query, in doc ID order.
     """
     logger.debug("Performing combined index and chunked query search with query: %s", query)
     chunks = query.lower().split()
 
-    intersect_movies = set(index.index[chunks[0]]) if chunks else set()
+    doc_ids = filter_doc_ids(intersect_postings([index.get_postings(chunk) for chunk in chunks]), allowed)
 
-    for chunk in chunks[1:]:
-        intersect_movies &= set(index.index[chunk])
+    _log_movies(index, "Combined index and chunk search movies", doc_ids)
+    return doc_ids.tolist()
 
-    logger.debug("Combined index and chunk search movies: %s", [movie.name for movie in intersect_movies])
-    return list(intersect_movies)
+def perform_combined_search(index: Index, query: str, allowed: Optional[np.ndarray] = None) -> List[Movie]:
+    """
+    Same as combined_search_doc_ids, returning the movies.
+    """
+    return index.get_movies(combined_search_doc_ids(index, query, allowed))
 
-def perform_fuzzy_search(movies: List[Movie], query: str, fuzz_ratio: int) -> List[Movie]:
+def ranked_search_doc_ids(index: Index, query: str, num_results: int, allowed: Optional[np.ndarray] = None) -> List[int]:
     """
-    Attempts to find fuzzy matches of the chunks of the query in movie names.
+    Finds the movies with the highest BM25 score for the words of the query.
+
+    Movies containing any of the words are candidates, so a movie missing some words can
+    still be returned when it scores higher than the others.
 
     Parameters
     ----------
-    movies: List[Movie]
-        The list of movies where we should search.
+    index : Index
+        An index object containing words mapped to movies where it appears.
+    query : str
+        The search query.
+    num_results : int
+        Number of movies to return.
+    allowed : Optional[np.ndarray]
+        Bitmap of the doc IDs that can be returned, every movie when None.
+
+    Returns
+    -------
+    list[int]
+        Doc IDs of the top movies, from the highest score to the lowest.
+    """
+    logger.debug("Performing ranked search with query: %s", query)
+    ranked = top_k_bm25(index, index.tokenize(query), num_results, allowed)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Ranked search movies: %s", [(index.movies[doc_id].name, round(score, 3)) for doc_id, score in ranked])
+    return [doc_id for doc_id, _ in ranked]
+
+def perform_ranked_search(index: Index, query: str, num_results: int, allowed: Optional[np.ndarray] = None) -> List[Movie]:
+    """
+    Same as ranked_search_doc_ids, returning the movies.
+    """
+    return index.get_movies(ranked_search_doc_ids(index, query, num_results, allowed))
+
+def max_edit_distance(word: str, fuzz_ratio: int) -> int:
+    """
+    Converts a fuzz ratio into the number of edits a word of that length can have.
+
+    A word of length n with d substitutions has a fuzz ratio of about 100 * (1 - d / n).
+
+    Parameters
+    ----------
+    word: str
+        The query word.
+    fuzz_ratio: int
+        The minimum similarity ratio to be considered a match in a fuzzy search.
+
+    Returns
+    -------
+    int
+        The highest edit distance allowed for the word.
+    """
+    return int(len(word) * (100 - fuzz_ratio) / 100)
+
+def fuzzy_search_doc_ids(index: Index, query: str, fuzz_ratio: int, allowed: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Attempts to find fuzzy matches of the chunks of the query in the index vocabulary.
+
+    Each chunk is expanded to the index words within its edit budget using the fuzzy
+    dictionary of the index, and the movies matching every chunk are found by
+    intersecting the posting lists of the expanded words.
+
+    Parameters
+    ----------
+    index: Index
+        An index object containing words mapped to movies where it appears.
     query: str
         The search query.
     fuzz_ratio: int
         The minimum similarity ratio to be considered a match in a fuzzy search.
+    allowed: Optional[np.ndarray]
+        Bitmap of the doc IDs that can be returned, every movie when None.
 
     Returns
     -------
-    list[Movie]
-        List of unique movies that match all chunks of the query based on fuzziness.
+    list[int]
+        Doc IDs of the movies that match all chunks of the query based on fuzziness.
     """
     logger.debug("Performing fuzzy search with query: %s", query)
+    chunks = index.tokenize(query)
+
+    chunk_postings = []
+    for chunk in chunks:
+        candidates = index.fuzzy_index.lookup(chunk, max_edit_distance(chunk, fuzz_ratio))
+        if chunk in index.index and chunk not in candidates:
+            candidates.append(chunk)
+        logger.debug("Fuzzy candidates for %s: %s", chunk, candidates)
+        if len(candidates) == 1:
+            chunk_postings.append(index.get_postings(candidates[0]))
+        else:
+            chunk_postings.append(array('I', sorted(set().union(*(index.get_postings(candidate) for candidate in candidates)))))
+
+    doc_ids = filter_doc_ids(intersect_postings(chunk_postings), allowed)
+    _log_movies(index, "Fuzzy search movies", doc_ids)
+    return doc_ids.tolist()
+
+def perform_fuzzy_search(index: Index, query: str, fuzz_ratio: int, allowed: Optional[np.ndarray] = None) -> List[Movie]:
+    """
+    Same as fuzzy_search_doc_ids, returning the movies.
+    """
+    return index.get_movies(fuzzy_search_doc_ids(index, query, fuzz_ratio, allowed))
+
+def match_titles_fuzzy(titles: List[str], query: str, fuzz_ratio: int, workers: int = -1) -> np.ndarray:
+    """
+    Finds the titles similar to every chunk of the query.
+
+    All chunks are scored against all titles in a single rapidfuzz cdist call, which runs
+    in native code on several threads. Scores below fuzz_ratio are cut off early.
+
+    Parameters
+    ----------
+    titles: List[str]
+        The lower-cased movie titles.
+    query: str
+        The search query.
+    fuzz_ratio: int
+        The minimum similarity ratio to be considered a match in a fuzzy search.
+    workers: int
+        Number of threads used by rapidfuzz, -1 uses every core.
+
+    Returns
+    -------
+    np.ndarray
+        Positions of the titles with a fuzz ratio of at least fuzz_ratio for every chunk.
+    """
+    # Imported on first use, only title fuzzy searches need it
+    from rapidfuzz import fuzz, process
+
     chunks = query.lower().split()
-    intersect_movies = set(movie for movie in movies if fuzz.ratio(chunks[0], movie.name.lower()) >= fuzz_ratio) if chunks else set()
+    if not chunks or not titles:
+        return np.empty(0, dtype=np.intp)
 
-    for chunk in chunks[1:]:
-        intersect_movies &= set(movie for movie in movies if fuzz.ratio(chunk, movie.name.lower()) >= fuzz_ratio)
+    # Ratios are rounded to integers when compared with fuzz_ratio
+    cutoff = fuzz_ratio - 0.5
+    scores = process.cdist(chunks, titles, scorer=fuzz.ratio, score_cutoff=cutoff, workers=workers, dtype=np.float32)
+    return np.flatnonzero(np.all(scores >= cutoff, axis=0))
 
-    logger.debug("Fuzzy search movies: %s", [movie.name for movie in intersect_movies])
-    return list(intersect_movies)
+def title_fuzzy_search_doc_ids(index: Index, query: str, fuzz_ratio: int, workers: int = -1,
+                               allowed: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Attempts to find fuzzy matches of the chunks of the query in movie names.
+    Only the names of the allowed movies are scored.
 
-def perform_json_search(movies: List[Movie], query: str) -> List[Movie]:
+    Parameters
+    ----------
+    index: Index
+        An index object holding the lower-cased movie names.
+    query: str
+        The search query.
+    fuzz_ratio: int
+        The minimum similarity ratio to be considered a match in a fuzzy search.
+    workers: int
+        Number of threads used to score the names, -1 uses every core.
+    allowed: Optional[np.ndarray]
+        Bitmap of the doc IDs that can be returned, every movie when None.
+
+    Returns
+    -------
+    list[int]
+        Doc IDs of the movies whose name matches all chunks of the query based on fuzziness.
+    """
+    logger.debug("Performing title fuzzy search with query: %s", query)
+    if allowed is None:
+        doc_ids = match_titles_fuzzy(index.normalized_titles, query, fuzz_ratio, workers)
+    else:
+        candidates = np.flatnonzero(allowed)
+        titles = [index.normalized_titles[doc_id] for doc_id in candidates]
+        doc_ids = candidates[match_titles_fuzzy(titles, query, fuzz_ratio, workers)]
+    _log_movies(index, "Title fuzzy search movies", doc_ids)
+    return doc_ids.tolist()
+
+def perform_title_fuzzy_search(index: Index, query: str, fuzz_ratio: int, workers: int = -1,
+                               allowed: Optional[np.ndarray] = None) -> List[Movie]:
+    """
+    Same as title_fuzzy_search_doc_ids, returning the movies.
+    """
+    return index.get_movies(title_fuzzy_search_doc_ids(index, query, fuzz_ratio, workers, allowed))
+
+def json_search_doc_ids(index: Index, query: str, allowed: Optional[np.ndarray] = None) -> List[int]:
     """
     Performs a JSON substring search by looking for the query as a substring in the movie's raw_json.
     It only performs the search when the query contains non-alphanumeric characters.
+    The lower-cased JSON corpus of the index is scanned in a single pass, and the matches
+    are then restricted to the allowed movies.
 
     Parameters
     ----------
-    movies : List[Movie]
-        The list of movies where we should search.
+    index : Index
+        An index object holding the movies and their JSON corpus.
     query : str
         The search query.
+    allowed : Optional[np.ndarray]
+        Bitmap of the doc IDs that can be returned, every movie when None.
         
     Returns
     -------
-    List[Movie]
-        List of movies where the raw_json contains the search query.
+    List[int]
+        Doc IDs of the movies where the raw_json contains the search query.
     """
     if query.isalnum():  # If the query contains only alphanumeric characters, return an empty list
         return []
 
     logger.debug("Performing JSON substring search with query: %s", query)
     query = query.lower()
-    movies_match = [movie for movie in movies if query in movie.raw_json.lower()]
-    logger.debug("JSON substring search movies: %s", [movie.name for movie in movies_match])
-    return movies_match
+    doc_ids = [int(doc_id) for doc_id in filter_doc_ids(index.json_corpus.search(query), allowed)]
+    _log_movies(index, "JSON substring search movies", doc_ids)
+    return doc_ids
+
+def perform_json_search(index: Index, query: str, allowed: Optional[np.ndarray] = None) -> List[Movie]:
+    """
+    Same as json_search_doc_ids, returning the movies.
+    """
+    return index.get_movies(json_search_doc_ids(index, query, allowed))
+
+def parse_year(query: str) -> Optional[int]:
+    """
+    Parse a query made of ASCII digits only as a year.
+
+    Other numeric characters, such as "½" in "9½", are left to the text searches rather
+    than reaching int().
+
+    Parameters
+    ----------
+    query: str
+        The stripped query to parse.
+
+    Returns
+    -------
+    Optional[int]
+        The year, or None if the query is not a number.
+    """
+    if query.isascii() and query.isdigit():
+        return int(query)
+    return None
+
+def parse_year_range(query: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a year or a range of years.
+
+    Accepted forms are a year ("1994"), a range ("1990-1999"), a decade ("1990s") and
+    a bound (">=2010", ">2010", "<=1980", "<1980").
+
+    Parameters
+    ----------
+    query: str
+        The query to parse.
+
+    Returns
+    -------
+    Optional[Tuple[Optional[int], Optional[int]]]
+        The first and last years of the range, both included and None when unbounded,
+        or None if the query is not a year range.
+    """
+    match = _YEAR_RANGE.fullmatch(query.strip())
+    if match is None:
+        return None
+    year, start, end, decade, operator, bound = match.groups()
+    if year:
+        return int(year), int(year)
+    if start:
+        return min(int(start), int(end)), max(int(start), int(end))
+    if decade:
+        return int(decade), int(decade) + 9
+    return {
+        '>=': (int(bound), None),
+        '>': (int(bound) + 1, None),
+        '<=': (None, int(bound)),
+        '<': (None, int(bound) - 1),
+    }[operator]
+
+def search_paths(query: str, databases: dict) -> List[str]:
+    """
+    Returns the searches of SEARCH_PATHS a query is routed to.
+
+    Every search whose category database holds the query runs, a year range runs the
+    search by year range, and the general search runs when no other search applies.
+
+    Parameters
+    ----------
+    query : str
+        The stripped search query.
+    databases : dict
+        The category databases built from the movies.
 
-def search_by_year(movies: List[Movie], year: int) -> List[Movie]:
+    Returns
+    -------
+    List[str]
+        The searches to run, in the order of SEARCH_PATHS.
+    """
+    paths = []
+    if query in databases['movie_names']:
+        paths.append('movie_name')
+    year = parse_year(query)
+    if year is not None and year in databases['years']:
+        paths.append('year')
+    year_range = parse_year_range(query) if year is None else None
+    if year_range is not None:
+        paths.append('year_range')
+    for path, database in (('actor', 'actors'), ('director', 'directors'), ('creator', 'creators'),
+                           ('genre', 'genres')):
+        if query in databases[database]:
+            paths.append(path)
+    if year_range is None and not any(query in databases[key] for key in databases):
+        paths.append('general')
+    return paths
+
+def search_by_year_range(index: Index, start: Optional[int], end: Optional[int],
+                         num_results: Optional[int] = None) -> List[Movie]:
+    """
+    Search for movies released in a range of years.
+
+    Parameters
+    ----------
+    index: Index
+        The index holding the sorted years.
+    start: Optional[int]
+        The first year of the range, included, unbounded if None.
+    end: Optional[int]
+        The last year of the range, included, unbounded if None.
+    num_results: Optional[int]
+        Number of movies to return, all of them if None.
+
+    Returns
+    -------
+    list[Movie]
+        List of movies released in the range, from the highest rating.
+    """
+    return index.get_movies(index.lookup_years(start, end, num_results))
+
+def search_by_year(index: Index, year: int, num_results: Optional[int] = None) -> List[Movie]:
     """
     Search for movies released in the specified year.
 
     Parameters
     ----------
-    movies: List[Movie]
-        The list of movies where we should search.
+    index: Index
+        The index holding the sorted years.
     year: int
         The year to search for.
+    num_results: Optional[int]
+        Number of movies to return, all of them if None.
+
+    Returns
+    -------
+    list[Movie]
+        List of movies released in the specified year, from the highest rating.
+    """
+    return search_by_year_range(index, year, year, num_results)
+
+def top_rated_movies(index: Index, num_results: Optional[int] = None, doc_ids=None) -> List[Movie]:
+    """
+    Find the movies with the highest rating.
+
+    Parameters
+    ----------
+    index: Index
+        The index holding the movie columns.
+    num_results: Optional[int]
+        Number of movies to return, all of them if None.
+    doc_ids: array-like, optional
+        The doc IDs of the candidate movies, every movie if None.
 
     Returns
     -------
     list[Movie]
-        List of movies released in the specified year.
+        List of movies from the highest rating, movies without a rating last.
     """
-    return [movie for movie in movies if movie.year == year]
+    return index.get_movies(index.columns.sort_by_rating(doc_ids, num_results))
 
-def search_by_actor(movies: List[Movie], actor: str) -> List[Movie]:
+def top_rated_movies_by_year(index: Index, year: int, num_results: Optional[int] = None) -> List[Movie]:
+    """
+    Find the movies released in a year with the highest rating, from the precomputed order.
+
+    Parameters
+    ----------
+    index: Index
+        The index holding the movie columns.
+    year: int
+        The year to search for.
+    num_results: Optional[int]
+        Number of movies to return, all of them if None.
+
+    Returns
+    -------
+    list[Movie]
+        List of movies released in the year from the highest rating.
+    """
+    return index.get_movies(index.columns.top_rated_for_year(year, num_results))
+
+def top_rated_movies_by_genre(index: Index, genre: str, num_results: Optional[int] = None) -> List[Movie]:
+    """
+    Find the movies of a genre with the highest rating, from the precomputed order.
+
+    Parameters
+    ----------
+    index: Index
+        The index holding the genre rating orders.
+    genre: str
+        The genre name, matched case-insensitively.
+    num_results: Optional[int]
+        Number of movies to return, all of them if None.
+
+    Returns
+    -------
+    list[Movie]
+        List of movies of the genre from the highest rating.
+    """
+    return index.get_movies(index.genre_rating_orders.get(genre.lower(), ())[:num_results])
+
+def filter_movies(index: Index, doc_ids=None, **bounds) -> List[Movie]:
+    """
+    Filter movies on their rating, rating count, year and duration.
+
+    Parameters
+    ----------
+    index: Index
+        The index holding the movie columns.
+    doc_ids: array-like, optional
+        The doc IDs of the candidate movies, every movie if None.
+    bounds:
+        Inclusive bounds among min_rating, max_rating, min_rating_count, min_year,
+        max_year, min_duration and max_duration (in minutes), see MovieColumns.filter.
+
+    Returns
+    -------
+    list[Movie]
+        List of candidate movies within the bounds, in the order of doc_ids.
+    """
+    return index.get_movies(index.columns.filter(doc_ids, **bounds))
+
+def search_by_movie_name(index: Index, movie_name: str) -> List[Movie]:
+    """
+    Search for movies whose name contains the specified movie name.
+
+    Parameters
+    ----------
+    index: Index
+        The index holding the field postings.
+    movie_name: str
+        The movie name to search for.
+
+    Returns
+    -------
+    list[Movie]
+        List of movies whose name contains the movie name.
+    """
+    return index.get_movies(index.lookup_field('name', movie_name))
+
+def search_by_actor(index: Index, actor: str) -> List[Movie]:
     """
     Search for movies featuring a specified actor.
 
     Parameters
     ----------
-    movies: List[Movie]
-        The list of movies where we should search.
+    index: Index
+        The index holding the field postings.
     actor: str
         The name of the actor to search for.
 
@@ -151,16 +572,16 @@ def search_by_actor(movies: List[Movie], actor: str) -> List[Movie]:
     list[Movie]
         List of movies that feature the specified actor.
     """
-    return [movie for movie in movies if any(actor.lower() in a.name.lower() for a in movie.actors)]
+    return index.get_movies(index.lookup_field('actors', actor))
 
-def search_by_genre(movies: List[Movie], genre: str) -> List[Movie]:
+def search_by_genre(index: Index, genre: str) -> List[Movie]:
     """
     Search for movies from a specified genre.
 
     Parameters
     ----------
-    movies: List[Movie]
-        The list of movies where we should search.
+    index: Index
+        The index holding the field postings.
     genre: str
         The genre to search for.
 
@@ -169,16 +590,16 @@ def search_by_genre(movies: List[Movie], genre: str) -> List[Movie]:
     list[Movie]
         List of movies from the specified genre.
     """
-    return [movie for movie in movies if any(genre.lower() in g.name.lower() for g in movie.genres)]
+    return index.get_movies(index.lookup_field('genres', genre))
 
-def search_by_creator(movies: List[Movie], creator: str) -> List[Movie]:
+def search_by_creator(index: Index, creator: str) -> List[Movie]:
     """
     Search for movies created by a specific person or entity.
 
     Parameters
     ----------
-    movies: List[Movie]
-        The list of movies where we should search.
+    index: Index
+        The index holding the field postings.
     creator: str
         The creator to search for.
 
@@ -187,17 +608,17 @@ def search_by_creator(movies: List[Movie], creator: str) -> List[Movie]:
     list[Movie]
         List of movies created by the specified person or entity.
     """
-    return [movie for movie in movies if any(creator.lower() in c.name.lower() for c in movie.creators)]
+    return index.get_movies(index.lookup_field('creators', creator))
 
 
-def search_by_director(movies: List[Movie], director: str) -> List[Movie]:
+def search_by_director(index: Index, director: str) -> List[Movie]:
     """
     Search for movies directed by a specific director.
 
     Parameters
     ----------
-    movies: List[Movie]
-        The list of movies where we should search.
+    index: Index
+        The index holding the field postings.
     director: str
         The director to search for.
 
@@ -206,4 +627,4 @@ def search_by_director(movies: List[Movie], director: str) -> List[Movie]:
     list[Movie]
         List of movies directed by the specified director.
     """
-    return [movie for movie in movies if any(director.lower() in d.name.lower() for d in movie.directors)]
+    return index.get_movies(index.lookup_field('directors', director))
@@ -1,11 +1,25 @@
 """
 This module contains utility functions for converting Movie objects to JSON strings
-and creating Movie objects from JSON strings.
+and creating Movie objects from JSON strings, JSON array files and JSON Lines files.
 """
+import heapq
 import json
+import logging
+import re
+from src.models.entity_table import EntityTable
+from src.models.lazy_movie import LazyMovie, MovieCatalog
 from src.models.movie import Movie
-from operator import attrgetter
-from typing import List, Union, Optional
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger('movie_search')
+
+# Number of characters read from a JSON array file at a time
+READ_CHUNK_SIZE = 1 << 16
+
+# Characters delimiting the elements of a JSON array outside and inside strings
+_JSON_STRUCTURE = re.compile(r'[{}\[\],"]')
+_JSON_STRING_SPECIAL = re.compile(r'["\\]')
+_JSON_CLOSERS = {'{': '}', '[': ']'}
 
 def movie_to_json(movie):
     """ 
@@ -36,51 +50,379 @@ def json_to_movie(json_str):
     Returns
     ----------
     Movie
-        A Movie object representation of the JSON string
+        A Movie object representation of the JSON string, None if it is not a valid movie
     """
     try: 
-        movie = Movie(json.loads(json_str))
-        print(f"Movie successfully loaded: {movie.name}")
-        return movie
+        return Movie(json.loads(json_str))
     except Exception as e:
-        print(f"Failed to load movie from json: {json_str}")
-        print(f"Error: {e}")
+        logger.error(f"Failed to load movie from json: {json_str}. Error: {e}")
+
+
+class LoadReport:
+    """
+    A class to collect the outcome of loading a movie catalog.
+
+    Attributes
+    ----------
+    _loaded : int
+        a private attribute to hold the number of movies loaded
+    _errors : List[Tuple[int, str]]
+        a private attribute to hold the position in the catalog and the reason of every failed movie
+
+    Methods
+    -------
+    loaded, failed, total, errors : properties
+        allow us to get the counts and the failures
+    record_success()
+        Counts a loaded movie.
+    record_failure(position, reason)
+        Records a movie that could not be loaded.
+    to_dict()
+        Returns the dictionary representation of the report.
+    """
+
+    def __init__(self):
+        self._loaded = 0
+        self._errors = []
+
+    @property
+    def loaded(self) -> int:
+        """ Returns the number of movies loaded """
+        return self._loaded
+
+    @property
+    def failed(self) -> int:
+        """ Returns the number of movies that could not be loaded """
+        return len(self._errors)
+
+    @property
+    def total(self) -> int:
+        """ Returns the number of movies read from the catalog """
+        return self._loaded + len(self._errors)
+
+    @property
+    def errors(self) -> List[Tuple[int, str]]:
+        """ Returns the position in the catalog and the reason of every failed movie """
+        return self._errors
+
+    def record_success(self):
+        """ Counts a loaded movie """
+        self._loaded += 1
+
+    def record_failure(self, position: int, reason: str):
+        """ Records a movie that could not be loaded """
+        self._errors.append((position, reason))
+
+    def to_dict(self):
+        """ Returns the dictionary representation of the report """
+        return {
+            'loaded': self.loaded,
+            'failed': self.failed,
+            'errors': [{'position': position, 'reason': reason} for position, reason in self._errors],
+        }
+
+    def __str__(self):
+        return f"{self.loaded} of {self.total} movies loaded, {self.failed} failed."
+
+
+def _utf8_length(text: str) -> int:
+    """ Returns the number of bytes of a text encoded in UTF-8 """
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+class _ElementScan:
+    """
+    The state of the search for the end of a JSON array element, kept while the element spans several reads.
+    """
 
+    __slots__ = ('position', 'closers', 'in_string')
 
-def load_movies_from_json_file(filepath):
+    def __init__(self, position: int):
+        self.position = position
+        self.closers = []
+        self.in_string = False
+
+    def find_end(self, buffer: str) -> Optional[int]:
+        """
+        Scans the buffer from the last position and returns the end of the element, None if
+        the element continues past the buffer.
+
+        Only brackets and strings are followed, so a malformed element still ends at its
+        closing bracket, or at a mismatched one, and fails to decode on its own.
+        """
+        while True:
+            if self.in_string:
+                match = _JSON_STRING_SPECIAL.search(buffer, self.position)
+                if match is None:
+                    self.position = len(buffer)
+                    return None
+                # An escape skips the next character, possibly in the next read
+                self.position = match.end() + (match.group() == '\\')
+                self.in_string = match.group() != '"'
+                continue
+
+            match = _JSON_STRUCTURE.search(buffer, self.position)
+            if match is None:
+                self.position = len(buffer)
+                return None
+            char = match.group()
+            self.position = match.end()
+            if char == '"':
+                self.in_string = True
+            elif char in _JSON_CLOSERS:
+                self.closers.append(_JSON_CLOSERS[char])
+            elif not self.closers:
+                # A separator or the end of the array after a scalar element, a stray bracket is part of it
+                return match.start() if char in ',]' else match.end()
+            elif char != ',':
+                closer = self.closers.pop()
+                if not self.closers or char != closer:
+                    return match.end()
+
+
+def _iter_json_array_records(filepath, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[Optional[dict], str, int]]:
     """ 
-    Load JSON data from a file and create a list of Movie objects.
+    Incrementally parse a file holding a JSON array, one element at a time.
+
+    Only the current chunk of the file and the element being decoded are held in memory,
+    never the whole array. An element that still cannot be decoded with the next chunk,
+    because it is malformed or spans more chunks, is scanned once for its end and returned
+    undecoded, so that a malformed element only fails its own movie.
 
     Parameters
     ----------
     filepath : str 
         Path of the JSON file to read.
-        
+    chunk_size : int
+        Number of characters read from the file at a time.
+
     Returns
     ----------
-    list
-        A list of Movie object representations of the JSON data.
+    Iterator[Tuple[Optional[dict], str, int]]
+        The parsed elements of the array, None for those left to decode, along with their
+        source text and its byte offset in the file.
     """
+    decoder = json.JSONDecoder()
+
+    # Newlines are not translated so that the byte offsets match the file
+    with open(filepath, 'r', encoding='utf-8', newline='') as json_file:
+        buffer = ''
+        position = 0
+        # Byte offset in the file of buffer[position]
+        byte_position = 0
+        eof = False
+        started = False
+        # Whether the current element failed to decode, and the search for its end once it failed twice
+        retried = False
+        scan = None
+
+        while True:
+            # Skip whitespace and separators between elements
+            while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ',')):
+                byte_position += _utf8_length(buffer[position])
+                position += 1
 
-    movie_objects = []
+            if position == len(buffer):
+                if eof:
+                    raise ValueError(f"Unexpected end of JSON array in {filepath}")
+                buffer = json_file.read(chunk_size)
+                position = 0
+                eof = not buffer
+                continue
 
-    with open(filepath, 'r') as json_file:
-        movies_json_array = json.load(json_file)
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError(f"Expected a JSON array in {filepath}")
+                started = True
+                position += 1
+                byte_position += 1
+                continue
 
-    for movie_json in movies_json_array:
+            if buffer[position] == ']':
+                return
+
+            element = None
+            end = None
+            truncated = False
+            if scan is None:
+                try:
+                    element, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # The element most often continues in the next chunk, it is decoded once
+                    # more with the next chunk before its end is searched for
+                    if eof or retried:
+                        scan = _ElementScan(position)
+                    retried = True
+            if scan is not None:
+                end = scan.find_end(buffer)
+                if end is None and eof:
+                    # A truncated array, the last element fails to decode on its own
+                    end = len(buffer)
+                    truncated = True
+            if end is None:
+                # The element continues in the next chunk, a scan resumes where it stopped
+                more = json_file.read(chunk_size)
+                if scan is not None:
+                    scan.position -= position
+                buffer = buffer[position:] + more
+                position = 0
+                eof = not more
+                continue
+            scan = None
+            retried = False
+
+            text = buffer[position:end]
+            yield element, text.rstrip(), byte_position
+            position = end
+            byte_position += _utf8_length(text)
+            if truncated:
+                return
+
+
+def _iter_jsonl_records(filepath) -> Iterator[Tuple[str, int]]:
+    """ 
+    Read the non-blank lines of a JSON Lines file, one line at a time, along with their byte offset in the file.
+    """
+    with open(filepath, 'rb') as jsonl_file:
+        offset = 0
+        for line in jsonl_file:
+            stripped = line.strip()
+            if stripped:
+                yield stripped.decode('utf-8'), offset + len(line) - len(line.lstrip())
+            offset += len(line)
+
+
+def iter_movie_dicts_from_json_file(filepath, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """ 
+    Incrementally parse a file holding a JSON array of movies, one element at a time.
+
+    Parameters
+    ----------
+    filepath : str 
+        Path of the JSON file to read.
+    chunk_size : int
+        Number of characters read from the file at a time.
+
+    Returns
+    ----------
+    Iterator[dict]
+        The parsed elements of the array.
+    """
+    for element, text, _ in _iter_json_array_records(filepath, chunk_size):
+        yield json.loads(text) if element is None else element
+
+
+def iter_movie_dicts_from_jsonl_file(filepath) -> Iterator[dict]:
+    """ 
+    Parse a JSON Lines file holding one movie per line, one line at a time.
+
+    Parameters
+    ----------
+    filepath : str 
+        Path of the JSON Lines file to read.
+
+    Returns
+    ----------
+    Iterator[dict]
+        The parsed movie of every non-blank line.
+    """
+    for line, _ in _iter_jsonl_records(filepath):
+        yield json.loads(line)
+
+
+def iter_movies_from_file(filepath, report: Optional[LoadReport] = None, quiet: bool = True,
+                          entities: Optional[EntityTable] = None, lazy: bool = False) -> Iterator[Movie]:
+    """ 
+    Lazily create Movie objects from a JSON array file, or from a JSON Lines file
+    when the file name ends with '.jsonl'.
+
+    Every movie is built straight from its parsed dict, its source text is not kept but
+    the byte span of its record in the file is, so the file must stay in place: the
+    raw JSON of a movie is read from it again.
+    The people, organizations and genres of the movies are shared through an entity table.
+    Movies that fail to load are skipped and recorded in the report.
+
+    With lazy set, every movie is returned as a LazyMovie holding the byte span of its
+    record in the memory-mapped file, along with the parsed Movie until it is released
+    with release_movies once the index is built.
+
+    Parameters
+    ----------
+    filepath : str 
+        Path of the catalog file to read.
+    report : Optional[LoadReport]
+        Report collecting the counts and failures of the load.
+    quiet : bool
+        Print a line for every movie loaded or failed when False.
+    entities : Optional[EntityTable]
+        Table of the shared entities, a new table for the catalog when None.
+    lazy : bool
+        Return LazyMovie proxies instead of Movie objects.
+        
+    Returns
+    ----------
+    Iterator[Movie]
+        The Movie objects of the catalog, or their LazyMovie proxies.
+    """
+    if report is None:
+        report = LoadReport()
+    if entities is None:
+        entities = EntityTable()
+
+    if filepath.endswith('.jsonl'):
+        # Lines are decoded below so that a malformed line only fails its own movie
+        records = ((None, line, offset) for line, offset in _iter_jsonl_records(filepath))
+    else:
+        records = _iter_json_array_records(filepath)
+    catalog = MovieCatalog(filepath)
+
+    for position, (movie_json, raw_json, offset) in enumerate(records):
         try:
-            movie = json_to_movie(json.dumps(movie_json))
-            movie_objects.append(movie)
-            print(f"Successfully loaded movie: {movie.name}")
+            if movie_json is None:
+                movie_json = json.loads(raw_json)
+            length = _utf8_length(raw_json)
+            movie = Movie(movie_json, entities, (catalog, offset, length))
+            if lazy:
+                movie = LazyMovie(catalog, offset, length, movie)
         except Exception as e:
-            print(f"Unable to load movie. Error: {e}")
+            report.record_failure(position, f"{type(e).__name__}: {e}")
+            if not quiet:
+                print(f"Unable to load movie at position {position}. Error: {e}")
+            continue
+
+        report.record_success()
+        if not quiet:
+            print(f"Successfully loaded movie: {movie.name}")
+        yield movie
 
-    return movie_objects
+
+def load_movies_from_json_file(filepath, report: Optional[LoadReport] = None, quiet: bool = True):
+    """ 
+    Load JSON data from a file and create a list of Movie objects.
+
+    Parameters
+    ----------
+    filepath : str 
+        Path of the JSON or JSON Lines file to read.
+    report : Optional[LoadReport]
+        Report collecting the counts and failures of the load.
+    quiet : bool
+        Print a line for every movie loaded or failed when False.
+        
+    Returns
+    ----------
+    list
+        A list of Movie object representations of the JSON data.
+    """
+    return list(iter_movies_from_file(filepath, report, quiet))
 
 def sort_by_rating(movies: List[Movie], num_results: Optional[int] = None) -> List[Movie]:
     """
     Sorts a list of Movies by rating_value and returns the top results.
 
+    Only the top num_results movies are selected with a heap instead of sorting the whole list.
+    Movies without a rating come last.
+
     Parameters
     ---------
     movies: List[Movie]
@@ -93,5 +435,9 @@ def sort_by_rating(movies: List[Movie], num_results: Optional[int] = None) -> Li
     List[Movie]
         Sorted list of movies.
     """
-    sorted_movies = sorted(movies, key=attrgetter('rating_value'), reverse=True)
-    return sorted_movies if num_results is None else sorted_movies[:num_results]
+    def rating_key(movie: Movie) -> float:
+        return movie.rating_value if movie.rating_value is not None else float('-inf')
+
+    if num_results is None:
+        return sorted(movies, key=rating_key, reverse=True)
+    return heapq.nlargest(num_results, movies, key=rating_key)
@@ -0,0 +1,78 @@
+import unittest
+import io
+import json
+import sys
+import os
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from main import build_databases
+from src.batch import BatchOptions, run_batch, run_query, search_paths
+from src.index import Index
+from src.search import Search
+from src.utils.utils import load_movies_from_json_file
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.movies = load_movies_from_json_file("./movies.json")
+        self.index = Index(self.movies)
+        self.search = Search(self.movies, self.index)
+        self.databases = build_databases(self.movies)
+        self.queries = ["toy story", "Tom Hanks", "2010", "1990-1999", "spider-man", "xyzzyq", "Action"]
+
+    def test_search_paths(self):
+        """
+        Test queries are routed to the searches of their categories, the general search otherwise
+        """
+        self.assertEqual(search_paths("Tom Hanks", self.databases), ['actor'])
+        self.assertEqual(search_paths("Action", self.databases), ['genre'])
+        self.assertEqual(search_paths("1990-1999", self.databases), ['year_range'])
+        self.assertEqual(search_paths("2010", self.databases), ['year', 'general'])
+        self.assertEqual(search_paths("toy story", self.databases), ['general'])
+        # Numeric characters other than ASCII digits are text, not years
+        self.assertEqual(search_paths("9½", self.databases), ['general'])
+        self.assertEqual(search_paths("½", self.databases), ['general'])
+        self.assertEqual(run_query(self.search, self.databases, "9½", BatchOptions())['paths'], ['general'])
+
+    def test_run_query(self):
+        """
+        Test the report of a query holds the results and timings of every search that ran
+        """
+        report = run_query(self.search, self.databases, "Tom Hanks", BatchOptions(num_results=3))
+        self.assertEqual(report['paths'], ['actor'])
+        self.assertEqual([movie['name'] for movie in report['results']['actor']['movies']],
+                         [movie.name for movie in self.index.get_movies(self.index.lookup_field('actors', "Tom Hanks"))][:3])
+        self.assertEqual(set(report['timings_ms']), {'actor', 'total'})
+
+        report = run_query(self.search, self.databases, "xyzzyq", BatchOptions(num_results=3))
+        general = report['results']['general']
+        self.assertEqual(general['total_found'], 0)
+        self.assertEqual(len(general['top_rated']), 3)
+        self.assertIn('json', general['searches'])
+
+    def test_workers_match_serial_run(self):
+        """
+        Test a batch run by worker processes writes the same reports, in input order, as a serial run
+        """
+        reports = []
+        for workers in (1, 2):
+            output = io.StringIO()
+            count = run_batch(self.queries + ["", "  "], output, self.search, self.databases, workers=workers,
+                              chunk_size=2)
+            self.assertEqual(count, len(self.queries))
+            lines = [json.loads(line) for line in output.getvalue().splitlines()]
+            for line in lines:
+                del line['timings_ms']
+            reports.append(lines)
+        self.assertEqual([line['query'] for line in reports[0]], self.queries)
+        self.assertEqual(reports[0], reports[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import pickle
+import random
+import sys
+import os
+from array import array
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.compressed_postings import CompressedPostings, BLOCK_SIZE, MIN_COMPRESSED_LENGTH, compress_postings
+from src.utils.posting_utils import intersect_postings, postings_memory_report
+from src.utils.utils import load_movies_from_json_file
+from src.utils.search_utils import perform_combined_search, perform_fuzzy_search, perform_ranked_search
+from src.index import Index
+
+
+class TestCompressedPostings(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.random = random.Random(0)
+
+    def random_postings(self, size, max_gap):
+        """
+        Returns sorted unique doc IDs separated by random gaps
+        """
+        doc_ids = array('I')
+        doc_id = self.random.randrange(max_gap)
+        for _ in range(size):
+            doc_ids.append(doc_id)
+            doc_id += self.random.randint(1, max_gap)
+        return doc_ids
+
+    def test_round_trip(self):
+        """
+        Test doc IDs are decoded as encoded, whatever the gaps and number of blocks
+        """
+        for size in [0, 1, 2, BLOCK_SIZE - 1, BLOCK_SIZE, BLOCK_SIZE + 1, 5 * BLOCK_SIZE + 3]:
+            for max_gap in [1, 100, 100000, 2 ** 22]:
+                doc_ids = self.random_postings(size, max_gap)
+                compressed = CompressedPostings(doc_ids)
+                self.assertEqual(len(compressed), size)
+                self.assertEqual(compressed.to_array(), doc_ids)
+                self.assertEqual(list(compressed), list(doc_ids))
+                self.assertEqual(pickle.loads(pickle.dumps(compressed)).to_array(), doc_ids)
+
+    def test_intersect(self):
+        """
+        Test intersecting with a sorted sequence keeps the doc IDs of both
+        """
+        postings = self.random_postings(10 * BLOCK_SIZE, 5)
+        compressed = CompressedPostings(postings)
+        for size in [0, 1, 10, 1000]:
+            candidates = array('I', sorted(self.random.sample(range(postings[-1] + 10), size)))
+            expected = array('I', sorted(set(candidates) & set(postings)))
+            self.assertEqual(compressed.intersect(candidates), expected)
+            self.assertEqual(intersect_postings([postings, candidates]), expected)
+            self.assertEqual(intersect_postings([compressed, candidates]), expected)
+
+    def test_short_lists_stay_arrays(self):
+        """
+        Test lists too short to benefit from compression are kept as they are
+        """
+        short = array('I', range(MIN_COMPRESSED_LENGTH - 1))
+        self.assertIs(compress_postings(short), short)
+        self.assertIsInstance(compress_postings(array('I', range(MIN_COMPRESSED_LENGTH))), CompressedPostings)
+
+    def test_compressed_index_searches(self):
+        """
+        Test an index with compressed postings returns the same results and uses less memory
+        """
+        movies = load_movies_from_json_file("./movies.json")
+        index = Index(movies)
+        compressed_index = Index(movies, compress_postings=True)
+        self.assertTrue(any(isinstance(postings, CompressedPostings) for postings in compressed_index.index.values()))
+        for query in ["the dark knight", "love war", "war", "of the", "a man young", "godfathr"]:
+            self.assertEqual(perform_combined_search(compressed_index, query), perform_combined_search(index, query))
+            self.assertEqual(perform_ranked_search(compressed_index, query, 10), perform_ranked_search(index, query, 10))
+            self.assertEqual(perform_fuzzy_search(compressed_index, query, 70), perform_fuzzy_search(index, query, 70))
+
+        report = postings_memory_report(index.index)
+        self.assertEqual(report['postings'], sum(len(postings) for postings in index.index.values()))
+        self.assertEqual(postings_memory_report(compressed_index.index)['compressed_bytes'], report['compressed_bytes'])
+        self.assertLess(report['compressed_bytes'], report['array_bytes'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import json
+import pickle
+import sys
+import os
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.models.actor import Actor
+from src.models.director import Director
+from src.models.entity_table import EntityTable
+from src.models.movie import Movie
+from src.utils.utils import load_movies_from_json_file
+
+
+class TestEntityTable(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.movies = load_movies_from_json_file("./movies.json")
+
+    def test_people_are_shared(self):
+        """
+        Test the loaded movies reference a single object per person URL and per genre name
+        """
+        actors = {}
+        genres = {}
+        for movie in self.movies:
+            for actor in movie.actors:
+                self.assertIs(actors.setdefault(actor.url, actor), actor)
+            for genre in movie.genres:
+                self.assertIs(genres.setdefault(genre.name, genre), genre)
+        self.assertLess(len(actors), sum(len(movie.actors) for movie in self.movies))
+
+    def test_roles_are_kept(self):
+        """
+        Test a person keeps the class of their role
+        """
+        entities = EntityTable()
+        data = {'@type': 'Person', 'name': 'Clint Eastwood', 'url': '/name/nm0000142/'}
+        actor = entities.actor(data)
+        self.assertIsInstance(actor, Actor)
+        self.assertIsInstance(entities.director(data), Director)
+        self.assertIs(entities.actor(dict(data)), actor)
+        self.assertIsNot(entities.person(data), actor)
+
+    def test_people_without_url(self):
+        """
+        Test people without a URL are shared by name
+        """
+        entities = EntityTable()
+        first = entities.actor({'name': 'Jane Doe'})
+        self.assertIs(entities.actor({'name': 'Jane Doe'}), first)
+        self.assertIsNot(entities.actor({'name': 'John Doe'}), first)
+
+    def test_to_dict_unchanged(self):
+        """
+        Test movies built with and without an entity table convert to the same dict
+        """
+        entities = EntityTable()
+        with open("./movies.json") as json_file:
+            records = json.load(json_file)
+        for data in records:
+            self.assertEqual(Movie(data, entities=entities).to_dict(), Movie(data).to_dict())
+
+    def test_slots(self):
+        """
+        Test the model objects have no instance dict and still pickle
+        """
+        movie = self.movies[0]
+        self.assertFalse(hasattr(movie, '__dict__'))
+        self.assertFalse(hasattr(movie.actors[0], '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(movie)).to_dict(), movie.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
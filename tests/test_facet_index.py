@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+from collections import Counter
+from io import StringIO
+from unittest.mock import patch
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.facet_index import FacetIndex
+from src.utils.utils import load_movies_from_json_file
+from src.index import Index
+from src.search import Search
+
+
+class TestFacetIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Setting up for the test
+        """
+        cls.movies = load_movies_from_json_file("./movies.json")
+        cls.index = Index(cls.movies)
+
+    def scan_counts(self, doc_ids):
+        """
+        Counts the facet values by walking the movies
+        """
+        genres = Counter(genre.name for doc_id in doc_ids for genre in self.movies[doc_id].genres)
+        decades = Counter(f"{self.movies[doc_id].year // 10 * 10}s" for doc_id in doc_ids if self.movies[doc_id].year)
+        content_ratings = Counter(self.movies[doc_id].content_rating for doc_id in doc_ids if self.movies[doc_id].content_rating)
+        return {name: sorted(counter.items(), key=lambda item: (-item[1], item[0]))
+                for name, counter in (('genre', genres), ('decade', decades), ('content_rating', content_ratings))}
+
+    def test_counts_match_scan(self):
+        """
+        Test facet counts equal counting the values of the movies
+        """
+        for doc_ids in [range(len(self.movies)), range(0, len(self.movies), 7), [5], [3, 100, 42]]:
+            self.assertEqual(self.index.facet_index.counts(list(doc_ids), None), self.scan_counts(doc_ids))
+
+    def test_limit(self):
+        """
+        Test only the most frequent values are returned per facet
+        """
+        facets = self.index.facet_index.counts(range(len(self.movies)), 3)
+        expected = self.scan_counts(range(len(self.movies)))
+        for name, values in facets.items():
+            self.assertEqual(values, expected[name][:3])
+
+    def test_empty_result_set(self):
+        """
+        Test an empty set of movies has no facet values
+        """
+        self.assertEqual(self.index.facet_index.counts([]), {'genre': [], 'decade': [], 'content_rating': []})
+        self.assertEqual(FacetIndex().counts([]), {'genre': [], 'decade': [], 'content_rating': []})
+
+    def test_general_search_returns_facets(self):
+        """
+        Test general search results carry the facets of every movie found
+        """
+        search = Search(self.movies, self.index, facet_limit=None)
+        with patch("sys.stdout", new_callable=StringIO):
+            results = search.general_search("war", 70, 5)
+        doc_ids = self.index.get_postings("war")
+        self.assertEqual(results.total_found, len(doc_ids))
+        self.assertEqual(results.facets, self.scan_counts(doc_ids))
+
+if __name__ == "__main__":
+    unittest.main()
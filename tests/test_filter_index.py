@@ -0,0 +1,116 @@
+import unittest
+import sys
+import os
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.filter_index import SearchFilters
+from src.movie_columns import parse_iso8601_duration
+from src.utils.utils import load_movies_from_json_file
+from src.utils.search_utils import perform_combined_search, perform_json_search, perform_fuzzy_search, perform_title_fuzzy_search
+from src.index import Index
+from src.search import Search
+
+
+class TestFilterIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Setting up for the test
+        """
+        cls.movies = load_movies_from_json_file("./movies.json")
+        cls.index = Index(cls.movies)
+
+    def matches(self, movie, filters):
+        """
+        Checks a movie against the filters without the bitmaps
+        """
+        duration = parse_iso8601_duration(movie.duration)
+        checks = [
+            (filters.min_rating, lambda: movie.rating_value >= filters.min_rating),
+            (filters.max_rating, lambda: movie.rating_value <= filters.max_rating),
+            (filters.min_year, lambda: movie.year is not None and movie.year >= filters.min_year),
+            (filters.max_year, lambda: movie.year is not None and movie.year <= filters.max_year),
+            (filters.min_duration, lambda: duration is not None and duration >= filters.min_duration),
+            (filters.max_duration, lambda: duration is not None and duration <= filters.max_duration),
+            (filters.genres, lambda: any(genre.name.lower() in filters.genres for genre in movie.genres)),
+            (filters.content_ratings, lambda: (movie.content_rating or '').lower() in filters.content_ratings),
+        ]
+        return all(check() for value, check in checks if value is not None and value != ())
+
+    def test_bitmap_matches_scan(self):
+        """
+        Test the bitmap of the filters selects the same movies as checking every movie
+        """
+        filters_list = [
+            SearchFilters(min_rating=8.5),
+            SearchFilters(min_rating=8.25, max_rating=8.6),
+            SearchFilters(min_year=1994, max_year=2003),
+            SearchFilters(max_year=1940),
+            SearchFilters(max_duration=119),
+            SearchFilters(min_duration=91, max_duration=150),
+            SearchFilters(genres=["Action", "Drama"]),
+            SearchFilters(genres=["unknown genre"]),
+            SearchFilters(content_ratings=["pg-13", "G"]),
+            SearchFilters(min_rating=8, min_year=1990, max_year=1999, genres=["Crime"], content_ratings=["R"], max_duration=150),
+        ]
+        for filters in filters_list:
+            expected = [doc_id for doc_id, movie in enumerate(self.movies) if self.matches(movie, filters)]
+            self.assertEqual(self.index.filter_index.bitmap(filters).nonzero()[0].tolist(), expected, str(filters))
+
+    def test_ranges_match_scan(self):
+        """
+        Test ranges on, inside and across bucket boundaries select the same movies as checking every movie
+        """
+        for low, high in [(None, None), (1990, 1999), (1990, 1990), (1989, 2000), (1995, 1995), (1995, 1994),
+                          (1900, None), (None, 2100), (2030, None), (1983, 1987)]:
+            for filters in (SearchFilters(min_year=low, max_year=high),
+                            SearchFilters(min_duration=low and low - 1900, max_duration=high and high - 1900),
+                            SearchFilters(min_rating=low and low / 240, max_rating=high and high / 240)):
+                expected = [doc_id for doc_id, movie in enumerate(self.movies) if self.matches(movie, filters)]
+                bitmap = self.index.filter_index.bitmap(filters)
+                self.assertEqual(list(range(len(self.movies))) if bitmap is None else bitmap.nonzero()[0].tolist(),
+                                 expected, str(filters))
+
+    def test_empty_filters(self):
+        """
+        Test no bitmap is built without filters, and a zero bound is still a filter
+        """
+        self.assertIsNone(self.index.filter_index.bitmap(None))
+        self.assertIsNone(self.index.filter_index.bitmap(SearchFilters(genres=[" "])))
+        self.assertFalse(SearchFilters(min_rating=0).is_empty())
+        self.assertEqual(str(SearchFilters()), 'none')
+
+    def test_filtered_searches_match_post_filtering(self):
+        """
+        Test filtering the candidates of a search with a bitmap equals filtering its results
+        """
+        filters = SearchFilters(min_rating=8.3, genres=["Drama", "Adventure"])
+        allowed = self.index.filter_index.bitmap(filters)
+        for query in ["the", "love", "war", "the dark", "spider-man", "knigth", "\"PT2H"]:
+            for search in (perform_combined_search, perform_json_search):
+                expected = [movie for movie in search(self.index, query) if self.matches(movie, filters)]
+                self.assertEqual(search(self.index, query, allowed=allowed), expected, (search.__name__, query))
+            expected = [movie for movie in perform_fuzzy_search(self.index, query, 70) if self.matches(movie, filters)]
+            self.assertEqual(perform_fuzzy_search(self.index, query, 70, allowed), expected, query)
+            expected = [movie for movie in perform_title_fuzzy_search(self.index, query, 60) if self.matches(movie, filters)]
+            self.assertEqual(perform_title_fuzzy_search(self.index, query, 60, allowed=allowed), expected, query)
+
+    def test_no_results_suggest_top_rated_matching_filters(self):
+        """
+        Test a filtered search finding nothing suggests the top rated movies matching the filters
+        """
+        filters = SearchFilters(min_year=1990, max_year=1999, genres=["Crime"])
+        results = Search(self.movies, self.index).find_general_results("zzzzqqqq", 100, 5, filters=filters)
+        expected = sorted((movie for movie in self.movies if self.matches(movie, filters)),
+                          key=lambda movie: -movie.rating_value)[:5]
+
+        self.assertEqual(results.total_found, 0)
+        self.assertEqual([self.movies[doc_id].rating_value for doc_id in results.top_rated_ids],
+                         [movie.rating_value for movie in expected])
+        self.assertTrue(all(self.matches(self.movies[doc_id], filters) for doc_id in results.top_rated_ids))
+
+if __name__ == "__main__":
+    unittest.main()
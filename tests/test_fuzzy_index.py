@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+import random
+import string
+
+from rapidfuzz.distance import Levenshtein
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.utils.utils import load_movies_from_json_file
+from src.index import Index
+from src.fuzzy_index import FuzzyIndex
+from src.utils.search_utils import perform_fuzzy_search
+
+
+class TestFuzzyIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Setting up for the test
+        """
+        cls.index = Index(load_movies_from_json_file("./movies.json"))
+        cls.vocabulary = [word for word in cls.index.index if word.isalpha()]
+
+    def test_lookup_matches_brute_force(self):
+        """
+        Test lookup finds exactly the words within the edit distance, including long words
+        """
+        rng = random.Random(3)
+        for _ in range(200):
+            word = list(rng.choice(self.vocabulary))
+            for _ in range(rng.randint(0, 2)):
+                position = rng.randrange(len(word) + 1)
+                operation = rng.choice(["insert", "delete", "replace"])
+                if operation == "insert":
+                    word.insert(position, rng.choice(string.ascii_lowercase))
+                elif word and position < len(word):
+                    if operation == "delete":
+                        del word[position]
+                    else:
+                        word[position] = rng.choice(string.ascii_lowercase)
+            word = ''.join(word)
+            for max_distance in [0, 1, 2]:
+                expected = {term for term in self.vocabulary if Levenshtein.distance(word, term) <= max_distance}
+                self.assertEqual(set(self.index.fuzzy_index.lookup(word, max_distance)), expected, (word, max_distance))
+
+    def test_lookup_orders_by_distance(self):
+        """
+        Test closer words come first and the distance is capped to the dictionary maximum
+        """
+        fuzzy_index = FuzzyIndex(["story", "stork", "store", "history"], max_distance=1)
+        self.assertEqual(fuzzy_index.lookup("story", 1), ["story", "store", "stork"])
+        self.assertEqual(fuzzy_index.lookup("histry", 5), ["history"])
+
+    def test_perform_fuzzy_search(self):
+        """
+        Test misspelled words find the movies of the intended words
+        """
+        movies = perform_fuzzy_search(self.index, "godfathr", 70)
+        self.assertEqual({movie.name for movie in movies}, {"The Godfather", "The Godfather Part II"})
+        self.assertEqual(perform_fuzzy_search(self.index, "xyzzyq", 70), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.utils.utils import load_movies_from_json_file
+from src.index import Index
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.movies = load_movies_from_json_file("./tests/test_movies.json")
+        self.index = Index(self.movies)
+
+    def test_postings_are_sorted_and_unique(self):
+        """
+        Test every posting list holds strictly increasing doc IDs
+        """
+        for word, postings in self.index.index.items():
+            self.assertTrue(all(a < b for a, b in zip(postings, postings[1:])), word)
+
+    def test_get_postings(self):
+        """
+        Test get_postings returns the doc IDs of the movies containing a word
+        """
+        toy_movies = self.index.get_movies(self.index.get_postings("toy"))
+        self.assertListEqual([movie.name for movie in toy_movies], ["Toy Story 3", "Toy Story"])
+        self.assertEqual(len(self.index.get_postings("unknownword")), 0)
+        self.assertNotIn("unknownword", self.index.index)
+
+    def test_parallel_build_matches_serial_build(self):
+        """
+        Test a sharded build in worker processes yields the same index as the serial build
+        """
+        parallel_index = Index(())
+        parallel_index.build_index(iter(self.movies), workers=2, shard_size=1)
+
+        self.assertEqual(parallel_index.movies, self.index.movies)
+        self.assertEqual(parallel_index.index, self.index.index)
+        self.assertEqual(list(parallel_index.index), list(self.index.index))
+        self.assertEqual(dict(parallel_index.year_index), dict(self.index.year_index))
+        self.assertEqual(parallel_index.columns.ratings.tolist(), self.index.columns.ratings.tolist())
+        self.assertEqual(parallel_index.columns.years.tolist(), self.index.columns.years.tolist())
+        for field, field_index in parallel_index.field_index.items():
+            self.assertEqual(field_index.values, self.index.field_index[field].values)
+            self.assertEqual(field_index.lookup("an"), self.index.field_index[field].lookup("an"))
+        self.assertEqual([parallel_index.json_corpus.text(doc_id) for doc_id in range(len(self.movies))],
+                         [self.index.json_corpus.text(doc_id) for doc_id in range(len(self.movies))])
+        self.assertEqual(parallel_index.json_corpus.search("schema.org"), self.index.json_corpus.search("schema.org"))
+
+if __name__ == "__main__":
+    unittest.main()
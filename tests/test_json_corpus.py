@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.json_corpus import JsonCorpus
+
+
+class TestJsonCorpus(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.texts = ['{"name": "Amélie"}', '{"name": "Heat"}', '', '{"name": "The Heat", "genre": ["Comedy"]}']
+        self.corpus = JsonCorpus()
+        for text in self.texts:
+            self.corpus.add(text.lower())
+        self.corpus.finalize()
+
+    def linear_scan(self, query):
+        return [doc_id for doc_id, text in enumerate(self.texts) if query in text.lower()]
+
+    def test_search_matches_linear_scan(self):
+        """
+        Test the single pass and the candidate searches find the same movies as a scan of every text
+        """
+        for query in ('heat', '"name": "', 'amélie', 'é', '"}', '}{', 'comedy"]', 'missing', '"'):
+            expected = self.linear_scan(query)
+            self.assertEqual(self.corpus.search(query), expected, query)
+            self.assertEqual(self.corpus.search(query, range(len(self.texts))), expected, query)
+
+    def test_text(self):
+        """
+        Test the text of every movie is kept lower-cased
+        """
+        self.assertEqual(len(self.corpus), len(self.texts))
+        self.assertEqual([self.corpus.text(doc_id) for doc_id in range(len(self.texts))],
+                         [text.lower() for text in self.texts])
+
+    def test_add_after_finalize(self):
+        """
+        Test movies added after the buffer is built are searched once it is built again
+        """
+        self.corpus.add('{"name": "heat 2"}')
+        self.corpus.finalize()
+        self.assertEqual(self.corpus.search('heat'), [1, 3, 4])
+        self.assertEqual(self.corpus.search('heat', [3, 4]), [3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import json
+import os
+import pickle
+import sys
+import tempfile
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.index import Index
+from src.models.lazy_movie import LazyMovie, release_movies
+from src.utils.search_utils import json_search_doc_ids
+from src.utils.utils import iter_movies_from_file, load_movies_from_json_file, movie_to_json
+
+
+class TestLazyMovie(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.movies = load_movies_from_json_file("./movies.json")
+        with open("./movies.json") as json_file:
+            self.records = json.load(json_file)
+        self.lazy_movies = list(iter_movies_from_file("./movies.json", lazy=True))
+        release_movies(self.lazy_movies)
+
+    def assert_same_movies(self, lazy_movies, movies):
+        self.assertEqual(len(lazy_movies), len(movies))
+        for lazy_movie, movie in zip(lazy_movies, movies):
+            self.assertIsInstance(lazy_movie, LazyMovie)
+            self.assertEqual(lazy_movie.raw_json, movie.raw_json)
+            self.assertEqual((lazy_movie.name, lazy_movie.year, lazy_movie.rating_value),
+                             (movie.name, movie.year, movie.rating_value))
+            self.assertEqual(lazy_movie.to_dict(), movie.to_dict())
+
+    def test_materialized_from_catalog(self):
+        """
+        Test released proxies are materialized from their span in the catalog
+        """
+        self.assert_same_movies(self.lazy_movies, self.movies)
+        self.assertEqual(movie_to_json(self.lazy_movies[0]), movie_to_json(self.movies[0]))
+        self.assertEqual([actor.name for actor in self.lazy_movies[0].actors],
+                         [actor.name for actor in self.movies[0].actors])
+
+    def test_jsonl_spans(self):
+        """
+        Test the spans of a JSON Lines catalog with non-ASCII text, blank lines and CRLF line endings
+        """
+        records = self.records[:3]
+        records[1]['name'] = 'Amélie – 天気の子'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, 'movies.jsonl')
+            with open(filepath, 'w', encoding='utf-8', newline='') as jsonl_file:
+                jsonl_file.write('\r\n'.join(['  ' + json.dumps(record, ensure_ascii=False) for record in records]
+                                             + ['', '']))
+            lazy_movies = list(iter_movies_from_file(filepath, lazy=True))
+            movies = list(iter_movies_from_file(filepath))
+            release_movies(lazy_movies)
+            self.assert_same_movies(lazy_movies, movies)
+            self.assertEqual(lazy_movies[1].description, movies[1].description)
+
+    def test_json_array_spans(self):
+        """
+        Test the spans of a JSON array catalog with non-ASCII text and CRLF line endings
+        """
+        records = self.records[:3]
+        records[0]['description'] = 'Ça commence à Zürich'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, 'movies.json')
+            with open(filepath, 'w', encoding='utf-8', newline='') as json_file:
+                json_file.write(json.dumps(records, ensure_ascii=False, indent=2).replace('\n', '\r\n'))
+            lazy_movies = list(iter_movies_from_file(filepath, lazy=True))
+            movies = list(iter_movies_from_file(filepath))
+            release_movies(lazy_movies)
+            self.assert_same_movies(lazy_movies, movies)
+
+    def test_json_search_matches_eager_movies(self):
+        """
+        Test the JSON corpus of lazy movies gives the same JSON search results as that of parsed movies
+        """
+        index = Index(self.movies)
+        lazy_index = Index(self.lazy_movies)
+        for query in ("dictator&apos;s", "dictator's", '"genre": ["comedy"', "pg-13", "ç", "\\u00e9"):
+            self.assertEqual(json_search_doc_ids(lazy_index, query), json_search_doc_ids(index, query), query)
+        self.assertGreater(len(json_search_doc_ids(lazy_index, "dictator&apos;s")), 0)
+
+    def test_pickle(self):
+        """
+        Test a pickled proxy keeps its span but not its parsed movie
+        """
+        lazy_movie = list(iter_movies_from_file("./movies.json", lazy=True))[0]
+        restored = pickle.loads(pickle.dumps(lazy_movie))
+        self.assertIsNone(restored._movie)
+        self.assertEqual(restored.to_dict(), lazy_movie.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
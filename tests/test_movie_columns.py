@@ -0,0 +1,112 @@
+import unittest
+import sys
+import os
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+import numpy as np
+
+from src.movie_columns import MovieColumns, parse_iso8601_duration, MISSING
+from src.models.movie import Movie
+from src.utils.utils import load_movies_from_json_file
+from src.index import Index
+
+
+class TestMovieColumns(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.movies = load_movies_from_json_file("./movies.json")
+        self.index = Index(self.movies)
+        self.columns = self.index.columns
+
+    def test_parse_iso8601_duration(self):
+        """
+        Test ISO 8601 durations are converted to minutes
+        """
+        self.assertEqual(parse_iso8601_duration("PT2H22M"), 142)
+        self.assertEqual(parse_iso8601_duration("PT3H"), 180)
+        self.assertEqual(parse_iso8601_duration("PT45M"), 45)
+        self.assertEqual(parse_iso8601_duration("P1DT30M90S"), 1471)
+        self.assertIsNone(parse_iso8601_duration(""))
+        self.assertIsNone(parse_iso8601_duration("PT"))
+        self.assertIsNone(parse_iso8601_duration("2 hours"))
+
+    def test_columns_match_movies(self):
+        """
+        Test the columns hold the attributes of the movies by doc ID
+        """
+        for doc_id, movie in enumerate(self.movies):
+            self.assertEqual(self.columns.ratings[doc_id], movie.rating_value)
+            self.assertEqual(self.columns.rating_counts[doc_id], movie.rating.rating_count)
+            self.assertEqual(self.columns.years[doc_id], movie.year)
+            self.assertEqual(self.columns.durations[doc_id], parse_iso8601_duration(movie.duration))
+
+    def test_sort_by_rating(self):
+        """
+        Test sorting doc IDs matches a stable sort of the movies by rating
+        """
+        expected = sorted(range(len(self.movies)), key=lambda doc_id: self.movies[doc_id].rating_value, reverse=True)
+        self.assertEqual(self.columns.sort_by_rating().tolist(), expected)
+
+        candidates = [40, 3, 17, 250 - 1, 8, 41, 42, 43]
+        expected = sorted(sorted(candidates), key=lambda doc_id: self.movies[doc_id].rating_value, reverse=True)
+        self.assertEqual(self.columns.sort_by_rating(candidates).tolist(), expected)
+        for num_results in range(len(candidates) + 1):
+            self.assertEqual(self.columns.sort_by_rating(candidates, num_results).tolist(), expected[:num_results])
+
+    def test_precomputed_rating_orders(self):
+        """
+        Test the per-year and per-genre rating orders match sorting the movies of the year or genre
+        """
+        expected = self.columns.sort_by_rating([doc_id for doc_id, movie in enumerate(self.movies) if movie.year == 1994])
+        self.assertEqual(self.columns.top_rated_for_year(1994).tolist(), expected.tolist())
+        self.assertEqual(self.columns.top_rated_for_year(1994, 2).tolist(), expected[:2].tolist())
+        self.assertEqual(len(self.columns.top_rated_for_year(1066)), 0)
+
+        drama = [doc_id for doc_id, movie in enumerate(self.movies)
+                 if 'drama' in [genre.name.lower() for genre in movie.genres]]
+        self.assertEqual(self.index.genre_rating_orders['drama'].tolist(), self.columns.sort_by_rating(drama).tolist())
+
+    def test_missing_values(self):
+        """
+        Test movies without rating, year or duration are sorted last and never match a bound
+        """
+        columns = MovieColumns()
+        columns.add(Movie({'name': 'Unknown', 'aggregateRating': {'ratingValue': None}}))
+        columns.add(Movie({'name': 'Known', 'aggregateRating': {'ratingValue': 5.0, 'ratingCount': 10},
+                           'datePublished': '1999-01-01', 'duration': 'PT1H30M'}))
+        columns.finalize()
+
+        self.assertEqual(columns.sort_by_rating().tolist(), [1, 0])
+        self.assertEqual(columns.sort_by_rating([0, 1], 1).tolist(), [1])
+        self.assertEqual(columns.years[0], MISSING)
+        self.assertEqual(columns.filter(max_year=2000).tolist(), [1])
+        self.assertEqual(columns.filter(max_duration=100).tolist(), [1])
+        self.assertEqual(columns.filter(max_rating=9).tolist(), [1])
+        self.assertEqual(columns.filter().tolist(), [0, 1])
+
+    def test_filter_matches_scan(self):
+        """
+        Test numeric filters return the same movies as a scan of the Movie objects
+        """
+        expected = [doc_id for doc_id, movie in enumerate(self.movies)
+                    if movie.rating_value >= 8.3 and 1990 <= movie.year <= 1999
+                    and parse_iso8601_duration(movie.duration) <= 130]
+        self.assertTrue(expected)
+        result = self.columns.filter(min_rating=8.3, min_year=1990, max_year=1999, max_duration=130)
+        self.assertEqual(result.tolist(), expected)
+
+    def test_doc_ids_for_year(self):
+        """
+        Test year lookups return the movies published that year
+        """
+        expected = [doc_id for doc_id, movie in enumerate(self.movies) if movie.year == 1994]
+        self.assertEqual(self.columns.doc_ids_for_year(1994).tolist(), expected)
+        self.assertIsInstance(self.columns.doc_ids_for_year(1994), np.ndarray)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+from io import StringIO
+from unittest.mock import patch
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.query_cache import QueryCache
+from src.utils.utils import load_movies_from_json_file
+from src.index import Index
+from src.search import Search
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """
+        Test the cache keeps at most max_size entries and evicts the least recently used one
+        """
+        cache = QueryCache(max_size=2)
+        cache.put("a", 1, "v1")
+        cache.put("b", 2, "v1")
+        self.assertEqual(cache.get("a", "v1"), 1)
+        cache.put("c", 3, "v1")
+
+        self.assertIsNone(cache.get("b", "v1"))
+        self.assertEqual(cache.get("a", "v1"), 1)
+        self.assertEqual(cache.get("c", "v1"), 3)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (3, 1, 1))
+
+    def test_entries_expire(self):
+        """
+        Test entries are not served after their time to live
+        """
+        cache = QueryCache(ttl=10)
+        with patch("src.query_cache.time.monotonic", return_value=100.0):
+            cache.put("a", 1, "v1")
+        with patch("src.query_cache.time.monotonic", return_value=109.0):
+            self.assertEqual(cache.get("a", "v1"), 1)
+        with patch("src.query_cache.time.monotonic", return_value=110.0):
+            self.assertIsNone(cache.get("a", "v1"))
+        self.assertEqual((cache.expirations, len(cache)), (1, 0))
+
+    def test_index_version_change_clears_cache(self):
+        """
+        Test entries computed from another index version are dropped
+        """
+        cache = QueryCache()
+        cache.put("a", 1, "v1")
+        self.assertIsNone(cache.get("a", "v2"))
+        self.assertEqual(cache.invalidations, 1)
+
+    def test_disabled_cache(self):
+        """
+        Test a cache of size 0 keeps nothing
+        """
+        cache = QueryCache(max_size=0)
+        cache.put("a", 1, "v1")
+        self.assertIsNone(cache.get("a", "v1"))
+
+    def test_general_search_uses_cache(self):
+        """
+        Test a repeated general search is served from the cache until the index is rebuilt
+        """
+        movies = load_movies_from_json_file("./tests/test_movies.json")
+        index = Index(movies)
+        search = Search(movies, index)
+        with patch("sys.stdout", new_callable=StringIO):
+            first = search.general_search("Toy Story", 70, 10)
+            second = search.general_search("toy story ", 70, 10)
+            self.assertIs(first, second)
+            self.assertEqual([movie.name for movie in first.matches], ["Toy Story 3", "Toy Story"])
+
+            index.finalize()
+            third = search.general_search("toy story", 70, 10)
+        self.assertIsNot(third, first)
+        self.assertEqual((search.cache.hits, search.cache.misses, search.cache.invalidations), (1, 2, 1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import asyncio
+import http.client
+import json
+import multiprocessing
+import sys
+import os
+import socket
+import threading
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from main import build_databases
+from src.batch import BatchOptions, run_query
+from src.index import Index
+from src.search import Search
+from src.server import SearchServer, serve_prefork
+from src.utils.utils import load_movies_from_json_file
+
+
+class TestSearchServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Starting a server on a free port, its event loop running in a thread
+        """
+        movies = load_movies_from_json_file("./movies.json")
+        cls.search = Search(movies, Index(movies))
+        cls.server = SearchServer(cls.search, build_databases(movies), BatchOptions(num_results=5), port=0,
+                                  workers=2)
+        cls.loop = asyncio.new_event_loop()
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+        asyncio.run_coroutine_threadsafe(cls.server.start(), cls.loop).result(10)
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.server.stop(), cls.loop).result(10)
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join(10)
+        cls.loop.close()
+
+    def setUp(self):
+        self.connection = http.client.HTTPConnection(self.server.host, self.server.port, timeout=10)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def get(self, target, method='GET'):
+        self.connection.request(method, target)
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_routed_search(self):
+        """
+        Test /search runs the searches a query is routed to
+        """
+        status, payload = self.get('/search?q=Tom+Hanks')
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['paths'], ['actor'])
+        self.assertEqual(payload['results']['actor']['movies'],
+                         self.get('/search/actor?q=Tom%20Hanks')[1]['results']['movies'])
+
+        # Numeric text that is not a year is searched as text
+        status, payload = self.get('/search?q=9%C2%BD')
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['paths'], ['general'])
+
+    def test_endpoints(self):
+        """
+        Test every search endpoint on a single keep-alive connection
+        """
+        status, payload = self.get('/search/general?q=toy+story&n=3')
+        self.assertEqual(status, 200)
+        self.assertLessEqual(len(payload['results']['movies']), 3)
+        self.assertTrue(any('Toy Story' in movie['name'] for movie in payload['results']['movies']))
+
+        movies = self.get('/search/year?q=1990-1999')[1]['results']['movies']
+        self.assertEqual(len(movies), 5)
+        self.assertTrue(all(1990 <= movie['year'] <= 1999 for movie in movies))
+        self.assertEqual(self.get('/search/year?q=1995')[1]['search'], 'year')
+
+        for name in ('title', 'director', 'creator', 'genre'):
+            status, payload = self.get(f'/search/{name}?q=x')
+            self.assertEqual(status, 200)
+            self.assertIn('movies', payload['results'])
+        self.assertGreater(len(self.get('/search/genre?q=Action')[1]['results']['movies']), 0)
+
+    def test_filters(self):
+        """
+        Test the filter parameters restrict the general search
+        """
+        movies = self.get('/search/general?q=love&min_rating=8&n=50')[1]['results']['movies']
+        self.assertTrue(all(movie['rating'] >= 8 for movie in movies))
+
+    def test_errors(self):
+        """
+        Test unknown endpoints, methods and malformed parameters are answered with an error
+        """
+        self.assertEqual(self.get('/nowhere')[0], 404)
+        self.assertEqual(self.get('/search/general')[0], 400)
+        self.assertEqual(self.get('/search/year?q=soon')[0], 400)
+        self.assertEqual(self.get('/search/year?q=%C2%BD')[0], 400)
+        self.assertEqual(self.get('/search/general?q=toy&n=many')[0], 400)
+        self.assertEqual(self.get('/search?q=toy', method='POST')[0], 405)
+        # The connection is still usable after the errors
+        self.assertEqual(self.get('/health')[1]['movies'], len(self.search.index.movies))
+
+
+class TestPreforkServer(unittest.TestCase):
+
+    def test_prefork_server(self):
+        """
+        Test forked processes sharing the index answer like the index they were forked from
+        """
+        movies = load_movies_from_json_file("./movies.json")
+        search = Search(movies, Index(movies))
+        databases = build_databases(movies)
+        options = BatchOptions(num_results=5)
+        sock = socket.create_server(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        # The server shares and freezes the index in its own process, this one keeps it as is
+        server = multiprocessing.get_context('fork').Process(
+            target=serve_prefork, args=(search, databases, options, sock, 2, 1))
+        server.start()
+        sock.close()
+        try:
+            for query in ("toy story", "Tom Hanks", "godfathr", "1990-1999"):
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                connection.request('GET', f'/search?q={query.replace(" ", "+")}')
+                response = connection.getresponse()
+                payload = json.loads(response.read())
+                connection.close()
+                self.assertEqual(response.status, 200)
+                expected = run_query(search, databases, query, options)
+                self.assertEqual(payload['results'], json.loads(json.dumps(expected['results'])))
+        finally:
+            server.terminate()
+            server.join(30)
+        self.assertEqual(server.exitcode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
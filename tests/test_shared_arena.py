@@ -0,0 +1,117 @@
+import unittest
+from array import array
+import sys
+import os
+
+import numpy as np
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from main import build_databases
+from src.batch import BatchOptions, run_query
+from src.filter_index import SearchFilters
+from src.index import Index
+from src.search import Search
+from src.shared_arena import PackedPostings, PackedValues, SharedArena, SharedVocabulary
+from src.utils.utils import load_movies_from_json_file
+
+
+class TestSharedArena(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.arena = SharedArena(segment_size=64)
+        self.lists = {'drama': array('I', [1, 4, 9]), 'comédie': array('I', [2]), 'war': array('I'),
+                      'a' * 100: array('I', range(40))}
+
+    def test_vocabulary(self):
+        """
+        Test every term is found by its number and back, missing terms are not found
+        """
+        terms = list(self.lists) + [f"term{number}" for number in range(500)]
+        vocabulary = SharedVocabulary(terms, self.arena)
+        self.assertEqual(len(vocabulary), len(terms))
+        self.assertEqual(list(vocabulary), terms)
+        for number, term in enumerate(terms):
+            self.assertEqual(vocabulary.find(term), number)
+        self.assertEqual(vocabulary.find('comedie'), -1)
+        self.assertEqual(vocabulary.find(''), -1)
+
+    def test_packed_postings(self):
+        """
+        Test the packed postings behave as a read-only dictionary of the arrays
+        """
+        postings = PackedPostings.from_dict(self.lists, self.arena)
+        self.assertEqual(len(postings), len(self.lists))
+        self.assertEqual(list(postings), list(self.lists))
+        for term, doc_ids in self.lists.items():
+            self.assertIn(term, postings)
+            self.assertEqual(postings[term].tolist(), doc_ids.tolist())
+        self.assertNotIn('comedy', postings)
+        self.assertIsNone(postings.get('comedy'))
+        self.assertEqual(postings.get('war', array('I')).tolist(), [])
+        with self.assertRaises(KeyError):
+            postings['comedy']
+        with self.assertRaises(TypeError):
+            postings['drama'][0] = 2
+
+    def test_packed_values(self):
+        """
+        Test the packed values share the vocabulary of postings with the same terms
+        """
+        postings = PackedPostings.from_dict(self.lists, self.arena)
+        lengths = PackedValues(postings.vocabulary, (len(doc_ids) for doc_ids in self.lists.values()), self.arena)
+        self.assertEqual(dict(lengths.items()), {term: len(doc_ids) for term, doc_ids in self.lists.items()})
+        with self.assertRaises(ValueError):
+            PackedValues(postings.vocabulary, [1], self.arena)
+
+    def test_ndarray(self):
+        """
+        Test NumPy arrays are copied into read-only views
+        """
+        ratings = np.array([8.5, np.nan, 7.0])
+        shared = self.arena.ndarray(ratings)
+        np.testing.assert_array_equal(shared, ratings)
+        self.assertFalse(shared.flags.writeable)
+
+
+class TestSharedIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Setting up for the test
+        """
+        cls.movies = load_movies_from_json_file("./movies.json")
+        cls.databases = build_databases(cls.movies)
+        cls.queries = ["toy story", "Tom Hanks", "2010", "1990-1999", "spider-man", "godfathr", "pg-13",
+                       "Action", "love war", "é", "-1"]
+        cls.options = [BatchOptions(), BatchOptions(ranked=True), BatchOptions(fuzz_ratio=50),
+                       BatchOptions(filters=SearchFilters(min_rating=8, genres=['Drama']))]
+
+    def run_queries(self, search):
+        reports = []
+        for options in self.options:
+            for query in self.queries:
+                report = run_query(search, self.databases, query, options)
+                del report['timings_ms']
+                reports.append(report)
+        return reports
+
+    def test_shared_index_results(self):
+        """
+        Test a shared index returns the same results as the index it was moved from
+        """
+        for compress_postings in (False, True):
+            search = Search(self.movies, Index(self.movies, compress_postings=compress_postings), cache_size=0)
+            expected = self.run_queries(search)
+            search.index.share(SharedArena())
+            self.assertIsInstance(search.index.index, PackedPostings)
+            self.assertEqual(self.run_queries(search), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
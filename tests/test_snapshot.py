@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+import tempfile
+import mmap
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.utils.utils import load_movies_from_json_file
+from src.index import Index
+from src.snapshot import compute_checksum, load_snapshot, save_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.json_path = "./tests/test_movies.json"
+        self.movies = load_movies_from_json_file(self.json_path)
+        self.index = Index(self.movies)
+        self.databases = {'years': {movie.year for movie in self.movies}}
+        self.checksum = compute_checksum(self.json_path)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.tmp_dir.name, "movies.snapshot")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """
+        Test a saved snapshot is loaded back with the same content
+        """
+        save_snapshot(self.snapshot_path, self.checksum, self.movies, self.index, self.databases)
+        movies, index, databases = load_snapshot(self.snapshot_path, self.checksum)
+
+        self.assertEqual([movie.name for movie in movies], [movie.name for movie in self.movies])
+        self.assertEqual(set(index.index.keys()), set(self.index.index.keys()))
+        self.assertEqual(databases, self.databases)
+        # The index shares the movie objects of the movie store
+        self.assertIs(index.movies[0], movies[0])
+
+    def test_index_buffers_are_mapped_from_the_file(self):
+        """
+        Test the postings and columns of a loaded index are read from the snapshot file, not copied
+        """
+        save_snapshot(self.snapshot_path, self.checksum, self.movies, self.index, self.databases)
+        _, index, _ = load_snapshot(self.snapshot_path, self.checksum)
+
+        postings = index.get_postings("toy")
+        self.assertIsInstance(postings.obj, mmap.mmap)
+        self.assertEqual(list(postings), list(self.index.get_postings("toy")))
+        self.assertEqual(list(index.lookup_field("actors", "hanks")), list(self.index.lookup_field("actors", "hanks")))
+        self.assertEqual(index.json_corpus.search("toy story"), self.index.json_corpus.search("toy story"))
+        self.assertFalse(index.columns.ratings.flags.writeable)
+        self.assertEqual(index.columns.ratings.tolist(), self.index.columns.ratings.tolist())
+        # The index saved is left writable
+        self.assertIsInstance(self.index.index, dict)
+
+    def test_stale_snapshot_is_ignored(self):
+        """
+        Test a snapshot built from a different source file is not loaded
+        """
+        save_snapshot(self.snapshot_path, self.checksum, self.movies, self.index, self.databases)
+        self.assertIsNone(load_snapshot(self.snapshot_path, b'\0' * 32))
+
+    def test_missing_or_corrupt_snapshot_is_ignored(self):
+        """
+        Test a missing or foreign file is not loaded
+        """
+        self.assertIsNone(load_snapshot(self.snapshot_path, self.checksum))
+        with open(self.snapshot_path, 'wb') as snapshot_file:
+            snapshot_file.write(b'not a snapshot' * 10)
+        self.assertIsNone(load_snapshot(self.snapshot_path, self.checksum))
+
+    def test_corrupt_payload_is_ignored(self):
+        """
+        Test a current snapshot whose payload cannot be unpickled is not loaded
+        """
+        save_snapshot(self.snapshot_path, self.checksum, self.movies, self.index, self.databases)
+        with open(self.snapshot_path, 'r+b') as snapshot_file:
+            snapshot_file.seek(-64, os.SEEK_END)
+            snapshot_file.write(b'\xff' * 64)
+        self.assertIsNone(load_snapshot(self.snapshot_path, self.checksum))
+
+if __name__ == "__main__":
+    unittest.main()
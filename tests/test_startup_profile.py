@@ -0,0 +1,54 @@
+import unittest
+import io
+import sys
+import os
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.startup_profile import StartupProfile
+
+
+class TestStartupProfile(unittest.TestCase):
+
+    def test_phases_add_up(self):
+        """
+        Test a phase timed several times is the sum of its durations, in the order phases first ran
+        """
+        profile = StartupProfile()
+        profile.add('import', 0.5)
+        profile.add('load', 0.25, 'snapshot')
+        with profile.phase('index'):
+            pass
+        profile.add('load', 0.25)
+        self.assertEqual(list(profile.timings), ['import', 'load', 'index'])
+        self.assertEqual(profile.timings['load'], 0.5)
+        self.assertIn('index', profile)
+        self.assertNotIn('first query', profile)
+
+    def test_timed_iter(self):
+        """
+        Test timed_iter yields every item and times the iteration as a phase
+        """
+        profile = StartupProfile()
+        self.assertEqual(list(profile.timed_iter('load', range(3))), [0, 1, 2])
+        self.assertIn('load', profile)
+
+    def test_report(self):
+        """
+        Test the report lists every phase with its note and the time to the first query
+        """
+        profile = StartupProfile()
+        profile.add('import', 0.5)
+        profile.add('load', 0.25, 'snapshot')
+        output = io.StringIO()
+        profile.report(output)
+        self.assertEqual(output.getvalue().splitlines(), [
+            "[PROFILE] import: 0.500 s",
+            "[PROFILE] load: 0.250 s (snapshot)",
+            "[PROFILE] time to first query: 0.750 s",
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'movie-search')))
+
+from src.trigram_index import TrigramIndex
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setting up for the test
+        """
+        self.texts = ["spider-man: no way home", "the amazing spider-man", "8½", "the man who knew too much"]
+        self.trigram_index = TrigramIndex()
+        for text_id, text in enumerate(self.texts):
+            self.trigram_index.add(text_id, text)
+
+    def test_candidates_contain_every_match(self):
+        """
+        Test the candidates of a query include every text containing it
+        """
+        for query in ["spider-man", "man", "the ", "knew too", "way home", "zzz"]:
+            candidates = set(self.trigram_index.candidates(query))
+            expected = {text_id for text_id, text in enumerate(self.texts) if query in text}
+            self.assertTrue(expected <= candidates, query)
+        self.assertEqual(list(self.trigram_index.candidates("spider-man")), [0, 1])
+        self.assertEqual(len(self.trigram_index.candidates("zzz")), 0)
+
+    def test_short_queries_are_not_narrowed(self):
+        """
+        Test queries shorter than a trigram return None
+        """
+        self.assertIsNone(self.trigram_index.candidates("8½"))
+
+if __name__ == "__main__":
+    unittest.main()
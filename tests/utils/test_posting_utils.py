@@ -0,0 +1,47 @@
+import unittest
+import sys
+import os
+import random
+from array import array
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'movie-search')))
+
+from src.utils.posting_utils import gallop, intersect_postings
+
+
+class TestPostingUtils(unittest.TestCase):
+
+    def test_gallop(self):
+        """
+        Test gallop function
+        """
+        postings = array('I', [1, 3, 5, 7, 9, 11, 13])
+        self.assertEqual(gallop(postings, 0), 0)
+        self.assertEqual(gallop(postings, 7), 3)
+        self.assertEqual(gallop(postings, 8), 4)
+        self.assertEqual(gallop(postings, 13, 2), 6)
+        self.assertEqual(gallop(postings, 14, 2), 7)
+        self.assertEqual(gallop(postings, 3, 5), 5)
+
+    def test_intersect_postings(self):
+        """
+        Test intersect_postings function
+        """
+        self.assertEqual(list(intersect_postings([])), [])
+        self.assertEqual(list(intersect_postings([array('I', [2, 4, 6])])), [2, 4, 6])
+        self.assertEqual(list(intersect_postings([array('I', [1, 2, 3, 4, 5, 6]), array('I', [2, 6]), array('I', [0, 2, 6, 9])])), [2, 6])
+        self.assertEqual(list(intersect_postings([array('I', [1, 2]), array('I')])), [])
+
+    def test_intersect_postings_matches_set_intersection(self):
+        """
+        Test intersect_postings against a plain set intersection
+        """
+        rng = random.Random(7)
+        for _ in range(200):
+            lists = [sorted(rng.sample(range(500), rng.randint(0, 200))) for _ in range(rng.randint(1, 4))]
+            expected = sorted(set.intersection(*map(set, lists)))
+            self.assertEqual(list(intersect_postings([array('I', postings) for postings in lists])), expected)
+
+if __name__ == "__main__":
+    unittest.main()
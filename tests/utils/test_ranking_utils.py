@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Update the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'movie-search')))
+
+from src.utils.utils import load_movies_from_json_file
+from src.index import Index
+from src.utils.ranking_utils import bm25_idf, bm25_term_score, top_k_bm25
+
+
+class TestRankingUtils(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Setting up for the test
+        """
+        cls.index = Index(load_movies_from_json_file("./movies.json"))
+
+    def exhaustive_bm25(self, terms, k):
+        """
+        Scores every movie containing a term, without skipping
+        """
+        scores = {}
+        num_docs = len(self.index.movies)
+        for term in set(terms):
+            postings = self.index.get_postings(term)
+            idf = bm25_idf(len(postings), num_docs)
+            for doc_id, term_freq in zip(postings, self.index.get_term_freqs(term)):
+                scores[doc_id] = scores.get(doc_id, 0.0) + bm25_term_score(
+                    term_freq, self.index.doc_lengths[doc_id], self.index.avg_doc_length, idf)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def test_top_k_bm25_matches_exhaustive_scoring(self):
+        """
+        Test top_k_bm25 returns the same movies and scores as scoring every candidate
+        """
+        for query in ["the dark knight", "love war", "toy story", "tom hanks", "action drama thriller", "pt2h", "nolan batman joker"]:
+            terms = self.index.tokenize(query)
+            for k in [1, 5, 10, 50]:
+                expected = self.exhaustive_bm25(terms, k)
+                actual = top_k_bm25(self.index, terms, k)
+                self.assertEqual([doc_id for doc_id, _ in actual], [doc_id for doc_id, _ in expected], (query, k))
+                for (_, score), (_, expected_score) in zip(actual, expected):
+                    self.assertAlmostEqual(score, expected_score)
+
+    def test_top_k_bm25_with_allowed_bitmap(self):
+        """
+        Test top_k_bm25 only returns allowed movies, as if the others were not indexed
+        """
+        allowed = np.zeros(len(self.index.movies), dtype=bool)
+        allowed[::3] = True
+        for query in ["the dark knight", "love war", "action drama thriller"]:
+            terms = self.index.tokenize(query)
+            expected = [(doc_id, score) for doc_id, score in self.exhaustive_bm25(terms, len(self.index.movies))
+                        if allowed[doc_id]][:10]
+            actual = top_k_bm25(self.index, terms, 10, allowed)
+            self.assertEqual([doc_id for doc_id, _ in actual], [doc_id for doc_id, _ in expected], query)
+
+    def test_top_k_bm25_without_matches(self):
+        """
+        Test top_k_bm25 with unknown words or no results requested
+        """
+        self.assertEqual(top_k_bm25(self.index, ["unknownword"], 10), [])
+        self.assertEqual(top_k_bm25(self.index, ["dark"], 0), [])
+
+    def test_rarer_terms_score_higher(self):
+        """
+        Test a movie matching a rare word ranks first
+        """
+        doc_id, _ = top_k_bm25(self.index, self.index.tokenize("movie shawshank"), 1)[0]
+        self.assertEqual(self.index.movies[doc_id].name, "The Shawshank Redemption")
+
+if __name__ == "__main__":
+    unittest.main()
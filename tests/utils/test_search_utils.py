@@ -1,4 +1,5 @@
 import unittest
+import json
 import sys
 import os
 from io import StringIO
@@ -10,6 +11,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 from src.utils.utils import load_movies_from_json_file
 from src.utils.search_utils import *
+from src.index import Index
 
 
 class TestSearchUtils(unittest.TestCase):
@@ -83,5 +85,83 @@ class TestSearchUtils(unittest.TestCase):
         self.assertEqual(len(movies), 2)
         self.assertListEqual([movie.name for movie in movies], ["Toy Story", "Toy Story 3"])
 
+    def test_search_by_field_matches_linear_scan(self):
+        """
+        Test search_by_actor, search_by_director, search_by_creator, search_by_genre and
+        search_by_movie_name keep the substring semantics of scanning every movie
+        """
+        movies = load_movies_from_json_file("./movies.json")
+        index = Index(movies)
+        searches = [
+            (search_by_actor, lambda movie: [a.name for a in movie.actors], ["Tom Hanks", "tom", "Hanks", "ô", "Zzz"]),
+            (search_by_director, lambda movie: [d.name for d in movie.directors], ["Christopher Nolan", "nolan", "Akira"]),
+            (search_by_creator, lambda movie: [c.name for c in movie.creators], ["co0", "Kurosawa", "Jonathan Nolan"]),
+            (search_by_genre, lambda movie: [g.name for g in movie.genres], ["Action", "dram", "Sci-Fi"]),
+            (search_by_movie_name, lambda movie: [movie.name], ["Toy Story", "the", "spider-man", ":"]),
+        ]
+        for search, values, queries in searches:
+            for query in queries:
+                expected = [movie for movie in movies if any(query.lower() in value.lower() for value in values(movie))]
+                self.assertEqual(search(index, query), expected, (search.__name__, query))
+
+    def test_perform_json_search_matches_linear_scan(self):
+        """
+        Test perform_json_search finds the same movies as scanning the records of the source file
+        """
+        movies = load_movies_from_json_file("./movies.json")
+        index = Index(movies)
+        with open("./movies.json", encoding='utf-8') as json_file:
+            records = [json.dumps(record, ensure_ascii=False).lower() for record in json.load(json_file)]
+        for query in ["spider-man", "Tom Hanks", "9½", "\"@type\": \"Organization\"", "a.", "zz-zz", "schema.org",
+                      "dictator&apos;s", "\"@type\": \"aggregaterating\""]:
+            expected = [movie for movie, record in zip(movies, records) if query.lower() in record]
+            self.assertEqual(perform_json_search(index, query), expected, query)
+        self.assertEqual(len(perform_json_search(index, "schema.org")), len(movies))
+        # Non-ASCII characters are searched as they are written, not as JSON escapes
+        self.assertGreater(len(perform_json_search(index, "Toshirô M")), 0)
+
+    def test_perform_title_fuzzy_search_matches_fuzz_ratio(self):
+        """
+        Test the batched title fuzzy search agrees with fuzz.ratio on every (chunk, title) pair
+        """
+        from rapidfuzz import fuzz
+
+        movies = load_movies_from_json_file("./movies.json")
+        index = Index(movies)
+        for query, fuzz_ratio in [("godfathr", 70), ("godfathr prt", 30), ("the dark", 50), ("xyzzyq", 70)]:
+            chunks = query.lower().split()
+            expected = [movie for movie in movies
+                        if all(round(fuzz.ratio(chunk, movie.name.lower())) >= fuzz_ratio for chunk in chunks)]
+            self.assertEqual(perform_title_fuzzy_search(index, query, fuzz_ratio), expected, query)
+
+    def test_parse_year_range(self):
+        """
+        Test years, ranges, decades and bounds are parsed into inclusive ranges
+        """
+        self.assertEqual(parse_year_range("1994"), (1994, 1994))
+        self.assertEqual(parse_year_range("1990-1999"), (1990, 1999))
+        self.assertEqual(parse_year_range("1999 - 1990"), (1990, 1999))
+        self.assertEqual(parse_year_range("1990s"), (1990, 1999))
+        self.assertEqual(parse_year_range(">=2010"), (2010, None))
+        self.assertEqual(parse_year_range(">2010"), (2011, None))
+        self.assertEqual(parse_year_range("<= 1980"), (None, 1980))
+        self.assertEqual(parse_year_range("<1980"), (None, 1979))
+        for query in ["toy story", "1995s", "90s", "1990-", "=>2010", "12345"]:
+            self.assertIsNone(parse_year_range(query), query)
+
+    def test_search_by_year_range_matches_linear_scan(self):
+        """
+        Test search_by_year_range returns the movies of the range from the highest rating
+        """
+        movies = load_movies_from_json_file("./movies.json")
+        index = Index(movies)
+        for start, end in [(1990, 1999), (1994, 1994), (2010, None), (None, 1940), (1800, 1850), (1999, 1990)]:
+            expected = sorted([movie for movie in movies
+                               if movie.year and (start is None or movie.year >= start) and (end is None or movie.year <= end)],
+                              key=lambda movie: movie.rating_value, reverse=True)
+            self.assertEqual(search_by_year_range(index, start, end), expected, (start, end))
+            self.assertEqual(search_by_year_range(index, start, end, 5), expected[:5], (start, end))
+        self.assertEqual(search_by_year(index, 1994, 3), search_by_year_range(index, 1994, 1994)[:3])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -8,7 +8,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 # Now you can import your custom modules
 from src.models.movie import Movie
-from src.utils.utils import movie_to_json, json_to_movie, load_movies_from_json_file
+from src.utils.utils import movie_to_json, json_to_movie, load_movies_from_json_file, iter_movie_dicts_from_json_file, iter_movies_from_file, LoadReport, sort_by_rating, _iter_json_array_records
 
 
 class TestUtils(unittest.TestCase):
@@ -112,6 +112,63 @@ class TestUtils(unittest.TestCase):
         self.assertIsInstance(movie, Movie)
         self.assertEqual(movie.name, "Vertigo")
 
+    def test_iter_movie_dicts_from_json_file(self):
+        with open("./tests/test_movies.json") as json_file:
+            expected = json.load(json_file)
+        # A tiny chunk size makes every element span several reads
+        movie_dicts = list(iter_movie_dicts_from_json_file("./tests/test_movies.json", chunk_size=7))
+        self.assertEqual(movie_dicts, expected)
+
+    def test_iter_movies_from_jsonl_file(self):
+        jsonl_path = "temp.jsonl"
+        with open(jsonl_path, 'w') as temp_file:
+            temp_file.write(json.dumps(json.loads(self.sample_json)) + '\n\n')
+        try:
+            movies = list(iter_movies_from_file(jsonl_path))
+        finally:
+            os.remove(jsonl_path)
+        self.assertEqual([movie.name for movie in movies], ["Vertigo"])
+
+    def test_load_report(self):
+        jsonl_path = "temp.jsonl"
+        with open(jsonl_path, 'w') as temp_file:
+            temp_file.write(json.dumps(json.loads(self.sample_json)) + '\n')
+            temp_file.write('{"name": "Broken", \n')
+            temp_file.write('{"name": "Bad date", "datePublished": "sometime"}\n')
+        report = LoadReport()
+        try:
+            movies = load_movies_from_json_file(jsonl_path, report)
+        finally:
+            os.remove(jsonl_path)
+
+        self.assertEqual([movie.name for movie in movies], ["Vertigo"])
+        self.assertEqual((report.loaded, report.failed, report.total), (1, 2, 3))
+        self.assertEqual([position for position, _ in report.errors], [1, 2])
+        self.assertIn("ValueError", report.errors[1][1])
+
+    def test_load_report_json_array(self):
+        movie = json.dumps(json.loads(self.sample_json))
+        tricky = json.dumps({'name': 'Braces } ] in "quotes" \\', 'keywords': '[{'})
+        json_path = "temp_array.json"
+        with open(json_path, 'w') as temp_file:
+            temp_file.write(f'[{movie}, {{"name": "Broken",, "x": [1}}, 7, {tricky},\n'
+                            f'{{"name": "Bad date", "datePublished": "sometime"}}, {movie}, {{"name": "Trunc')
+        try:
+            report = LoadReport()
+            movies = list(iter_movies_from_file(json_path, report))
+            # Elements spanning several reads end at the same place
+            records = [list(_iter_json_array_records(json_path, chunk_size)) for chunk_size in (1, 5, 64)]
+        finally:
+            os.remove(json_path)
+
+        self.assertEqual([movie.name for movie in movies], ["Vertigo", 'Braces } ] in "quotes" \\', "Vertigo"])
+        self.assertEqual((report.loaded, report.failed), (3, 4))
+        self.assertEqual([position for position, _ in report.errors], [1, 2, 4, 6])
+        self.assertIn("JSONDecodeError", report.errors[0][1])
+        for chunk_records in records:
+            self.assertEqual([(text, offset) for _, text, offset in chunk_records],
+                             [(text, offset) for _, text, offset in records[-1]])
+
     def test_movie_to_json(self):
         movie = json_to_movie(self.sample_json)
         json_string = movie_to_json(movie)
@@ -128,5 +185,14 @@ class TestUtils(unittest.TestCase):
         self.assertIsInstance(movie, Movie)
         self.assertEqual(movie.name, "Vertigo")
 
+    def test_sort_by_rating(self):
+        """
+        Test sort_by_rating selects the top rated movies, movies without a rating last
+        """
+        movies = [Movie({'name': name, 'aggregateRating': {'ratingValue': rating}})
+                  for name, rating in [('A', 7.5), ('B', None), ('C', 9.0), ('D', 7.5)]]
+        self.assertEqual([movie.name for movie in sort_by_rating(movies, 3)], ['C', 'A', 'D'])
+        self.assertEqual([movie.name for movie in sort_by_rating(movies)], ['C', 'A', 'D', 'B'])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file